@@ -3,36 +3,56 @@ Agents Source File
 
 Collection of various Agent types useful for the k-armed bandit problem.
 
-Requires `numpy` to be installed, and the bandits source file to be imported correctly.
+Requires `numpy` to be installed, and the bandits, metrics, streams & trees source files to be imported correctly.
 
 Currently contains implementations for:
     - Epsilon Greedy Agent
     - Greedy Agent
     - Optimistic Greedy Agent
     - Random Agent
+    - UCB Agent (UCB1, UCB1-Tuned & KL-UCB)
+    - Thompson Sampling Agent (Normal-Normal & Beta-Bernoulli posteriors)
+    - Gradient Bandit Agent (softmax over action preferences)
 
-TODO: Add implementations for:
-    - Constant Step-Size Agent
-    - UCB Selection Agents
+Every agent extends the "Agent" base class, which owns the single run loop, so each agent only supplies its selection
+policy ("_selectAction") and learning rule ("_updateRewards"). Agents which keep reward estimates extend "ActionValueAgent",
+which holds them as Python lists of floats for small k (where list indexing and float arithmetic beat NumPy scalars) and
+as NumPy arrays for large k (where a vectorized argmax, or a Max Tree, beats scanning a list).
+
+Every agent which keeps reward estimates also accepts a constant "step_size" (alpha), which replaces the sample-average
+update with an exponential recency-weighted average, as is needed for nonstationary bandits.
 
 TODO: IDEA: Add ability for epsilon greedy to "stop exploring" once it seems satisfactorily close to real eastimates
 """
 
+import math
+
 import numpy as np
 from bandits import Bandit
+from bandits import BernoulliBandit
+from metrics import MetricsSink
+from metrics import MultiSink
+from metrics import PrintSink
+from streams import makeGenerator
+from trees import MaxTree
+from trees import SumTree
 
+# Above this many actions, agents find their greedy action with an O(log k) Max Tree rather than an O(k) argmax scan
+ARGMAX_TREE_THRESHOLD = 16384
 
+# Up to this many actions, reward estimates are kept as Python lists of floats rather than NumPy arrays
+PYTHON_FLOAT_THRESHOLD = 16
 
+# Above this many actions, an approximate gradient bandit agent samples its softmax policy from a Sum Tree of lazily updated weights
+SOFTMAX_TREE_THRESHOLD = 4096
 
 
-
-
-
-
-
-class EpsilonGreedyAgent:
+class Agent:
     """
-    Python implementation of an Epsilon Greedy Agent
+    Base class of every agent, which owns the agent's bandit, random number generator & points total, and the single
+    run loop shared by every agent. Subclasses supply their selection policy ("_selectAction") and learning rule ("_updateRewards").
+
+    Agents use `__slots__`, so every attribute lookup in the run loop is a fixed offset rather than a dictionary lookup.
 
     ...
 
@@ -40,64 +60,112 @@ class EpsilonGreedyAgent:
     ----------
     bandit : Bandit
         Associated bandit for the agent to operate on
+    label : str
+        Name of the agent used when printing its progress
     total_points : float
-        Keeps a running total of all points across all n times "chooseAction" has been called
-    epsilon : float
-        Chance for model to pick a random (non-greedy) action. Must be between 0 and 1! Reasoning:
-            - Epsilon of 0 = Greedy Model
-            - Epsilon of 1 = Purely Random Model
-        (default 0.1)
-    __reward_estimates : np.array
-        Estimated value of each action's reward based on prior experience, where:
-            - index = action ID
-            - value = estimated cooresponding reward
-    __reward_select_counts : np.array
-        Array that keeps track of how many times each action has been selected, where:
-            - index = action ID
-            - value = num times action has been selected
-    
+        Keeps a running total of all points across all steps run (brought up to date once a "run" call ends)
+    rng : np.random.Generator
+        Random number generator used by the agent (and able to spawn child streams, via `rng.spawn(n)`)
+    uniform_buffer_size : int
+        Number of uniform [0,1) values drawn from "rng" at once by "_uniform" (1024)
+    _uniforms : list
+        Pre-generated block of uniform [0,1) values, refilled whenever it runs out
+    _uniform_index : int
+        Index of the next unused value in "_uniforms"
+    _log_propensities : bool
+        Whether "run" keeps the probability of each selection in "_propensity" (set by sinks which log it, default False)
+    _propensity : float
+        Probability the agent had of selecting its last action run (only kept while "_log_propensities" is set)
+
     Methods
     -------
     chooseAction()
-        Uses Epsilon-Greedy logic to select an action and realize its associated reward.
-        Passes this information into the (private) updateRewards function.
-    runSequence(n = 1000, print_interval = None)
-        Run the model input n amount of times, providing print statements to indicate how it is performing
+        Selects a single action, realizes its associated reward and learns from it
+    select()
+        Selects a single action, without pulling the bandit (for rewards which arrive later, through "update")
+    update(action, reward)
+        Learns from the reward of an action selected earlier
+    run(n = 1000, sink = None)
+        Runs n steps in one tight loop, reporting every step to a metrics sink (silent by default)
+    runSequence(n = 1000, print_interval = None, sink = None)
+        Run the model input n amount of times, reporting every step to a metrics sink (silent by default)
+    getActionProbabilities()
+        Returns the agent's current policy (the probability of its next selection being each action)
     reset()
         Reset values associated with the agent's progress
     changeBandit(bandit)
         Changes bandit that the agent is running on
+    getState()
+        Returns everything needed to resume the agent exactly where it is
+    setState(state)
+        Restores a state returned by "getState"
     """
 
-    total_points = 0
+    __slots__ = ("bandit", "rng", "total_points", "_uniforms", "_uniform_index", "_log_propensities", "_propensity")
+    label = "Agent"
+    uniform_buffer_size = 1024
+    # State entries which are arrays updated in place (so they can be backed by memory-mapped files)
+    state_arrays = ()
 
-    def __init__(self, bandit: Bandit, epsilon: float = 0.1) -> None:
+    def __init__(self, bandit: Bandit, seed = None) -> None:
         """
         Parameters
         ----------
         bandit : Bandit
             Associated bandit for the agent to operate on
-        epsilon : float
-            Chance for model to pick a random (non-greedy) action. Must be between 0 and 1! Reasoning:
-                - Epsilon of 0 = Greedy Model
-                - Epsilon of 1 = Purely Random Model
-            (default 0.1)
+        seed : None, int, np.random.SeedSequence or np.random.Generator
+            Seed for the agent's random number generator (default None)
         """
-        if epsilon < 0 or epsilon > 1:
-            raise ValueError("Invalid Epsilon, must be within (0,1)")
         self.bandit = bandit
-        self.epsilon = epsilon
-        # TODO: See if there is a better way to do this, maybe in one function. I attempted this, but it lead to very loose, inaccurate floating point problems with the arrays
-        # However, for now, this provides desired behavior without issue.
-        self.__reward_estimates = np.array([])
-        self.__reward_select_counts = np.array([])
-        self.__reward_estimates.resize(bandit.k)
-        self.__reward_select_counts.resize(bandit.k)
+        self.rng = makeGenerator(seed)
+        self._uniforms = []
+        self._uniform_index = 0
+        self._log_propensities = False
+        self._propensity = None
+        self.reset()
+
+    def _uniform(self) -> float:
+        """
+        Protected method which returns the next uniform [0,1) value from the agent's buffer, as a Python float
+        """
+        i = self._uniform_index
+        if i == len(self._uniforms):
+            self._uniforms = self.rng.random(self.uniform_buffer_size).tolist()
+            i = 0
+        self._uniform_index = i + 1
+        return self._uniforms[i]
+
+    def _selectAction(self) -> int:
+        """
+        Protected method which selects the agent's next action (implemented by every agent)
+        """
+        raise NotImplementedError
 
-    def __updateRewards(self, selected_action: int, selected_reward: float) -> None:
+    def _selectWithPropensity(self) -> tuple:
         """
-        Private method which updates "reward_estimates" and "reward_select_counts" based on the input action, reward pair representing what action the model chose and what reward it was provided.
-        Uses "Q" value updating formula described in textbook.
+        Protected method which selects the agent's next action exactly as "_selectAction" would (drawing the same random
+        values), and also returns the probability the agent had of selecting it. Agents override this with an O(1) version;
+        by default the probability is read from the whole policy, before selecting
+
+        Returns
+        -------
+        tuple
+            (selected_action, probability)
+        """
+        probabilities = self.getActionProbabilities()
+        selected_action = self._selectAction()
+        return selected_action, float(probabilities[selected_action])
+
+    def _selectLogged(self) -> int:
+        """
+        Protected method which selects the agent's next action, keeping the probability of selecting it in "_propensity"
+        """
+        selected_action, self._propensity = self._selectWithPropensity()
+        return selected_action
+
+    def _updateRewards(self, selected_action: int, selected_reward: float) -> None:
+        """
+        Protected method which learns from the input action, reward pair (does nothing by default)
 
         Parameters
         ----------
@@ -106,60 +174,115 @@ class EpsilonGreedyAgent:
         selected_reward : float
             Reward component of selected action ID/cooresponding reward pair
         """
-        # Using derived formulas from RL textbook
-        q = self.__reward_estimates[selected_action]
-        n = self.__reward_select_counts[selected_action]
-        if(n==0): #Action has NOT been selected before
-            self.__reward_estimates[selected_action] = selected_reward
-        else:
-            self.__reward_estimates[selected_action] = q + ( (1/n) * (selected_reward - q) )
-        self.__reward_select_counts[selected_action] += 1
+        pass
 
-    def chooseAction(self) -> None:
+    def getActionProbabilities(self) -> np.ndarray:
         """
-        Public method which uses Epsilon-Greedy logic to select an action and realize its associated reward.
-        Passes this information into the updateRewards function.
+        Returns the agent's current policy: the probability of its next selection being each action (implemented by every
+        agent, without changing the agent's state)
         """
-        k = self.bandit.k
-        selected_action = 0
-        # Random value [0,1) to determine if random action will be used rather than greedy
-        epsilon_check = np.random.random()
+        raise NotImplementedError
 
-        if(self.epsilon > epsilon_check): # Random action
-            selected_action = np.random.randint(0,k)
-        else: # Greedy action
-            selected_action = self.__reward_estimates.argmax()
+    def chooseAction(self) -> tuple:
+        """
+        Public method which selects an action using the agent's logic and realizes its associated reward.
+        Passes this information into the updateRewards function.
 
-        selected_reward = self.bandit.selectAction(selected_action) # Reward of selected action through bandit
+        Returns
+        -------
+        tuple
+            (selected_action, selected_reward)
+        """
+        selected_action = self._selectAction()
+        selected_reward = float(self.bandit.selectAction(selected_action)) # Reward of selected action through bandit
         self.total_points += selected_reward
-        self.__updateRewards(selected_action, selected_reward)
-    
-    def runSequence(self, n: int = 1000, print_interval: int = None) -> None:
+        self._updateRewards(selected_action, selected_reward)
+        return selected_action, selected_reward
+
+    def select(self) -> int:
         """
-        Run the model input n amount of times, providing print statements to indicate how it is performing
+        Public method which selects an action using the agent's logic, without pulling the bandit: the reward is realized
+        elsewhere (ex: by a user of a served recommendation) and passed back through "update" once it arrives.
+        ("chooseAction()" is a "select()", then a pull of the bandit, then an "update")
+        """
+        return self._selectAction()
+
+    def update(self, action: int, reward: float) -> None:
+        """
+        Public method which learns from the reward of an action selected earlier. Feedback may be delayed: any number of
+        selections can happen between an action's "select" and its "update", and updates can arrive in any order
+
+        Parameters
+        ----------
+        action : int
+            Action ID returned by an earlier "select"
+        reward : float
+            Reward the action realized
+        """
+        reward = float(reward)
+        self.total_points += reward
+        self._updateRewards(action, reward)
+
+    def run(self, n: int = 1000, sink: MetricsSink = None) -> None:
+        """
+        Runs n steps in one tight loop (the same steps as n calls of "chooseAction()"), reporting every step to the input
+        metrics sink (silent by default). Every method & the points total are looked up once, before the loop
+
+        Parameters
+        ----------
+        n : int
+            Number of steps to run (default 1000)
+        sink : MetricsSink
+            Sink to report every step to (default None)
+        """
+        if sink != None:
+            sink.bind(self, n) # Binding may ask for propensities, so it comes before the methods are looked up
+        select = self._selectLogged if self._log_propensities else self._selectAction
+        pull = self.bandit.selectAction
+        update = self._updateRewards
+        total = self.total_points
+        try:
+            if sink == None:
+                for i in range(n):
+                    action = select()
+                    reward = float(pull(action))
+                    total += reward
+                    update(action, reward)
+            else:
+                record = sink.record
+                for i in range(n):
+                    action = select()
+                    reward = float(pull(action))
+                    total += reward
+                    update(action, reward)
+                    record(action, reward)
+        finally:
+            self.total_points = total
+        if sink != None:
+            sink.finish()
+
+    def runSequence(self, n: int = 1000, print_interval: int = None, sink: MetricsSink = None) -> None:
+        """
+        Run the model input n amount of times, reporting every step to the input metrics sink (silent by default)
 
         Parameters
         ----------
         n : int
             Number of times to call "chooseAction()" (default 1000)
         print_interval : float
-            Interval between which to print current reward estimate (default None)
+            Interval between which to print current reward estimate, through a PrintSink (default None)
+        sink : MetricsSink
+            Sink to report every step to (default None)
         """
-        for i in range(1,n+1):
-            self.chooseAction()
-            if print_interval != None and i % print_interval == 0:
-                print(f"Epsilon Greedy Reward Estimate at Step #{i}: {self.__reward_estimates}")
-        print(f"FINAL Epsilon Greedy Reward Estimate: {self.__reward_estimates}")
-        print(f"Total Epsilon Greedy Points: {self.total_points}")
-        print("-----------------------------------------------------")
+        if print_interval != None:
+            sink = PrintSink(print_interval) if sink == None else MultiSink([PrintSink(print_interval), sink])
+        self.run(n, sink)
 
     def reset(self) -> None:
         """
         Reset values associated with the agent's progress
         """
         self.total_points = 0
-        self.__reward_estimates.fill(0)
-        self.__reward_select_counts.fill(0)
 
     def changeBandit(self, bandit: Bandit) -> None:
         """
@@ -170,10 +293,35 @@ class EpsilonGreedyAgent:
         bandit : Bandit
             New bandit you want the agent to operate on
         """
-        self.reset()
         self.bandit = bandit
-        self.__reward_estimates.resize(bandit.k)
-        self.__reward_select_counts.resize(bandit.k)
+        self.reset()
+
+    def getState(self) -> dict:
+        """
+        Returns everything needed to resume the agent exactly where it is (points total, random number generator state &
+        uniform buffer, plus each agent's own progress), as a dict of arrays, lists & scalars (arrays are not copied)
+        """
+        return {"total_points": self.total_points, "rng": self.rng.bit_generator.state, "uniforms": self._uniforms, "uniform_index": self._uniform_index}
+
+    def setState(self, state: dict) -> None:
+        """
+        Restores a state returned by "getState", from an agent of the same type & hyperparameters on a bandit with the same
+        number of actions. Arrays are used as is (not copied), where the agent keeps NumPy arrays
+
+        Parameters
+        ----------
+        state : dict
+            State returned by "getState"
+
+        Raises
+        ------
+        ValueError
+            If the state has a different number of actions
+        """
+        self.total_points = state["total_points"]
+        self.rng.bit_generator.state = state["rng"]
+        self._uniforms = np.asarray(state["uniforms"], dtype=float).tolist()
+        self._uniform_index = int(state["uniform_index"])
 
 
 
@@ -183,66 +331,101 @@ class EpsilonGreedyAgent:
 
 
 
-class OptimisticGreedyAgent:
+class ActionValueAgent(Agent):
     """
-    Python implementation of an Optimistic Greedy Agent
+    Base class of every agent which keeps a reward estimate & select count for each action, updated with the "Q" value
+    updating formula described in textbook. Extends the "Agent" base class, and selects the greedy action by default.
+
+    Up to PYTHON_FLOAT_THRESHOLD actions, the estimates & counts are Python lists (of floats & ints), otherwise NumPy arrays.
 
     ...
 
     Attributes
     ----------
-    bandit : Bandit
-        Associated bandit for the agent to operate on
-    total_points : float
-        Keeps a running total of all points across all n times "chooseAction" has been called
-    __reward_estimates : np.array
+    step_size : float
+        Constant step-size (alpha) used to update reward estimates, or None for sample averages (default None)
+    argmax_tree_threshold : int
+        Number of actions above which the greedy action is tracked by a Max Tree instead of scanned for every step
+    _initial_estimate : float
+        Reward estimate of every action before it is selected
+    _reward_estimates : list or np.array
         Estimated value of each action's reward based on prior experience, where:
             - index = action ID
             - value = estimated cooresponding reward
-    __reward_select_counts : np.array
-        Array that keeps track of how many times each action has been selected, where:
+    _reward_select_counts : list or np.array
+        Keeps track of how many times each action has been selected, where:
             - index = action ID
             - value = num times action has been selected
-    
+    _python_floats : bool
+        Whether "_reward_estimates" & "_reward_select_counts" are Python lists (k is at most PYTHON_FLOAT_THRESHOLD)
+    _argmax_tree : MaxTree
+        Max Tree over the values the agent maximizes (None when k is at most "argmax_tree_threshold")
+
     Methods
     -------
-    chooseAction()
-        Uses Epsilon-Greedy logic to select an action and realize its associated reward.
-        Passes this information into the (private) updateRewards function.
-    runSequence(n = 1000, print_interval = None)
-        Run the model input n amount of times, providing print statements to indicate how it is performing
-    reset()
-        Reset values associated with the agent's progress
-    changeBandit(bandit)
-        Changes bandit that the agent is running on
+    getRewardEstimates()
+        Returns a copy of the agent's current reward estimates
+    getActionProbabilities()
+        Returns the agent's current policy (all probability on the greedy action)
+    getState()
+        Returns the Agent state, plus the reward estimates & select counts
+    setState(state)
+        Restores a state returned by "getState"
     """
 
-    total_points = 0
+    __slots__ = ("step_size", "argmax_tree_threshold", "_initial_estimate", "_reward_estimates", "_reward_select_counts", "_python_floats", "_argmax_tree")
+    state_arrays = ("reward_estimates", "reward_select_counts")
 
-    def __init__(self, bandit: Bandit, optimistic_val: float = 50) -> None:
+    def __init__(self, bandit: Bandit, initial_estimate: float = 0, step_size: float = None, seed = None, argmax_tree_threshold: int = ARGMAX_TREE_THRESHOLD) -> None:
         """
         Parameters
         ----------
         bandit : Bandit
             Associated bandit for the agent to operate on
-        optimistic_val : float
-            "Optimistic" value to input into model (default 50)
-            (NOTE: REQUIRES SOME LEVEL OF KNOWLEDGE ON BANDIT TO PROPERLY SET OPTIMISTIC_VAL since it, generally, must be bigger than the maximum possible reward's mean)
+        initial_estimate : float
+            Reward estimate of every action before it is selected (default 0)
+        step_size : float
+            Constant step-size (alpha) for the reward estimates, between 0 and 1 (default None, for sample averages)
+        seed : None, int, np.random.SeedSequence or np.random.Generator
+            Seed for the agent's random number generator (default None)
+        argmax_tree_threshold : int
+            Number of actions above which the greedy action is tracked by a Max Tree instead of scanned for every step (default ARGMAX_TREE_THRESHOLD)
+
+        Raises
+        ------
+        ValueError
+            If step_size is not within (0,1]
         """
-        self.bandit = bandit
-        # TODO: See if there is a better way to do this, maybe in one function. I attempted this, but it lead to very loose, inaccurate floating point problems with the arrays
-        # However, for now, this provides desired behavior without issue.
-        self.__reward_estimates = np.array([])
-        self.__reward_select_counts = np.array([])
-        self.__reward_estimates.resize(bandit.k)
-        self.__reward_select_counts.resize(bandit.k)
-        self.__reward_estimates.fill(optimistic_val)
-        self.__optimistic_value = optimistic_val
+        if step_size != None and (step_size <= 0 or step_size > 1):
+            raise ValueError("Invalid Step Size, must be within (0,1]")
+        self.step_size = step_size
+        self.argmax_tree_threshold = argmax_tree_threshold
+        self._initial_estimate = float(initial_estimate)
+        super().__init__(bandit, seed)
+
+    def _greedyAction(self) -> int:
+        """
+        Protected method which returns the action with the highest reward estimate (ties broken towards the lowest action ID)
+        """
+        if self._argmax_tree != None:
+            return self._argmax_tree.argmax()
+        estimates = self._reward_estimates
+        if self._python_floats:
+            return estimates.index(max(estimates))
+        return estimates.argmax()
+
+    _selectAction = _greedyAction
 
-    def __updateRewards(self, selected_action: int, selected_reward: float) -> None:
+    def _selectWithPropensity(self) -> tuple:
+        """
+        Protected method which selects the agent's next action, which it was certain to select (its policy is deterministic)
         """
-        Private method which updates "reward_estimates" and "reward_select_counts" based on the input action, reward pair representing what action the model chose and what reward it was provided.
-        Uses "Q" value updating formula described in textbook.
+        return self._selectAction(), 1.0
+
+    def _updateRewards(self, selected_action: int, selected_reward: float) -> None:
+        """
+        Protected method which updates "reward_estimates" and "reward_select_counts" based on the input action, reward pair representing what action the model chose and what reward it was provided.
+        Uses "Q" value updating formula described in textbook, Q = Q + (1/N) * (R - Q) with N counted after the selection (or constant step-size if "step_size" is set).
 
         Parameters
         ----------
@@ -251,67 +434,264 @@ class OptimisticGreedyAgent:
         selected_reward : float
             Reward component of selected action ID/cooresponding reward pair
         """
-        # Using derived formulas from RL textbook
-        q = self.__reward_estimates[selected_action]
-        n = self.__reward_select_counts[selected_action]
-        if(n==0): #Action has NOT been selected before
-            self.__reward_estimates[selected_action] = selected_reward
+        counts = self._reward_select_counts
+        estimates = self._reward_estimates
+        n = counts[selected_action] + 1
+        counts[selected_action] = n
+        q = estimates[selected_action]
+        if self.step_size != None: # Constant step-size, weighting recent rewards more heavily (for nonstationary bandits)
+            q += self.step_size * (selected_reward - q)
         else:
-            self.__reward_estimates[selected_action] = q + ( (1/n) * (selected_reward - q) )
-        self.__reward_select_counts[selected_action] += 1
+            q += (selected_reward - q) / n
+        estimates[selected_action] = q
+        if self._argmax_tree != None:
+            self._argmax_tree.update(selected_action, q)
 
-    def chooseAction(self) -> None:
+    def getRewardEstimates(self) -> np.ndarray:
         """
-        Public method which uses Greedy logic to select an action and realize its associated reward.
-        Passes this information into the updateRewards function.
+        Returns a copy of the agent's current reward estimates
         """
-        selected_action = self.__reward_estimates.argmax()
+        return np.array(self._reward_estimates, dtype=float)
 
-        selected_reward = self.bandit.selectAction(selected_action) # Reward of selected action through bandit
-        self.total_points += selected_reward
-        self.__updateRewards(selected_action, selected_reward)
-    
-    def runSequence(self, n: int = 1000, print_interval: int = None) -> None:
+    def getActionProbabilities(self) -> np.ndarray:
         """
-        Run the model input n amount of times, providing print statements to indicate how it is performing
+        Returns the agent's current policy, which puts all probability on the greedy action
+        """
+        probabilities = np.zeros(self.bandit.k)
+        probabilities[self._greedyAction()] = 1
+        return probabilities
+
+    def reset(self) -> None:
+        """
+        Reset values associated with the agent's progress, (re)allocating the estimates for the current bandit
+        """
+        super().reset()
+        k = self.bandit.k
+        self._python_floats = k <= PYTHON_FLOAT_THRESHOLD
+        if self._python_floats:
+            self._reward_estimates = [self._initial_estimate] * k
+            self._reward_select_counts = [0] * k
+        else:
+            self._reward_estimates = np.full(k, self._initial_estimate)
+            self._reward_select_counts = np.zeros(k)
+        self._argmax_tree = MaxTree(self._reward_estimates) if k > self.argmax_tree_threshold else None
+
+    def getState(self) -> dict:
+        """
+        Returns the Agent state, plus the reward estimates & select counts
+        """
+        return {**super().getState(), "reward_estimates": self._reward_estimates, "reward_select_counts": self._reward_select_counts}
+
+    def setState(self, state: dict) -> None:
+        """
+        Restores a state returned by "getState", rebuilding the Max Tree (if any) from the restored estimates
 
         Parameters
         ----------
-        n : int
-            Number of times to call "chooseAction()" (default 1000)
-        print_interval : float
-            Interval between which to print current reward estimate (default None)
-        """
-        for i in range(1,n+1):
-            self.chooseAction()
-            if print_interval != None and i % print_interval == 0:
-                print(f"Optimistic Greedy Reward Estimate at Step #{i}: {self.__reward_estimates}")
-        print(f"FINAL Optimistic Greedy Reward Estimate: {self.__reward_estimates}")
-        print(f"Total Optimistic Greedy Points: {self.total_points}")
-        print("-----------------------------------------------------")
+        state : dict
+            State returned by "getState"
 
-    def reset(self) -> None:
+        Raises
+        ------
+        ValueError
+            If the state has a different number of actions
         """
+        if len(state["reward_estimates"]) != self.bandit.k:
+            raise ValueError("Invalid State, number of actions does not match")
+        super().setState(state)
+        if self._python_floats:
+            self._reward_estimates = np.asarray(state["reward_estimates"], dtype=float).tolist()
+            self._reward_select_counts = np.asarray(state["reward_select_counts"], dtype=np.int64).tolist()
+        else:
+            self._reward_estimates = np.asarray(state["reward_estimates"], dtype=float)
+            self._reward_select_counts = np.asarray(state["reward_select_counts"], dtype=float)
+        self._argmax_tree = MaxTree(self._reward_estimates) if self.bandit.k > self.argmax_tree_threshold else None
+
+
+
+
+
+
+
+
+
+class EpsilonGreedyAgent(ActionValueAgent):
+    """
+    Python implementation of an Epsilon Greedy Agent. Extends the "ActionValueAgent" base class
+
+    ...
+
+    Attributes
+    ----------
+    bandit : Bandit
+        Associated bandit for the agent to operate on
+    label : str
+        Name of the agent used when printing its progress
+    total_points : float
+        Keeps a running total of all points across all n times "chooseAction" has been called
+    rng : np.random.Generator
+        Random number generator used by the agent (and able to spawn child streams, via `rng.spawn(n)`)
+    epsilon : float
+        Chance for model to pick a random (non-greedy) action. Must be between 0 and 1! Reasoning:
+            - Epsilon of 0 = Greedy Model
+            - Epsilon of 1 = Purely Random Model
+        (default 0.1)
+    step_size : float
+        Constant step-size (alpha) used to update reward estimates, or None for sample averages (default None)
+    argmax_tree_threshold : int
+        Number of actions above which the greedy action is tracked by a Max Tree instead of scanned for every step
+
+    Methods
+    -------
+    chooseAction()
+        Uses Epsilon-Greedy logic to select an action and realize its associated reward.
+        Passes this information into the (protected) updateRewards function.
+    runSequence(n = 1000, print_interval = None, sink = None)
+        Run the model input n amount of times, reporting every step to a metrics sink (silent by default)
+    getRewardEstimates()
+        Returns a copy of the agent's current reward estimates
+    getActionProbabilities()
+        Returns the agent's current policy (epsilon spread evenly, plus the rest on the greedy action)
+    reset()
         Reset values associated with the agent's progress
+    changeBandit(bandit)
+        Changes bandit that the agent is running on
+    """
+
+    __slots__ = ("epsilon",)
+    label = "Epsilon Greedy"
+
+    def __init__(self, bandit: Bandit, epsilon: float = 0.1, step_size: float = None, seed = None, argmax_tree_threshold: int = ARGMAX_TREE_THRESHOLD) -> None:
         """
-        self.total_points = 0
-        self.__reward_estimates.fill(float(self.__optimistic_value))
-        self.__reward_select_counts.fill(0)
+        Parameters
+        ----------
+        bandit : Bandit
+            Associated bandit for the agent to operate on
+        epsilon : float
+            Chance for model to pick a random (non-greedy) action. Must be between 0 and 1! Reasoning:
+                - Epsilon of 0 = Greedy Model
+                - Epsilon of 1 = Purely Random Model
+            (default 0.1)
+        step_size : float
+            Constant step-size (alpha) for the reward estimates, between 0 and 1 (default None, for sample averages)
+        seed : None, int, np.random.SeedSequence or np.random.Generator
+            Seed for the agent's random number generator (default None)
+        argmax_tree_threshold : int
+            Number of actions above which the greedy action is tracked by a Max Tree instead of scanned for every step (default ARGMAX_TREE_THRESHOLD)
+
+        Raises
+        ------
+        ValueError
+            If epsilon is not within (0,1), or step_size is not within (0,1]
+        """
+        if epsilon < 0 or epsilon > 1:
+            raise ValueError("Invalid Epsilon, must be within (0,1)")
+        self.epsilon = epsilon
+        super().__init__(bandit, 0, step_size, seed, argmax_tree_threshold)
 
-    def changeBandit(self, bandit: Bandit) -> None:
+    def _selectAction(self) -> int:
         """
-        Updates the model information to run on the new input bandit
+        Protected method which selects a random action with probability epsilon, and the greedy action otherwise
+        """
+        # Random value [0,1) to determine if random action will be used rather than greedy
+        if self.epsilon > self._uniform(): # Random action
+            return int(self._uniform() * self.bandit.k)
+        return self._greedyAction()
+
+    def _selectWithPropensity(self) -> tuple:
+        """
+        Protected method which selects an action as "_selectAction" does, along with its probability: epsilon / k, plus
+        (1 - epsilon) for the greedy action
+        """
+        greedy_action = self._greedyAction()
+        if self.epsilon > self._uniform(): # Random action
+            selected_action = int(self._uniform() * self.bandit.k)
+        else:
+            selected_action = greedy_action
+        probability = self.epsilon / self.bandit.k
+        if selected_action == greedy_action:
+            probability += 1 - self.epsilon
+        return selected_action, probability
+
+    def getActionProbabilities(self) -> np.ndarray:
+        """
+        Returns the agent's current policy: epsilon spread evenly over every action, plus (1 - epsilon) on the greedy action
+        """
+        probabilities = np.full(self.bandit.k, self.epsilon / self.bandit.k)
+        probabilities[self._greedyAction()] += 1 - self.epsilon
+        return probabilities
+
+
+
+
+
+
+
+
+
+class OptimisticGreedyAgent(ActionValueAgent):
+    """
+    Python implementation of an Optimistic Greedy Agent. Extends the "ActionValueAgent" base class
+
+    ...
 
+    Attributes
+    ----------
+    bandit : Bandit
+        Associated bandit for the agent to operate on
+    label : str
+        Name of the agent used when printing its progress
+    total_points : float
+        Keeps a running total of all points across all n times "chooseAction" has been called
+    rng : np.random.Generator
+        Random number generator used by the agent (and able to spawn child streams, via `rng.spawn(n)`)
+    step_size : float
+        Constant step-size (alpha) used to update reward estimates, or None for sample averages (default None)
+    argmax_tree_threshold : int
+        Number of actions above which the greedy action is tracked by a Max Tree instead of scanned for every step
+
+    Methods
+    -------
+    chooseAction()
+        Uses Greedy logic (from optimistic initial estimates) to select an action and realize its associated reward.
+        Passes this information into the (protected) updateRewards function.
+    runSequence(n = 1000, print_interval = None, sink = None)
+        Run the model input n amount of times, reporting every step to a metrics sink (silent by default)
+    getRewardEstimates()
+        Returns a copy of the agent's current reward estimates
+    getActionProbabilities()
+        Returns the agent's current policy (all probability on the greedy action)
+    reset()
+        Reset values associated with the agent's progress
+    changeBandit(bandit)
+        Changes bandit that the agent is running on
+    """
+
+    __slots__ = ()
+    label = "Optimistic Greedy"
+
+    def __init__(self, bandit: Bandit, optimistic_val: float = 50, step_size: float = None, seed = None, argmax_tree_threshold: int = ARGMAX_TREE_THRESHOLD) -> None:
+        """
         Parameters
         ----------
         bandit : Bandit
-            New bandit you want the agent to operate on
+            Associated bandit for the agent to operate on
+        optimistic_val : float
+            "Optimistic" value to input into model (default 50)
+            (NOTE: REQUIRES SOME LEVEL OF KNOWLEDGE ON BANDIT TO PROPERLY SET OPTIMISTIC_VAL since it, generally, must be bigger than the maximum possible reward's mean)
+        step_size : float
+            Constant step-size (alpha) for the reward estimates, between 0 and 1 (default None, for sample averages)
+        seed : None, int, np.random.SeedSequence or np.random.Generator
+            Seed for the agent's random number generator (default None)
+        argmax_tree_threshold : int
+            Number of actions above which the greedy action is tracked by a Max Tree instead of scanned for every step (default ARGMAX_TREE_THRESHOLD)
+
+        Raises
+        ------
+        ValueError
+            If step_size is not within (0,1]
         """
-        self.reset()
-        self.bandit = bandit
-        self.__reward_estimates.resize(bandit.k)
-        self.__reward_select_counts.resize(bandit.k)
-        self.__reward_estimates.fill(self.__optimistic_value)
+        super().__init__(bandit, optimistic_val, step_size, seed, argmax_tree_threshold)
 
 
 
@@ -321,9 +701,9 @@ class OptimisticGreedyAgent:
 
 
 
-class GreedyAgent:
+class GreedyAgent(ActionValueAgent):
     """
-    Python implementation of a Greedy Agent
+    Python implementation of a Greedy Agent. Extends the "ActionValueAgent" base class
 
     ...
 
@@ -331,120 +711,422 @@ class GreedyAgent:
     ----------
     bandit : Bandit
         Associated bandit for the agent to operate on
+    label : str
+        Name of the agent used when printing its progress
     total_points : float
         Keeps a running total of all points across all n times "chooseAction" has been called
-    __reward_estimates : np.array
-        Estimated value of each action's reward based on prior experience, where:
-            - index = action ID
-            - value = estimated cooresponding reward
-    __reward_select_counts : np.array
-        Array that keeps track of how many times each action has been selected, where:
-            - index = action ID
-            - value = num times action has been selected
-    
+    rng : np.random.Generator
+        Random number generator used by the agent (and able to spawn child streams, via `rng.spawn(n)`)
+    step_size : float
+        Constant step-size (alpha) used to update reward estimates, or None for sample averages (default None)
+    argmax_tree_threshold : int
+        Number of actions above which the greedy action is tracked by a Max Tree instead of scanned for every step
+
     Methods
     -------
     chooseAction()
         Uses Greedy logic to select an action and realize its associated reward.
-        Passes this information into the (private) updateRewards function.
-    runSequence(n = 1000, print_interval = None)
-        Run the model input n amount of times, providing print statements to indicate how it is performing
+        Passes this information into the (protected) updateRewards function.
+    runSequence(n = 1000, print_interval = None, sink = None)
+        Run the model input n amount of times, reporting every step to a metrics sink (silent by default)
+    getRewardEstimates()
+        Returns a copy of the agent's current reward estimates
+    getActionProbabilities()
+        Returns the agent's current policy (all probability on the greedy action)
     reset()
         Reset values associated with the agent's progress
     changeBandit(bandit)
         Changes bandit that the agent is running on
     """
 
-    total_points = 0
+    __slots__ = ()
+    label = "Greedy"
 
-    def __init__(self, bandit: Bandit) -> None:
+    def __init__(self, bandit: Bandit, step_size: float = None, seed = None, argmax_tree_threshold: int = ARGMAX_TREE_THRESHOLD) -> None:
         """
         Parameters
         ----------
         bandit : Bandit
             Associated bandit for the agent to operate on
+        step_size : float
+            Constant step-size (alpha) for the reward estimates, between 0 and 1 (default None, for sample averages)
+        seed : None, int, np.random.SeedSequence or np.random.Generator
+            Seed for the agent's random number generator (default None)
+        argmax_tree_threshold : int
+            Number of actions above which the greedy action is tracked by a Max Tree instead of scanned for every step (default ARGMAX_TREE_THRESHOLD)
+
+        Raises
+        ------
+        ValueError
+            If step_size is not within (0,1]
         """
-        self.bandit = bandit
-        # TODO: See if there is a better way to do this, maybe in one function. I attempted this, but it lead to very loose, inaccurate floating point problems with the arrays
-        # However, for now, this provides desired behavior without issue.
-        self.__reward_estimates = np.array([])
-        self.__reward_select_counts = np.array([])
-        self.__reward_estimates.resize(bandit.k)
-        self.__reward_select_counts.resize(bandit.k)
+        super().__init__(bandit, 0, step_size, seed, argmax_tree_threshold)
+
+
+
+
+
+
+
+
+
+class RandomAgent(Agent):
+    """
+    Python implementation of a Random Agent. Extends the "Agent" base class
+
+    ...
+
+    Attributes
+    ----------
+    bandit : Bandit
+        Associated bandit for the agent to operate on
+    label : str
+        Name of the agent used when printing its progress
+    total_points : float
+        Keeps a running total of all points across all n times "chooseAction" has been called
+    rng : np.random.Generator
+        Random number generator used by the agent (and able to spawn child streams, via `rng.spawn(n)`)
+
+    Methods
+    -------
+    chooseAction()
+        Randomly select an action and realize its associated reward.
+    runSequence(n = 1000, print_interval = None, sink = None)
+        Run the model input n amount of times, reporting every step to a metrics sink (silent by default)
+    getActionProbabilities()
+        Returns the agent's current (uniform) policy
+    reset()
+        Reset values associated with the agent's progress
+    changeBandit(bandit)
+        Changes bandit that the agent is running on
+    """
+
+    __slots__ = ()
+    label = "Random"
+
+    def __init__(self, bandit: Bandit, seed = None) -> None:
+        """
+        Parameters
+        ----------
+        bandit : Bandit
+            Associated bandit for the agent to operate on
+        seed : None, int, np.random.SeedSequence or np.random.Generator
+            Seed for the agent's random number generator (default None)
+        """
+        super().__init__(bandit, seed)
+
+    def _selectAction(self) -> int:
+        """
+        Protected method which selects a uniformly random action
+        """
+        return int(self._uniform() * self.bandit.k)
+
+    def _selectWithPropensity(self) -> tuple:
+        """
+        Protected method which selects a uniformly random action, along with its probability 1 / k
+        """
+        return self._selectAction(), 1 / self.bandit.k
+
+    def getActionProbabilities(self) -> np.ndarray:
+        """
+        Returns the agent's current (uniform) policy
+        """
+        return np.full(self.bandit.k, 1 / self.bandit.k)
+
+
+
 
-    def __updateRewards(self, selected_action: int, selected_reward: float) -> None:
+
+
+
+
+
+class UpperConfidenceBoundAgent(ActionValueAgent):
+    """
+    Python implementation of an Upper Confidence Bound (or UCB) Agent. Extends the "ActionValueAgent" base class
+
+    Keeps sample-average reward estimates and select counts separately from the exploration bonus, and selects the action
+    with the highest score Q + bonus. The total number of pulls is tracked as a running scalar, and the scores of every
+    action are only recomputed (in one vectorized pass) once log(t) has grown by more than "refresh_tolerance" since the
+    last recompute. In between, only the selected action's score is updated, so most steps do O(1) work
+    (plus the argmax, which is O(log k) with a Max Tree).
+
+    Supported variants ("variant"):
+        - "ucb1": bonus = c * sqrt(log(t) / N)
+        - "ucb1-tuned": bonus = c * sqrt(log(t) / N * V), where V = sample variance + sqrt(2 * log(t) / N)
+            (NOTE: The min(1/4, V) cap of the original assumes rewards in [0, 1], so it is dropped for our Gaussian rewards)
+        - "kl-ucb": bonus = c * sqrt(2 * sigma^2 * log(t) / N), the closed form KL-UCB index for Gaussian rewards,
+            where sigma is the bandit's "variance" (normal distribution scale) value
+
+    ...
+
+    Attributes
+    ----------
+    bandit : Bandit
+        Associated bandit for the agent to operate on
+    label : str
+        Name of the agent used when printing its progress
+    total_points : float
+        Keeps a running total of all points across all n times "chooseAction" has been called
+    rng : np.random.Generator
+        Random number generator used by the agent (and able to spawn child streams, via `rng.spawn(n)`)
+    c : float
+        Parameter to control degree of exploration (default 0.1)
+    variant : str
+        Which UCB score to use: "ucb1", "ucb1-tuned" or "kl-ucb" (default "ucb1")
+    refresh_tolerance : float
+        Relative growth of log(t) allowed before every action's score is recomputed. 0 recomputes every step (default 0.01)
+    step_size : float
+        Constant step-size (alpha) used to update reward estimates, or None for sample averages (default None)
+    __reward_square_sums : list or np.array
+        Sum of the squared rewards received from each action (only kept for "ucb1-tuned")
+    __scores : list or np.array
+        UCB score (estimate + exploration bonus) of each action, as of log(t) = "__scores_log_t"
+    __total_pulls : int
+        Number of times any action has been selected (t)
+    argmax_tree_threshold : int
+        Number of actions above which the best score is tracked by a Max Tree (over "__scores") instead of scanned for every step
+
+    Methods
+    -------
+    chooseAction()
+        Uses UCB logic to select an action and realize its associated reward.
+        Passes this information into the (protected) updateRewards function.
+    runSequence(n = 1000, print_interval = None, sink = None)
+        Run the model input n amount of times, reporting every step to a metrics sink (silent by default)
+    getRewardEstimates()
+        Returns a copy of the agent's current reward estimates
+    getActionProbabilities()
+        Returns the agent's current policy (all probability on the action it would select next)
+    reset()
+        Reset values associated with the agent's progress
+    changeBandit(bandit)
+        Changes bandit that the agent is running on
+    """
+
+    __slots__ = ("c", "variant", "refresh_tolerance", "__reward_square_sums", "__scores", "__total_pulls", "__log_t", "__scores_log_t", "__actions_tried")
+    label = "UCB"
+    state_arrays = ActionValueAgent.state_arrays + ("reward_square_sums", "scores")
+    variants = ("ucb1", "ucb1-tuned", "kl-ucb")
+
+    def __init__(self, bandit: Bandit, c: float = 0.1, variant: str = "ucb1", refresh_tolerance: float = 0.01, step_size: float = None, seed = None, argmax_tree_threshold: int = ARGMAX_TREE_THRESHOLD) -> None:
+        """
+        Parameters
+        ----------
+        bandit : Bandit
+            Associated bandit for the agent to operate on
+        c : float
+            Parameter to control degree of exploration (default 0.1)
+        variant : str
+            Which UCB score to use: "ucb1", "ucb1-tuned" or "kl-ucb" (default "ucb1")
+        refresh_tolerance : float
+            Relative growth of log(t) allowed before every action's score is recomputed. 0 recomputes every step (default 0.01)
+        step_size : float
+            Constant step-size (alpha) for the reward estimates, between 0 and 1 (default None, for sample averages)
+        seed : None, int, np.random.SeedSequence or np.random.Generator
+            Seed for the agent's random number generator (default None)
+        argmax_tree_threshold : int
+            Number of actions above which the best score is tracked by a Max Tree instead of scanned for every step (default ARGMAX_TREE_THRESHOLD)
+
+        Raises
+        ------
+        ValueError
+            If variant is not supported, refresh_tolerance is negative or step_size is not within (0,1]
+        """
+        if variant not in self.variants:
+            raise ValueError(f"Invalid Variant, must be one of {self.variants}")
+        if refresh_tolerance < 0:
+            raise ValueError("Invalid Refresh Tolerance, must not be negative")
+        self.c = c
+        self.variant = variant
+        self.refresh_tolerance = refresh_tolerance
+        super().__init__(bandit, 0, step_size, seed, argmax_tree_threshold)
+
+    def __bonus(self, log_t: float, counts: np.ndarray, square_sums: np.ndarray = None, estimates: np.ndarray = None) -> np.ndarray:
         """
-        Private method which updates "reward_estimates" and "reward_select_counts" based on the input action, reward pair representing what action the model chose and what reward it was provided.
-        Uses "Q" value updating formula described in textbook.
+        Private method which computes the exploration bonus of every action at once
 
         Parameters
         ----------
-        selected_action : int
-            Action ID component of selected action ID/cooresponding reward pair
-        selected_reward : float
-            Reward component of selected action ID/cooresponding reward pair
+        log_t : float
+            Natural log of the total number of pulls
+        counts : np.array
+            Number of times each action has been selected (must be positive)
+        square_sums : np.array
+            Sum of each action's squared rewards (only needed for "ucb1-tuned")
+        estimates : np.array
+            Each action's reward estimate (only needed for "ucb1-tuned")
         """
-        # Using derived formulas from RL textbook
-        q = self.__reward_estimates[selected_action]
-        n = self.__reward_select_counts[selected_action]
-        if(n==0): #Action has NOT been selected before
-            self.__reward_estimates[selected_action] = selected_reward
-        else:
-            self.__reward_estimates[selected_action] = q + ( (1/n) * (selected_reward - q) )
-        self.__reward_select_counts[selected_action] += 1
+        if self.variant == "ucb1":
+            return self.c * np.sqrt(log_t / counts)
+        if self.variant == "kl-ucb":
+            sigma = getattr(self.bandit, "variance", 1)
+            return self.c * np.sqrt(2 * sigma * sigma * log_t / counts)
+        variance = np.maximum(square_sums / counts - estimates * estimates, 0) + np.sqrt(2 * log_t / counts)
+        return self.c * np.sqrt(log_t / counts * variance)
+
+    def __score(self, log_t: float, n: float, square_sum: float, q: float) -> float:
+        """
+        Private method which computes the score (estimate + exploration bonus) of a single action, with Python floats
 
-    def chooseAction(self) -> None:
+        Parameters
+        ----------
+        log_t : float
+            Natural log of the total number of pulls
+        n : float
+            Number of times the action has been selected (must be positive)
+        square_sum : float
+            Sum of the action's squared rewards (only needed for "ucb1-tuned")
+        q : float
+            The action's reward estimate
         """
-        Public method which uses Greedy logic to select an action and realize its associated reward.
-        Passes this information into the updateRewards function.
+        if self.variant == "ucb1":
+            return q + self.c * math.sqrt(log_t / n)
+        if self.variant == "kl-ucb":
+            sigma = getattr(self.bandit, "variance", 1)
+            return q + self.c * math.sqrt(2 * sigma * sigma * log_t / n)
+        variance = max(square_sum / n - q * q, 0) + math.sqrt(2 * log_t / n)
+        return q + self.c * math.sqrt(log_t / n * variance)
+
+    def __refreshScores(self) -> None:
+        """
+        Private method which recomputes every action's score at the current log(t), in one vectorized pass
         """
-        selected_action = self.__reward_estimates.argmax()
+        self.__scores_log_t = self.__log_t
+        estimates = np.asarray(self._reward_estimates, dtype=float)
+        square_sums = np.asarray(self.__reward_square_sums, dtype=float) if self.__reward_square_sums is not None else None
+        scores = estimates + self.__bonus(self.__log_t, np.asarray(self._reward_select_counts, dtype=float), square_sums, estimates)
+        if self._python_floats:
+            self.__scores = scores.tolist()
+        else:
+            self.__scores[:] = scores
+        if self._argmax_tree != None:
+            self._argmax_tree.rebuild(scores)
 
-        selected_reward = self.bandit.selectAction(selected_action) # Reward of selected action through bandit
-        self.total_points += selected_reward
-        self.__updateRewards(selected_action, selected_reward)
-    
-    def runSequence(self, n: int = 1000, print_interval: int = None) -> None:
+    def _selectAction(self) -> int:
+        """
+        Protected method which selects the action with the highest UCB score (untried actions first, in ID order)
         """
-        Run the model input n amount of times, providing print statements to indicate how it is performing
+        self.__total_pulls += 1
+        self.__log_t = math.log(self.__total_pulls)
+
+        if self.__actions_tried < self.bandit.k:
+            # Select actions where Nt(a) = 0 first, as textbook describes (to consider them "maximizing").
+            # Untried actions are always selected in ID order, so the first untried action is simply the number tried so far
+            return self.__actions_tried
+        if self.__scores_log_t == None or self.__log_t > self.__scores_log_t * (1 + self.refresh_tolerance):
+            self.__refreshScores()
+        if self._argmax_tree != None:
+            return self._argmax_tree.argmax()
+        scores = self.__scores
+        if self._python_floats:
+            return scores.index(max(scores))
+        return scores.argmax()
+
+    def _updateRewards(self, selected_action: int, selected_reward: float) -> None:
+        """
+        Protected method which updates "reward_estimates" and "reward_select_counts" based on the input action, reward pair representing what action the model chose and what reward it was provided.
+        Uses the sample-average (or constant step-size) "Q" value updating formula described in textbook, then rescores the selected action.
 
         Parameters
         ----------
-        n : int
-            Number of times to call "chooseAction()" (default 1000)
-        print_interval : float
-            Interval between which to print current reward estimate (default None)
+        selected_action : int
+            Action ID component of selected action ID/cooresponding reward pair
+        selected_reward : float
+            Reward component of selected action ID/cooresponding reward pair
+        """
+        counts = self._reward_select_counts
+        estimates = self._reward_estimates
+        n = counts[selected_action] + 1
+        counts[selected_action] = n
+        q = estimates[selected_action]
+        q += (selected_reward - q) * (self.step_size if self.step_size != None else 1 / n)
+        estimates[selected_action] = q
+        square_sum = None
+        if self.__reward_square_sums is not None:
+            square_sum = self.__reward_square_sums[selected_action] + selected_reward * selected_reward
+            self.__reward_square_sums[selected_action] = square_sum
+        if n == 1: # Action had NOT been selected before
+            self.__actions_tried += 1
+        if self.__scores_log_t != None:
+            # Other actions' scores are as of "__scores_log_t", so the selected action is rescored at the same log(t)
+            score = self.__score(self.__scores_log_t, n, square_sum, q)
+            self.__scores[selected_action] = score
+            if self._argmax_tree != None:
+                self._argmax_tree.update(selected_action, score)
+
+    def getActionProbabilities(self) -> np.ndarray:
+        """
+        Returns the agent's current policy, which puts all probability on the action its next selection would pick (scored
+        exactly as "_selectAction" would, without advancing the pull count)
         """
-        for i in range(1,n+1):
-            self.chooseAction()
-            if print_interval != None and i % print_interval == 0:
-                print(f"Greedy Reward Estimate at Step #{i}: {self.__reward_estimates}")
-        print(f"FINAL Greedy Reward Estimate: {self.__reward_estimates}")
-        print(f"Total Greedy Points: {self.total_points}")
-        print("-----------------------------------------------------")
+        probabilities = np.zeros(self.bandit.k)
+        if self.__actions_tried < self.bandit.k:
+            probabilities[self.__actions_tried] = 1
+            return probabilities
+        log_t = math.log(self.__total_pulls + 1)
+        if self.__scores_log_t == None or log_t > self.__scores_log_t * (1 + self.refresh_tolerance):
+            estimates = np.asarray(self._reward_estimates, dtype=float)
+            square_sums = np.asarray(self.__reward_square_sums, dtype=float) if self.__reward_square_sums is not None else None
+            scores = estimates + self.__bonus(log_t, np.asarray(self._reward_select_counts, dtype=float), square_sums, estimates)
+        else:
+            scores = np.asarray(self.__scores, dtype=float)
+        probabilities[scores.argmax()] = 1
+        return probabilities
 
     def reset(self) -> None:
         """
-        Reset values associated with the agent's progress
+        Reset values associated with the agent's progress, (re)allocating every per-action value for the current bandit
         """
-        self.total_points = 0
-        self.__reward_estimates.fill(0)
-        self.__reward_select_counts.fill(0)
-    
-    def changeBandit(self, bandit: Bandit) -> None:
+        super().reset()
+        k = self.bandit.k
+        tuned = self.variant == "ucb1-tuned"
+        if self._python_floats:
+            self.__reward_square_sums = [0.0] * k if tuned else None
+            self.__scores = [0.0] * k
+        else:
+            self.__reward_square_sums = np.zeros(k) if tuned else None
+            self.__scores = np.zeros(k)
+        self.__total_pulls = 0
+        self.__log_t = 0.0
+        self.__scores_log_t = None
+        self.__actions_tried = 0
+        self._argmax_tree = MaxTree(np.zeros(k)) if k > self.argmax_tree_threshold else None
+
+    def getState(self) -> dict:
         """
-        Updates the model information to run on the new input bandit
+        Returns the Action Value Agent state, plus the scores, squared reward sums & pull counters
+        """
+        return {**super().getState(), "reward_square_sums": self.__reward_square_sums, "scores": self.__scores, "total_pulls": self.__total_pulls,
+                "log_t": self.__log_t, "scores_log_t": self.__scores_log_t, "actions_tried": self.__actions_tried}
+
+    def setState(self, state: dict) -> None:
+        """
+        Restores a state returned by "getState", rebuilding the Max Tree (if any) from the restored scores
 
         Parameters
         ----------
-        bandit : Bandit
-            New bandit you want the agent to operate on
-        """
-        self.reset()
-        self.bandit = bandit
-        self.__reward_estimates.resize(bandit.k)
-        self.__reward_select_counts.resize(bandit.k)
+        state : dict
+            State returned by "getState" (a missing "scores_log_t" means the scores were never computed)
 
+        Raises
+        ------
+        ValueError
+            If the state has a different number of actions
+        """
+        super().setState(state)
+        square_sums = state.get("reward_square_sums")
+        if self._python_floats:
+            self.__reward_square_sums = np.asarray(square_sums, dtype=float).tolist() if square_sums is not None else None
+            self.__scores = np.asarray(state["scores"], dtype=float).tolist()
+        else:
+            self.__reward_square_sums = np.asarray(square_sums, dtype=float) if square_sums is not None else None
+            self.__scores = np.asarray(state["scores"], dtype=float)
+        self.__total_pulls = int(state["total_pulls"])
+        self.__log_t = float(state["log_t"])
+        self.__scores_log_t = float(state["scores_log_t"]) if state.get("scores_log_t") is not None else None
+        self.__actions_tried = int(state["actions_tried"])
+        self._argmax_tree = MaxTree(self.__scores) if self.bandit.k > self.argmax_tree_threshold else None
 
 
 
@@ -454,9 +1136,18 @@ class GreedyAgent:
 
 
 
-class RandomAgent:
+class ThompsonSamplingAgent(Agent):
     """
-    Python implementation of a Random Agent
+    Python implementation of a Thompson Sampling Agent. Extends the "Agent" base class
+
+    Keeps a conjugate posterior over every action's mean reward as plain arrays, draws one sample from every posterior in
+    a single vectorized call each step, and selects the action with the highest sample. Only the selected action's
+    posterior changes after a step, so updates are O(1).
+
+    Supported posterior models ("model"):
+        - "normal": Normal prior & Gaussian rewards of known noise variance (the bandit's "variance" (scale) value squared,
+            unless "noise_variance" is given). Kept as posterior means & standard deviations
+        - "bernoulli": Beta(1, 1) prior & binary rewards, for a BernoulliBandit. Kept as alpha & beta counts
 
     ...
 
@@ -464,75 +1155,258 @@ class RandomAgent:
     ----------
     bandit : Bandit
         Associated bandit for the agent to operate on
+    label : str
+        Name of the agent used when printing its progress
     total_points : float
         Keeps a running total of all points across all n times "chooseAction" has been called
-    
+    rng : np.random.Generator
+        Random number generator used by the agent (and able to spawn child streams, via `rng.spawn(n)`)
+    model : str
+        Which posterior to keep: "normal" or "bernoulli" (default None, for "bernoulli" on a BernoulliBandit and "normal" otherwise)
+    prior_mean : float
+        Mean of the Normal prior over every action's reward (default 0)
+    prior_variance : float
+        Variance of the Normal prior over every action's reward (default 100)
+    noise_variance : float
+        Known variance of the rewards around their action's mean (default None, for the bandit's "variance" value squared)
+    __posterior_means : np.array
+        Posterior mean of each action's reward ("normal" model)
+    __posterior_stds : np.array
+        Posterior standard deviation of each action's reward ("normal" model)
+    __posterior_precisions : np.array
+        Posterior precision (1 / variance) of each action's reward ("normal" model)
+    __alphas : np.array
+        Beta posterior alpha (1 + number of rewards of 1) of each action ("bernoulli" model)
+    __betas : np.array
+        Beta posterior beta (1 + number of rewards of 0) of each action ("bernoulli" model)
+    __samples : np.array
+        Preallocated buffer the posterior samples of every step are drawn into ("normal" model)
+    __propensity_rng : np.random.Generator
+        Stream spawned from "rng" which the propensities of logged selections are estimated from, so the agent's own draws
+        are left untouched
+
     Methods
     -------
     chooseAction()
-        Randomly select an action and realize its associated reward.
-    runSequence(n = 1000)
-        Run the model input n amount of times, providing a final print statement to indicate how it performed
+        Uses Thompson Sampling logic to select an action and realize its associated reward.
+        Passes this information into the (protected) updateRewards function.
+    runSequence(n = 1000, print_interval = None, sink = None)
+        Run the model input n amount of times, reporting every step to a metrics sink (silent by default)
+    getRewardEstimates()
+        Returns a copy of the agent's current reward estimates (posterior means)
+    getActionProbabilities()
+        Returns a Monte Carlo estimate of the agent's current policy
     reset()
         Reset values associated with the agent's progress
     changeBandit(bandit)
         Changes bandit that the agent is running on
     """
 
-    total_points = 0
+    __slots__ = ("model", "prior_mean", "prior_variance", "noise_variance", "__model", "__noise_precision", "__posterior_means",
+                 "__posterior_stds", "__posterior_precisions", "__samples", "__alphas", "__betas", "__propensity_rng")
+    label = "Thompson Sampling"
+    state_arrays = ("posterior_means", "posterior_stds", "posterior_precisions", "alphas", "betas")
+    models = ("normal", "bernoulli")
+    # Number of posterior draws each logged selection's propensity is estimated from
+    propensity_samples = 1000
 
-    def __init__(self, bandit: Bandit) -> None:
+    def __init__(self, bandit: Bandit, model: str = None, prior_mean: float = 0, prior_variance: float = 100, noise_variance: float = None, seed = None) -> None:
         """
         Parameters
         ----------
         bandit : Bandit
             Associated bandit for the agent to operate on
+        model : str
+            Which posterior to keep: "normal" or "bernoulli" (default None, for "bernoulli" on a BernoulliBandit and "normal" otherwise)
+        prior_mean : float
+            Mean of the Normal prior over every action's reward (default 0)
+        prior_variance : float
+            Variance of the Normal prior over every action's reward (default 100)
+        noise_variance : float
+            Known variance of the rewards around their action's mean (default None, for the bandit's "variance" value squared)
+        seed : None, int, np.random.SeedSequence or np.random.Generator
+            Seed for the agent's random number generator (default None)
+
+        Raises
+        ------
+        ValueError
+            If model is not supported, or prior_variance or noise_variance is not positive
         """
-        self.bandit = bandit
-
-    def chooseAction(self) -> None:
+        if model != None and model not in self.models:
+            raise ValueError(f"Invalid Model, must be one of {self.models}")
+        if prior_variance <= 0:
+            raise ValueError("Invalid Prior Variance, must be positive")
+        if noise_variance != None and noise_variance <= 0:
+            raise ValueError("Invalid Noise Variance, must be positive")
+        self.model = model
+        self.prior_mean = prior_mean
+        self.prior_variance = prior_variance
+        self.noise_variance = noise_variance
+        super().__init__(bandit, seed)
+
+    def __allocate(self) -> None:
         """
-        Public method which randomly selects an action and realizes its associated reward.
+        Private method which (re)allocates the posterior arrays for the current bandit
         """
         k = self.bandit.k
-        selected_action = 0
+        if self.model == None:
+            self.__model = "bernoulli" if isinstance(self.bandit, BernoulliBandit) else "normal"
+        else:
+            self.__model = self.model
+        if self.__model == "normal":
+            noise_variance = self.noise_variance if self.noise_variance != None else self.bandit.variance ** 2
+            self.__noise_precision = 1 / noise_variance
+            self.__posterior_means = np.empty(k)
+            self.__posterior_stds = np.empty(k)
+            self.__posterior_precisions = np.empty(k)
+            self.__samples = np.empty(k)
+        else:
+            self.__alphas = np.empty(k)
+            self.__betas = np.empty(k)
 
-        selected_action = np.random.randint(0,k)
+    def _updateRewards(self, selected_action: int, selected_reward: float) -> None:
+        """
+        Protected method which updates the selected action's posterior with the reward it provided (conjugate update)
 
-        selected_reward = self.bandit.selectAction(selected_action) # Reward of selected action through bandit
-        self.total_points += selected_reward
+        Parameters
+        ----------
+        selected_action : int
+            Action ID component of selected action ID/cooresponding reward pair
+        selected_reward : float
+            Reward component of selected action ID/cooresponding reward pair
+        """
+        if self.__model == "normal":
+            precision = self.__posterior_precisions[selected_action]
+            new_precision = precision + self.__noise_precision
+            mean = self.__posterior_means[selected_action]
+            self.__posterior_means[selected_action] = mean + (self.__noise_precision / new_precision) * (selected_reward - mean)
+            self.__posterior_precisions[selected_action] = new_precision
+            self.__posterior_stds[selected_action] = 1 / math.sqrt(new_precision)
+        elif selected_reward > 0:
+            self.__alphas[selected_action] += 1
+        else:
+            self.__betas[selected_action] += 1
 
-    def runSequence(self, n: int = 1000) -> None:
+    def _selectAction(self) -> int:
+        """
+        Protected method which draws one sample from every action's posterior (in a single call), and selects the highest
         """
-        Run the model input n amount of times, providing a final print statement to indicate how it performed
+        if self.__model == "normal":
+            samples = self.__samples
+            self.rng.standard_normal(out = samples)
+            samples *= self.__posterior_stds
+            samples += self.__posterior_means
+        else:
+            samples = self.rng.beta(self.__alphas, self.__betas)
+        return samples.argmax()
+
+    def _selectWithPropensity(self) -> tuple:
+        """
+        Protected method which selects an action as "_selectAction" does, along with a Monte Carlo estimate of its probability:
+        the share of "propensity_samples" posterior draws (from the agent's propensity stream) whose highest sample is the
+        selected action, counting the selection's own draw so it is never 0
+        """
+        selected_action = self._selectAction()
+        rng = self.__propensity_rng
+        k = self.bandit.k
+        samples = self.propensity_samples
+        hits = 0
+        rows = max(1, 2**20 // k) # Draws are made in blocks of about 2**20 values, to bound memory for large k
+        for start in range(0, samples, rows):
+            m = min(rows, samples - start)
+            if self.__model == "normal":
+                draws = rng.standard_normal((m, k)) * self.__posterior_stds + self.__posterior_means
+            else:
+                draws = rng.beta(self.__alphas, self.__betas, size = (m, k))
+            hits += np.count_nonzero(draws.argmax(axis = 1) == selected_action)
+        return selected_action, (hits + 1) / (samples + 1)
+
+    def getRewardEstimates(self) -> np.ndarray:
+        """
+        Returns a copy of the agent's current reward estimates (posterior means)
+        """
+        if self.__model == "normal":
+            return self.__posterior_means.copy()
+        return self.__alphas / (self.__alphas + self.__betas)
+
+    def getActionProbabilities(self, samples: int = 10000, seed = None) -> np.ndarray:
+        """
+        Returns a Monte Carlo estimate of the agent's current policy (the chance of each action's posterior sample being the
+        highest), from a separate random number generator so the agent's own draws are left untouched
 
         Parameters
         ----------
-        n : int
-            Number of times to call "chooseAction()" (default 1000)
+        samples : int
+            Number of posterior draws per action to estimate the policy from (default 10000)
+        seed : None, int, np.random.SeedSequence or np.random.Generator
+            Seed for the estimate's random number generator (default None)
         """
-        for i in range(1,n+1):
-            self.chooseAction()
-        print(f"Total Random Points: {self.total_points}")
-        print("-----------------------------------------------------")
-    
+        rng = makeGenerator(seed)
+        k = self.bandit.k
+        counts = np.zeros(k)
+        rows = max(1, 2**20 // k) # Draws are made in blocks of about 2**20 values, to bound memory for large k
+        for start in range(0, samples, rows):
+            m = min(rows, samples - start)
+            if self.__model == "normal":
+                draws = rng.standard_normal((m, k)) * self.__posterior_stds + self.__posterior_means
+            else:
+                draws = rng.beta(self.__alphas, self.__betas, size = (m, k))
+            counts += np.bincount(draws.argmax(axis = 1), minlength = k)
+        return counts / samples
+
     def reset(self) -> None:
         """
-        Reset values associated with the agent's progress
+        Reset values associated with the agent's progress, (re)allocating the posteriors for the current bandit
         """
-        self.total_points = 0
+        super().reset()
+        self.__allocate()
+        self.__propensity_rng = self.rng.spawn(1)[0]
+        if self.__model == "normal":
+            self.__posterior_means.fill(self.prior_mean)
+            self.__posterior_precisions.fill(1 / self.prior_variance)
+            self.__posterior_stds.fill(math.sqrt(self.prior_variance))
+        else:
+            self.__alphas.fill(1)
+            self.__betas.fill(1)
 
-    def changeBandit(self, bandit: Bandit) -> None:
+    def getState(self) -> dict:
         """
-        Updates the model information to run on the new input bandit
+        Returns the Agent state, plus the posterior arrays of the agent's model and the propensity stream's state
+        """
+        if self.__model == "normal":
+            posterior = {"posterior_means": self.__posterior_means, "posterior_stds": self.__posterior_stds, "posterior_precisions": self.__posterior_precisions}
+        else:
+            posterior = {"alphas": self.__alphas, "betas": self.__betas}
+        return {**super().getState(), "model": self.__model, **posterior, "propensity_rng": self.__propensity_rng.bit_generator.state}
+
+    def setState(self, state: dict) -> None:
+        """
+        Restores a state returned by "getState"
 
         Parameters
         ----------
-        bandit : Bandit
-            New bandit you want the agent to operate on
+        state : dict
+            State returned by "getState"
+
+        Raises
+        ------
+        ValueError
+            If the state is of a different model or number of actions
         """
-        self.reset()
-        self.bandit = bandit
+        if state["model"] != self.__model:
+            raise ValueError("Invalid State, posterior model does not match")
+        arrays = ("posterior_means", "posterior_stds", "posterior_precisions") if self.__model == "normal" else ("alphas", "betas")
+        if any(len(state[name]) != self.bandit.k for name in arrays):
+            raise ValueError("Invalid State, number of actions does not match")
+        super().setState(state)
+        self.__propensity_rng.bit_generator.state = state["propensity_rng"]
+        if self.__model == "normal":
+            self.__posterior_means = np.asarray(state["posterior_means"], dtype=float)
+            self.__posterior_stds = np.asarray(state["posterior_stds"], dtype=float)
+            self.__posterior_precisions = np.asarray(state["posterior_precisions"], dtype=float)
+        else:
+            self.__alphas = np.asarray(state["alphas"], dtype=float)
+            self.__betas = np.asarray(state["betas"], dtype=float)
 
 
 
@@ -542,9 +1416,27 @@ class RandomAgent:
 
 
 
-class UpperConfidenceBoundAgent:
+class GradientBanditAgent(Agent):
     """
-    Python implementation of an Upper Confidence Bound (or UCB) Agent
+    Python implementation of a Gradient Bandit Agent. Extends the "Agent" base class
+
+    Keeps a numerical preference H for every action and selects actions from the softmax policy pi = exp(H) / sum(exp(H)).
+    After each step, with baseline R_bar (the average of all previous rewards), the textbook update is:
+        H[A] += alpha * (R - R_bar) * (1 - pi[A])
+        H[b] -= alpha * (R - R_bar) * pi[b]  (for every other action b)
+
+    By default, this update is applied exactly: pi is recomputed every step with a stable log-sum-exp (subtracting the
+    largest preference) and sampled by a binary search of its cumulative sum, which is O(k) per step.
+
+    With "approximate_softmax" and above "softmax_tree_threshold" actions, each other action's pi[b] is instead
+    approximated by their average (1 - pi[A]) / (k - 1). This is not the gradient update: every other action loses the
+    same preference, where the exact update takes the most from the likeliest actions, so the policy concentrates more
+    slowly. In exchange, the update of every other action becomes a single shift, which is kept as a lazy scalar
+    decrement "D" (the true preferences are H - D) and never changes the policy, since the softmax ignores shifts shared
+    by every action. Only the selected action's weight exp(H[A] - m) then changes, so the softmax
+    normalizer is kept incrementally by a Sum Tree of weights, which also samples the next action, both in O(log k).
+    Every "refresh_interval" steps (or as soon as a weight risks overflowing), the weights are recomputed from the
+    preferences with a stable log-sum-exp, so rounding errors in the incremental sums can not drift.
 
     ...
 
@@ -552,56 +1444,112 @@ class UpperConfidenceBoundAgent:
     ----------
     bandit : Bandit
         Associated bandit for the agent to operate on
+    label : str
+        Name of the agent used when printing its progress
     total_points : float
         Keeps a running total of all points across all n times "chooseAction" has been called
-    c : float
-        Parameter to control degree of exploration (default 1)
-    __reward_estimates : np.array
-        Estimated value of each action's reward based on prior experience, where:
-            - index = action ID
-            - value = estimated cooresponding reward (using UCB based logic)
-    __reward_select_counts : np.array
-        Array that keeps track of how many times each action has been selected, where:
+    rng : np.random.Generator
+        Random number generator used by the agent (and able to spawn child streams, via `rng.spawn(n)`)
+    alpha : float
+        Step-size of the preference updates (default 0.1)
+    baseline : bool
+        Whether rewards are compared against the average reward, rather than 0 (default True)
+    softmax_tree_threshold : int
+        Number of actions above which an approximate policy is kept as a Sum Tree of lazily updated weights (default SOFTMAX_TREE_THRESHOLD)
+    refresh_interval : int
+        Number of steps between stable recomputes of the Sum Tree's weights (default 1000)
+    approximate_softmax : bool
+        Whether, above "softmax_tree_threshold" actions, the update of every other action is approximated by a shared shift
+        so the policy can be kept in a Sum Tree in O(log k) per step (default False, which keeps the exact O(k) update)
+    __preferences : np.array
+        Preference of each action (minus "__decrement", when a Sum Tree is used), where:
             - index = action ID
-            - value = num times action has been selected
-    
+            - value = cooresponding preference
+    __decrement : float
+        Lazy decrement shared by every action's preference (only used with a Sum Tree)
+    __offset : float
+        Preference "m" subtracted before exponentiating into the Sum Tree's weights, so they can not overflow
+    __average_reward : float
+        Average of every reward received so far (the baseline)
+    __sum_tree : SumTree
+        Sum Tree over exp(preferences - offset) (None unless "approximate_softmax" is set and k is above "softmax_tree_threshold")
+    __probabilities : np.array
+        Softmax policy computed by the last selection (only used without a Sum Tree)
+    __probabilities_step : int
+        Number of updates made when "__probabilities" was computed, so it is only reused while the preferences are unchanged
+
     Methods
     -------
     chooseAction()
-        Uses Epsilon-Greedy logic to select an action and realize its associated reward.
-        Passes this information into the (private) updateRewards function.
-    runSequence(n = 1000, print_interval = None)
-        Run the model input n amount of times, providing print statements to indicate how it is performing
+        Uses Gradient Bandit logic to select an action and realize its associated reward.
+        Passes this information into the (protected) updateRewards function.
+    runSequence(n = 1000, print_interval = None, sink = None)
+        Run the model input n amount of times, reporting every step to a metrics sink (silent by default)
+    getPreferences()
+        Returns a copy of the agent's current action preferences
+    getActionProbabilities()
+        Returns the agent's current softmax policy
     reset()
         Reset values associated with the agent's progress
     changeBandit(bandit)
         Changes bandit that the agent is running on
     """
 
-    total_points = 0
+    __slots__ = ("alpha", "baseline", "softmax_tree_threshold", "refresh_interval", "approximate_softmax", "__preferences", "__decrement", "__offset",
+                 "__average_reward", "__steps", "__sum_tree", "__until_refresh", "__probabilities", "__probabilities_step")
+    label = "Gradient Bandit"
+    state_arrays = ("preferences",)
 
-    def __init__(self, bandit: Bandit, c: float = 0.1) -> None:
+    def __init__(self, bandit: Bandit, alpha: float = 0.1, baseline: bool = True, seed = None, softmax_tree_threshold: int = SOFTMAX_TREE_THRESHOLD, refresh_interval: int = 1000, approximate_softmax: bool = False) -> None:
         """
         Parameters
         ----------
         bandit : Bandit
             Associated bandit for the agent to operate on
-        c : float
-            Parameter to control degree of exploration (default 1)
+        alpha : float
+            Step-size of the preference updates (default 0.1)
+        baseline : bool
+            Whether rewards are compared against the average reward, rather than 0 (default True)
+        seed : None, int, np.random.SeedSequence or np.random.Generator
+            Seed for the agent's random number generator (default None)
+        softmax_tree_threshold : int
+            Number of actions above which an approximate policy is kept as a Sum Tree of lazily updated weights (default SOFTMAX_TREE_THRESHOLD)
+        refresh_interval : int
+            Number of steps between stable recomputes of the Sum Tree's weights (default 1000)
+        approximate_softmax : bool
+            Whether, above "softmax_tree_threshold" actions, the update of every other action is approximated by a shared shift
+            so the policy can be kept in a Sum Tree in O(log k) per step (default False, which keeps the exact O(k) update)
+
+        Raises
+        ------
+        ValueError
+            If alpha or refresh_interval is not positive
         """
-        self.bandit = bandit
-        self.c = c
-        # TODO: See if there is a better way to do this, maybe in one function. I attempted this, but it lead to very loose, inaccurate floating point problems with the arrays
-        # However, for now, this provides desired behavior without issue.
-        self.__reward_estimates = np.array([])
-        self.__reward_select_counts = np.array([])
-        self.__reward_estimates.resize(bandit.k)
-        self.__reward_select_counts.resize(bandit.k)
+        if alpha <= 0:
+            raise ValueError("Invalid Alpha, must be positive")
+        if refresh_interval < 1:
+            raise ValueError("Invalid Refresh Interval, must be positive")
+        self.alpha = alpha
+        self.baseline = baseline
+        self.softmax_tree_threshold = softmax_tree_threshold
+        self.refresh_interval = refresh_interval
+        self.approximate_softmax = approximate_softmax
+        super().__init__(bandit, seed)
+
+    def __refreshWeights(self) -> None:
+        """
+        Private method which folds the lazy decrement into the preferences and recomputes every Sum Tree weight,
+        subtracting the largest preference first (log-sum-exp trick) so no weight can overflow
+        """
+        self.__preferences -= self.__decrement
+        self.__decrement = 0.0
+        self.__offset = float(self.__preferences.max())
+        self.__sum_tree.rebuild(np.exp(self.__preferences - self.__offset))
+        self.__until_refresh = self.refresh_interval
 
-    def __updateRewards(self, selected_action: int, selected_reward: float) -> None:
+    def _updateRewards(self, selected_action: int, selected_reward: float) -> None:
         """
-        Private method which updates "reward_estimates" and "reward_select_counts" based on the input action, reward pair representing what action the model chose and what reward it was provided.
-        Uses "Q" value updating formula described in textbook.
+        Protected method which updates "preferences" and the baseline based on the input action, reward pair representing what action the model chose and what reward it was provided.
 
         Parameters
         ----------
@@ -610,67 +1558,128 @@ class UpperConfidenceBoundAgent:
         selected_reward : float
             Reward component of selected action ID/cooresponding reward pair
         """
-        # Using derived formulas from RL textbook
-        q = self.__reward_estimates[selected_action]
-        n = self.__reward_select_counts[selected_action]
-        if(n==0): #Action has NOT been selected before
-            self.__reward_estimates[selected_action] = selected_reward
+        self.__steps += 1
+        if not self.baseline:
+            advantage = self.alpha * selected_reward
+        elif self.__steps == 1: # The first reward is its own baseline
+            advantage = 0.0
+        else:
+            advantage = self.alpha * (selected_reward - self.__average_reward)
+        self.__average_reward += (selected_reward - self.__average_reward) / self.__steps
+        if advantage == 0:
+            return
+
+        # The policy is taken as of the update, so delayed updates (or updates with no selection at all) use the right one
+        if self.__sum_tree == None:
+            if self.__probabilities_step == self.__steps - 1: # No update since the last selection, so its policy is current
+                probabilities = self.__probabilities
+            else:
+                weights = np.exp(self.__preferences - self.__preferences.max())
+                probabilities = weights / weights.sum()
+            self.__preferences -= advantage * probabilities
+            self.__preferences[selected_action] += advantage
+            return
+
+        # Approximation: every other action shares the shift advantage * (1 - pi[A]) / (k - 1), applied lazily through the decrement
+        probability = self.__sum_tree.weight(selected_action) / self.__sum_tree.total()
+        shift = advantage * (1 - probability) / max(self.bandit.k - 1, 1)
+        self.__decrement += shift
+        preference = self.__preferences[selected_action] + advantage * (1 - probability) + shift
+        self.__preferences[selected_action] = preference
+        self.__until_refresh -= 1
+        if self.__until_refresh == 0 or preference - self.__offset > 500:
+            self.__refreshWeights()
         else:
-            self.__reward_estimates[selected_action] = q + ( self.c * np.sqrt( (np.log(self.__reward_select_counts.sum()) / (n) )) )
-        self.__reward_select_counts[selected_action] += 1
+            self.__sum_tree.update(selected_action, math.exp(preference - self.__offset))
 
-    def chooseAction(self) -> None:
+    def _selectAction(self) -> int:
         """
-        Public method which uses UCB logic to select an action and realize its associated reward.
-        Passes this information into the updateRewards function.
+        Protected method which samples an action from the softmax policy
         """
+        return self._selectWithPropensity()[0]
 
-        if(not np.all(self.__reward_estimates)): #Select actions where Nt(a) = 0 first, as textbook describes (to consider them "maximizing")
-            selected_action = np.where(self.__reward_estimates==0)[0][0]
+    def _selectWithPropensity(self) -> tuple:
+        """
+        Protected method which samples an action from the softmax policy, along with its probability pi[A]
+        """
+        if self.__sum_tree != None:
+            tree = self.__sum_tree
+            total = tree.total()
+            selected_action = tree.find(self._uniform() * total)
+            probability = tree.weight(selected_action) / total
         else:
-            selected_action = self.__reward_estimates.argmax()
-
-        selected_reward = self.bandit.selectAction(selected_action) # Reward of selected action through bandit
-        self.total_points += selected_reward
-        self.__updateRewards(selected_action, selected_reward)
-    
-    def runSequence(self, n: int = 1000, print_interval: int = None) -> None:
+            weights = np.exp(self.__preferences - self.__preferences.max())
+            cumulative = weights.cumsum()
+            selected_action = min(int(cumulative.searchsorted(self._uniform() * cumulative[-1], side="right")), self.bandit.k - 1)
+            self.__probabilities = weights / cumulative[-1]
+            self.__probabilities_step = self.__steps
+            probability = float(self.__probabilities[selected_action])
+        return selected_action, probability
+
+    def getPreferences(self) -> np.ndarray:
         """
-        Run the model input n amount of times, providing print statements to indicate how it is performing
+        Returns a copy of the agent's current action preferences
+        """
+        if self.__sum_tree != None:
+            return self.__preferences - self.__decrement
+        return self.__preferences.copy()
 
-        Parameters
-        ----------
-        n : int
-            Number of times to call "chooseAction()" (default 1000)
-        print_interval : float
-            Interval between which to print current reward estimate (default None)
+    def getActionProbabilities(self) -> np.ndarray:
+        """
+        Returns the agent's current softmax policy (the probability of selecting each action)
         """
-        for i in range(1,n+1):
-            self.chooseAction()
-            if print_interval != None and i % print_interval == 0:
-                print(f"UCB Reward Estimate at Step #{i}: {self.__reward_estimates}")
-        print(f"FINAL UCB Reward Estimate: {self.__reward_estimates}")
-        print(f"Total UCB Points: {self.total_points}")
-        print("-----------------------------------------------------")
+        preferences = self.getPreferences()
+        weights = np.exp(preferences - preferences.max())
+        return weights / weights.sum()
 
     def reset(self) -> None:
         """
-        Reset values associated with the agent's progress
+        Reset values associated with the agent's progress, (re)allocating the preferences for the current bandit
         """
-        self.total_points = 0
-        self.__reward_estimates.fill(0)
-        self.__reward_select_counts.fill(0)
+        super().reset()
+        self.__steps = 0
+        self.__probabilities_step = -1
+        self.__average_reward = 0.0
+        self.__preferences = np.zeros(self.bandit.k)
+        self.__decrement = 0.0
+        if self.approximate_softmax and self.bandit.k > self.softmax_tree_threshold:
+            self.__sum_tree = SumTree(np.ones(self.bandit.k))
+            self.__refreshWeights()
+        else:
+            self.__sum_tree = None
 
-    def changeBandit(self, bandit: Bandit) -> None:
+    def getState(self) -> dict:
         """
-        Updates the model information to run on the new input bandit
+        Returns the Agent state, plus the preferences, baseline and (with a Sum Tree) lazy decrement & exact partial sums
+        """
+        state = {**super().getState(), "preferences": self.__preferences, "average_reward": self.__average_reward, "steps": self.__steps}
+        if self.__sum_tree != None:
+            state.update(decrement=self.__decrement, offset=self.__offset, until_refresh=self.__until_refresh, tree_sums=self.__sum_tree.getState())
+        return state
+
+    def setState(self, state: dict) -> None:
+        """
+        Restores a state returned by "getState"
 
         Parameters
         ----------
-        bandit : Bandit
-            New bandit you want the agent to operate on
+        state : dict
+            State returned by "getState"
+
+        Raises
+        ------
+        ValueError
+            If the state has a different number of actions
         """
-        self.reset()
-        self.bandit = bandit
-        self.__reward_estimates.resize(bandit.k)
-        self.__reward_select_counts.resize(bandit.k)
\ No newline at end of file
+        if len(state["preferences"]) != self.bandit.k:
+            raise ValueError("Invalid State, number of actions does not match")
+        super().setState(state)
+        self.__preferences = np.asarray(state["preferences"], dtype=float)
+        self.__average_reward = float(state["average_reward"])
+        self.__steps = int(state["steps"])
+        self.__probabilities_step = -1
+        if self.__sum_tree != None:
+            self.__decrement = float(state["decrement"])
+            self.__offset = float(state["offset"])
+            self.__until_refresh = int(state["until_refresh"])
+            self.__sum_tree.setState(state["tree_sums"])
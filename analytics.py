@@ -0,0 +1,373 @@
+"""
+Analytics Source File
+
+Regret & optimal-action analytics over result sets of any size: given the actions (and rewards) of many runs, and the
+true action values of their bandits, this computes per-step (or per-bin) learning curves across runs with confidence
+bands, plus how each run spread its pulls over the arms.
+
+Curves are aggregated across runs:
+    - mean_reward : mean reward received in each bin
+    - percent_optimal : percentage of the bin's steps where an optimal action was selected
+    - cumulative_regret : total regret (best true action value - selected action's true value) by the end of each bin
+    - pull_fractions : fraction of a run's pulls given to each arm (by action ID)
+    - pull_fractions_by_rank : the same, with arms ordered from best to worst true value in each run (so runs on
+      different bandits line up, ex: entry 0 is the fraction of pulls given to the best arm)
+
+Everything is computed with vectorized reductions over blocks of (runs x steps), so inputs larger than memory
+(np.memmap arrays, or trajectory logs) are streamed one block at a time. Each block's statistics are merged into running
+per-bin counts, means & sums of squared deviations (Welford / Chan et al.), which can themselves be combined across
+result sets computed separately (ex: by different worker processes) with "combineAnalyses".
+
+Confidence bands are normal approximations of the mean across runs, at each bin.
+
+Requires `numpy` to be installed, and the trajectories source file to be imported correctly.
+
+Usage:
+    analysis = analyzeRuns(actions, true_values, rewards, bin_size = 10) # (runs, n) arrays, (k,) or (runs, k) values
+    lower, upper = analysis["cumulative_regret"].band(0.95)
+    printAnalysis(analysis)
+"""
+
+from statistics import NormalDist
+
+import numpy as np
+from trajectories import TrajectoryReader
+
+CURVES = ("mean_reward", "percent_optimal", "cumulative_regret")
+DISTRIBUTIONS = ("pull_fractions", "pull_fractions_by_rank")
+
+
+class CurveStatistics:
+    """
+    Running count, mean & sum of squared deviations of every entry of a curve across runs, merged one block of runs at a
+    time (Chan et al.), so curves of any number of runs are aggregated in bounded memory
+
+    ...
+
+    Attributes
+    ----------
+    count : np.array
+        Number of runs merged into each entry
+    mean : np.array
+        Mean of each entry across the runs
+    m2 : np.array
+        Sum of squared deviations from the mean of each entry
+
+    Methods
+    -------
+    merge(values, start = 0)
+        Merges a block of runs' values of entries [start, start + values.shape[1])
+    combine(other)
+        Merges another Curve Statistics of the same size (ex: computed by another process)
+    std()
+        Returns the standard deviation of each entry across runs
+    band(level = 0.95)
+        Returns the (lower, upper) normal confidence band of the mean of each entry
+    """
+
+    def __init__(self, size: int) -> None:
+        """
+        Parameters
+        ----------
+        size : int
+            Number of entries of the curve
+        """
+        self.count = np.zeros(size, dtype=np.int64)
+        self.mean = np.zeros(size)
+        self.m2 = np.zeros(size)
+
+    def __mergeMoments(self, entries: slice, count: np.ndarray, mean: np.ndarray, m2: np.ndarray) -> None:
+        """
+        Private method which merges (count, mean, m2) moments of other runs into the input entries
+        """
+        total = self.count[entries] + count
+        delta = mean - self.mean[entries]
+        weight = np.divide(count, total, out=np.zeros(len(delta)), where=total > 0)
+        self.mean[entries] += delta * weight
+        self.m2[entries] += m2 + delta * delta * self.count[entries] * weight
+        self.count[entries] = total
+
+    def merge(self, values: np.ndarray, start: int = 0) -> None:
+        """
+        Merges a block of runs' values
+
+        Parameters
+        ----------
+        values : np.array
+            (runs, width) array of values of entries [start, start + width)
+        start : int
+            First entry the values belong to (default 0)
+        """
+        values = np.asarray(values, dtype=float)
+        if values.shape[0] == 0:
+            return
+        mean = values.mean(axis=0)
+        m2 = ((values - mean) ** 2).sum(axis=0)
+        self.__mergeMoments(slice(start, start + values.shape[1]), np.full(values.shape[1], values.shape[0]), mean, m2)
+
+    def combine(self, other: "CurveStatistics") -> None:
+        """
+        Merges another Curve Statistics of the same size (ex: computed over other runs, by another process)
+
+        Parameters
+        ----------
+        other : CurveStatistics
+            Statistics to merge in
+
+        Raises
+        ------
+        ValueError
+            If the other statistics have a different size
+        """
+        if len(other.mean) != len(self.mean):
+            raise ValueError("Invalid Statistics, sizes do not match")
+        self.__mergeMoments(slice(None), other.count, other.mean, other.m2)
+
+    def std(self) -> np.ndarray:
+        """
+        Returns the (sample) standard deviation of each entry across runs (0 for entries of fewer than 2 runs)
+        """
+        return np.sqrt(np.divide(self.m2, self.count - 1, out=np.zeros(len(self.m2)), where=self.count > 1))
+
+    def band(self, level: float = 0.95) -> tuple:
+        """
+        Returns the (lower, upper) normal confidence band of the mean of each entry
+
+        Parameters
+        ----------
+        level : float
+            Confidence level, within (0,1) (default 0.95)
+
+        Raises
+        ------
+        ValueError
+            If the level is not within (0,1)
+        """
+        if level <= 0 or level >= 1:
+            raise ValueError("Invalid Level, must be within (0,1)")
+        z = NormalDist().inv_cdf(0.5 + level / 2)
+        half_width = z * np.divide(self.std(), np.sqrt(self.count), out=np.zeros(len(self.m2)), where=self.count > 0)
+        return self.mean - half_width, self.mean + half_width
+
+
+class _Analysis:
+    """
+    Accumulates the curves & pull distributions of blocks of runs, each block streamed one chunk of steps at a time
+    """
+
+    def __init__(self, k: int, steps: int, bin_size: int) -> None:
+        self.k = k
+        self.steps = steps
+        self.bin_size = bin_size
+        bins = -(-steps // bin_size)
+        self.result = {"runs": 0, "steps": steps, "bin_size": bin_size, "total_pulls": np.zeros(k, dtype=np.int64)}
+        self.result.update((name, CurveStatistics(bins)) for name in CURVES)
+        self.result.update((name, CurveStatistics(k)) for name in DISTRIBUTIONS)
+
+    def startRuns(self, true_values: np.ndarray) -> None:
+        """
+        Starts a block of runs, given their (runs, k) true action values
+        """
+        self.values = true_values
+        self.best = true_values.max(axis=1)
+        self.regret = np.zeros(len(true_values))
+        self.pulls = np.zeros((len(true_values), self.k), dtype=np.int64)
+
+    def addSteps(self, start: int, actions: np.ndarray, rewards: np.ndarray) -> None:
+        """
+        Adds the (runs, width) actions & rewards of steps [start, start + width) of the current block of runs, where
+        start is a multiple of bin_size
+        """
+        m, width = actions.shape
+        if width == 0:
+            return
+        selected_values = np.take_along_axis(self.values, actions, axis=1)
+        cumulative_regret = np.cumsum(self.best[:, None] - selected_values, axis=1)
+        cumulative_regret += self.regret[:, None]
+        self.regret = cumulative_regret[:, -1]
+
+        bin_starts = np.arange(0, width, self.bin_size)
+        bin_lengths = np.diff(np.append(bin_starts, width))
+        first_bin = start // self.bin_size
+        if rewards is not None:
+            self.result["mean_reward"].merge(np.add.reduceat(rewards, bin_starts, axis=1) / bin_lengths, first_bin)
+        optimal = np.add.reduceat(selected_values == self.best[:, None], bin_starts, axis=1)
+        self.result["percent_optimal"].merge(100 * optimal / bin_lengths, first_bin)
+        self.result["cumulative_regret"].merge(cumulative_regret[:, bin_starts + bin_lengths - 1], first_bin)
+        # Every run's pulls of every arm, as one bincount over (run, action) pairs
+        self.pulls += np.bincount((np.arange(m)[:, None] * self.k + actions).ravel(), minlength=m * self.k).reshape(m, self.k)
+
+    def finishRuns(self) -> None:
+        """
+        Ends the current block of runs, merging their pull distributions
+        """
+        fractions = self.pulls / self.steps
+        self.result["pull_fractions"].merge(fractions)
+        ranks = np.argsort(-self.values, axis=1, kind="stable")
+        self.result["pull_fractions_by_rank"].merge(np.take_along_axis(fractions, ranks, axis=1))
+        self.result["total_pulls"] += self.pulls.sum(axis=0)
+        self.result["runs"] += len(self.pulls)
+
+
+def analyzeRuns(actions: np.ndarray, true_values: np.ndarray, rewards: np.ndarray = None, bin_size: int = 1,
+                chunk_runs: int = 256, chunk_steps: int = 2**16) -> dict:
+    """
+    Analyzes the actions (and rewards) of many runs, reading them one (chunk_runs x chunk_steps) block at a time, so
+    memory-mapped result sets larger than memory are fine
+
+    Parameters
+    ----------
+    actions : np.array
+        (runs, n) array of the action every run selected at every step (or (n,) for a single run)
+    true_values : np.array
+        True action values of the (stationary) bandits: (k,) if every run used the same bandit, (runs, k) otherwise
+    rewards : np.array
+        (runs, n) array of the reward every run received at every step (default None, for no mean_reward curve)
+    bin_size : int
+        Number of consecutive steps aggregated into each entry of the curves (default 1, for per-step curves)
+    chunk_runs : int
+        Number of runs read at once (default 256)
+    chunk_steps : int
+        Number of steps read at once, rounded down to a multiple of bin_size (default 2**16)
+
+    Returns
+    -------
+    dict
+        - runs, steps, bin_size : size of the result set & the curves' bin size
+        - mean_reward, percent_optimal, cumulative_regret : CurveStatistics across runs, one entry per bin
+        - pull_fractions, pull_fractions_by_rank : CurveStatistics across runs, one entry per arm
+        - total_pulls : number of pulls of each arm, over every run
+
+    Raises
+    ------
+    ValueError
+        If the arrays' shapes do not match, or bin_size, chunk_runs or chunk_steps is not positive
+    """
+    if bin_size < 1 or chunk_runs < 1 or chunk_steps < 1:
+        raise ValueError("Invalid Chunking, bin_size, chunk_runs and chunk_steps must be positive")
+    if np.ndim(actions) == 1:
+        actions = actions[None]
+        rewards = rewards[None] if rewards is not None else None
+    true_values = np.asarray(true_values, dtype=float)
+    runs, steps = actions.shape
+    if rewards is not None and rewards.shape != actions.shape:
+        raise ValueError("Invalid Rewards, must have the same shape as the actions")
+    if true_values.ndim == 1:
+        true_values = np.broadcast_to(true_values, (runs, len(true_values)))
+    if true_values.shape[0] != runs:
+        raise ValueError("Invalid True Values, must be (k,) or have one row per run")
+    chunk_steps = max(bin_size, chunk_steps // bin_size * bin_size) # Bins never straddle two chunks
+
+    analysis = _Analysis(true_values.shape[1], steps, bin_size)
+    for run in range(0, runs, chunk_runs):
+        rows = slice(run, min(run + chunk_runs, runs))
+        analysis.startRuns(np.ascontiguousarray(true_values[rows]))
+        for step in range(0, steps, chunk_steps):
+            columns = slice(step, min(step + chunk_steps, steps))
+            block_rewards = np.asarray(rewards[rows, columns], dtype=float) if rewards is not None else None
+            analysis.addSteps(step, np.asarray(actions[rows, columns], dtype=np.int64), block_rewards)
+        analysis.finishRuns()
+    return analysis.result
+
+
+def analyzeLogs(logs: list, true_values: np.ndarray, bin_size: int = 1000, chunk_size: int = 2**20) -> dict:
+    """
+    Analyzes trajectory logs (one run per log), streaming each log one chunk of records at a time
+
+    Parameters
+    ----------
+    logs : list
+        TrajectoryReader of every run, all holding the same number of records
+    true_values : np.array
+        True action values of the (stationary) bandits: (k,) if every run used the same bandit, (len(logs), k) otherwise
+    bin_size : int
+        Number of consecutive steps aggregated into each entry of the curves (default 1000)
+    chunk_size : int
+        Number of records read at once, rounded down to a multiple of bin_size (default 2**20)
+
+    Returns
+    -------
+    dict
+        Same as "analyzeRuns"
+
+    Raises
+    ------
+    ValueError
+        If the logs hold different numbers of records, the true values do not match the logs, or bin_size or chunk_size is not positive
+    """
+    if bin_size < 1 or chunk_size < 1:
+        raise ValueError("Invalid Chunking, bin_size and chunk_size must be positive")
+    if isinstance(logs, TrajectoryReader):
+        logs = [logs]
+    steps = len(logs[0]) if logs else 0
+    if any(len(log) != steps for log in logs):
+        raise ValueError("Invalid Logs, every log must hold the same number of records")
+    true_values = np.asarray(true_values, dtype=float)
+    if true_values.ndim == 1:
+        true_values = np.broadcast_to(true_values, (len(logs), len(true_values)))
+    if true_values.shape[0] != len(logs):
+        raise ValueError("Invalid True Values, must be (k,) or have one row per log")
+    chunk_size = max(bin_size, chunk_size // bin_size * bin_size)
+
+    analysis = _Analysis(true_values.shape[1], steps, bin_size)
+    for log, values in zip(logs, true_values):
+        analysis.startRuns(values[None])
+        step = 0
+        for _, actions, rewards, _ in log.chunks(chunk_size):
+            analysis.addSteps(step, np.asarray(actions, dtype=np.int64)[None], np.asarray(rewards, dtype=float)[None])
+            step += len(actions)
+        analysis.finishRuns()
+    return analysis.result
+
+
+def combineAnalyses(first: dict, second: dict) -> dict:
+    """
+    Returns the analysis of the union of two result sets analyzed separately (ex: by different processes), with the same
+    number of steps, bin size & arms
+
+    Parameters
+    ----------
+    first, second : dict
+        Analyses returned by "analyzeRuns" or "analyzeLogs" (neither is modified)
+
+    Raises
+    ------
+    ValueError
+        If the analyses have different steps, bin sizes or numbers of arms
+    """
+    if (first["steps"], first["bin_size"], len(first["total_pulls"])) != (second["steps"], second["bin_size"], len(second["total_pulls"])):
+        raise ValueError("Invalid Analyses, steps, bin sizes and numbers of arms must match")
+    combined = {"runs": first["runs"] + second["runs"], "steps": first["steps"], "bin_size": first["bin_size"],
+                "total_pulls": first["total_pulls"] + second["total_pulls"]}
+    for name in CURVES + DISTRIBUTIONS:
+        statistics = CurveStatistics(len(first[name].mean))
+        statistics.combine(first[name])
+        statistics.combine(second[name])
+        combined[name] = statistics
+    return combined
+
+
+def printAnalysis(analysis: dict, level: float = 0.95, top_arms: int = 5) -> None:
+    """
+    Prints the final bin of every curve with its confidence band, followed by the share of pulls of the best arms
+
+    Parameters
+    ----------
+    analysis : dict
+        Analysis returned by "analyzeRuns" or "analyzeLogs"
+    level : float
+        Confidence level of the bands, within (0,1) (default 0.95)
+    top_arms : int
+        Number of best arms whose pull fractions are printed (default 5)
+    """
+    print(f"{analysis['runs']:,} runs of {analysis['steps']:,} steps ({level:.0%} confidence bands)")
+    for name in CURVES:
+        statistics = analysis[name]
+        if statistics.count[-1] == 0: # No rewards were given
+            continue
+        lower, upper = statistics.band(level)
+        print(f"{'final ' + name.replace('_', ' '):<26}{statistics.mean[-1]:>12.3f} ({lower[-1]:.3f}, {upper[-1]:.3f})")
+    by_rank = analysis["pull_fractions_by_rank"]
+    lower, upper = by_rank.band(level)
+    for rank in range(min(top_arms, len(by_rank.mean))):
+        print(f"{'pulls of arm ranked ' + str(rank + 1):<26}{100 * by_rank.mean[rank]:>11.2f}% ({100 * lower[rank]:.2f}%, {100 * upper[rank]:.2f}%)")
@@ -0,0 +1,636 @@
+"""
+Async Bandits Source File
+
+Asynchronous bandits, for rewards which come from a remote service rather than a local call: pulling is awaitable, so
+an agent loop can keep many pulls in flight at once, and throughput scales with the number of pulls in flight rather
+than with the round trip latency.
+
+Pieces:
+    - AsyncBandit : interface of a bandit whose "selectAction" / "selectActions" are awaitable
+    - RemoteBandit : one bandit hosted by a reward service, pulled through a BatchingClient
+    - BatchingClient : coalesces every pull issued during one event loop iteration (up to "max_batch") into a single
+      request, with any number of requests in flight at once
+    - LocalTransport / TCPTransport : carry requests to a BanditServer, in process or over a localhost TCP connection
+    - BanditServer : stand-in reward service wrapping local bandits (ex: StationaryBandit), with a simulated latency
+    - runAgents / runLocal : agent loops keeping "in_flight" pulls outstanding per agent, through the agents'
+      select() / update() split (so an agent keeps selecting while earlier rewards are still on their way)
+
+Wire format (TCP): one JSON object per line. A request {"id": 7, "pulls": [[bandit, action], ...]} is answered by
+{"id": 7, "rewards": [...]} (in pull order) or {"id": 7, "error": "..."} (with a null id if the request could not be
+parsed). Responses may come back in any order. If the connection drops, every pull still waiting fails with a ConnectionError.
+
+Requires `numpy` to be installed. The agents served must support the select() / update() split of the agents source file.
+
+Usage:
+    bandits = [StationaryBandit(10, seed = childSeed(root, i)) for i in range(2000)]
+    agents = runLocal(lambda bandit: EpsilonGreedyAgent(bandit, epsilon = 0.1), bandits, n = 1000, latency = 0.001, tcp = True)
+"""
+
+import asyncio
+import json
+
+import numpy as np
+
+
+class AsyncBandit:
+    """
+    Interface of every asynchronous bandit, whose pulls are awaited
+
+    ...
+
+    Attributes
+    ----------
+    k : int
+        Number of "arms" (valid actions) the bandit has
+
+    Methods
+    -------
+    selectAction(a)
+        Awaitable, returns the associated reward for a given action
+    selectActions(actions)
+        Awaitable, returns the associated rewards for a whole vector of actions
+    """
+
+    async def selectAction(self, a):
+        """
+        Returns the associated reward for a given action
+
+        Parameters
+        ----------
+        a : int
+            Which action to take
+        """
+        pass
+
+    async def selectActions(self, actions):
+        """
+        Returns the associated rewards for a whole vector of actions
+
+        Parameters
+        ----------
+        actions : np.array
+            Which actions to take
+        """
+        pass
+
+
+class BanditServer:
+    """
+    Stand-in reward service wrapping local bandits, answering batched pull requests in process ("handle") or over TCP ("start")
+
+    Every request first waits "latency" seconds (simulating the round trip & service time of a real service, without
+    blocking other requests), then pulls each bandit's actions with one `selectActions` call, in request order.
+
+    ...
+
+    Attributes
+    ----------
+    bandits : list
+        Hosted bandits, addressed by their index
+    latency : float
+        Seconds every request waits before being answered (default 0)
+    requests : int
+        Number of requests answered
+    pulls : int
+        Number of pulls answered
+
+    Methods
+    -------
+    handle(pulls)
+        Awaitable, returns the rewards of a batch of (bandit, action) pulls
+    start(host = "127.0.0.1", port = 0)
+        Awaitable, starts serving over TCP and returns the (host, port) it listens on
+    close()
+        Awaitable, stops serving over TCP
+    """
+
+    def __init__(self, bandits: list, latency: float = 0) -> None:
+        """
+        Parameters
+        ----------
+        bandits : list
+            Bandits to host (ex: StationaryBandit), addressed by their index
+        latency : float
+            Seconds every request waits before being answered (default 0)
+
+        Raises
+        ------
+        ValueError
+            If latency is negative
+        """
+        if latency < 0:
+            raise ValueError("Invalid Latency, must be non-negative")
+        self.bandits = list(bandits)
+        self.latency = latency
+        self.requests = 0
+        self.pulls = 0
+        self.__server = None
+
+    async def handle(self, pulls) -> list:
+        """
+        Returns the rewards of a batch of pulls, in pull order
+
+        Parameters
+        ----------
+        pulls : list or np.array
+            (bandit, action) pairs
+
+        Raises
+        ------
+        ValueError
+            If a bandit index or action is out of range
+        """
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        pulls = np.asarray(pulls, dtype=np.int64).reshape(-1, 2)
+        rewards = np.empty(len(pulls))
+        if len(pulls):
+            if pulls[:, 0].min() < 0 or pulls[:, 0].max() >= len(self.bandits):
+                raise ValueError("Invalid Bandit, out of range")
+            # Group by bandit (keeping request order within each), so each bandit is pulled once
+            order = np.argsort(pulls[:, 0], kind="stable")
+            sorted_bandits = pulls[order, 0]
+            starts = np.flatnonzero(np.concatenate(([True], sorted_bandits[1:] != sorted_bandits[:-1])))
+            for start, end in zip(starts.tolist(), starts[1:].tolist() + [len(order)]):
+                rows = order[start:end]
+                rewards[rows] = self.bandits[sorted_bandits[start]].selectActions(pulls[rows, 1])
+        self.requests += 1
+        self.pulls += len(pulls)
+        return rewards.tolist()
+
+    async def __serveConnection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Private method which answers every request of a connection, each in its own task (so responses may come back
+        out of order, and one request's latency never holds up the others). Any failure of a request (malformed line,
+        bad pulls, bandit error) is answered with an error frame rather than leaving the client waiting
+        """
+        tasks = set()
+
+        async def answer(line: bytes) -> None:
+            request_id = None
+            try:
+                request = json.loads(line)
+                request_id = request["id"]
+                response = {"id": request_id, "rewards": await self.handle(request["pulls"])}
+            except Exception as error:
+                message = str(error) if isinstance(error, ValueError) else f"{type(error).__name__}: {error}"
+                response = {"id": request_id, "error": message}
+            writer.write(json.dumps(response).encode() + b"\n")
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.create_task(answer(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> tuple:
+        """
+        Starts serving over TCP, returning the (host, port) it listens on
+
+        Parameters
+        ----------
+        host : str
+            Address to listen on (default "127.0.0.1")
+        port : int
+            Port to listen on (default 0, for any free port)
+        """
+        self.__server = await asyncio.start_server(self.__serveConnection, host, port, limit = 2**24)
+        return self.__server.sockets[0].getsockname()[:2]
+
+    async def close(self) -> None:
+        """
+        Stops serving over TCP
+        """
+        if self.__server != None:
+            self.__server.close()
+            await self.__server.wait_closed()
+            self.__server = None
+
+
+class LocalTransport:
+    """
+    Carries requests to a BanditServer in the same process (no serialization), for testing without sockets
+
+    ...
+
+    Methods
+    -------
+    request(pulls)
+        Awaitable, returns the rewards of a batch of pulls
+    close()
+        Awaitable, does nothing (for symmetry with TCPTransport)
+    """
+
+    def __init__(self, server: BanditServer) -> None:
+        """
+        Parameters
+        ----------
+        server : BanditServer
+            Server answering the requests
+        """
+        self.server = server
+
+    async def request(self, pulls: list) -> list:
+        """
+        Returns the rewards of a batch of (bandit, action) pulls
+
+        Parameters
+        ----------
+        pulls : list
+            (bandit, action) pairs
+        """
+        return await self.server.handle(pulls)
+
+    async def close(self) -> None:
+        pass
+
+
+class TCPTransport:
+    """
+    Carries requests to a reward service over one TCP connection, pipelined: any number of requests are in flight at
+    once, and each response is matched to its request by id
+
+    ...
+
+    Methods
+    -------
+    connect(host, port)
+        Awaitable class method, returns a transport connected to the service
+    request(pulls)
+        Awaitable, returns the rewards of a batch of pulls
+    close()
+        Awaitable, closes the connection
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Parameters
+        ----------
+        reader, writer : asyncio.StreamReader, asyncio.StreamWriter
+            Open connection to the service (see "connect")
+        """
+        self.__reader = reader
+        self.__writer = writer
+        self.__next_id = 0
+        self.__waiting = {}
+        self.__closed = False
+        self.__reading = asyncio.create_task(self.__readResponses())
+
+    @classmethod
+    async def connect(cls, host: str, port: int) -> "TCPTransport":
+        """
+        Returns a transport connected to the reward service at host:port
+
+        Parameters
+        ----------
+        host : str
+            Address of the service
+        port : int
+            Port of the service
+        """
+        reader, writer = await asyncio.open_connection(host, port, limit = 2**24)
+        return cls(reader, writer)
+
+    async def __readResponses(self) -> None:
+        """
+        Private method which resolves the waiting requests as their responses arrive, failing all of them if the connection ends
+        """
+        try:
+            while True:
+                line = await self.__reader.readline()
+                if not line:
+                    break
+                response = json.loads(line)
+                future = self.__waiting.pop(response["id"], None)
+                if future == None or future.done(): # Unmatched (ex: error frame of a malformed request) or abandoned
+                    continue
+                if "error" in response:
+                    future.set_exception(ValueError(response["error"]))
+                else:
+                    future.set_result(response["rewards"])
+        finally:
+            self.__closed = True
+            for future in self.__waiting.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Connection to the reward service closed"))
+            self.__waiting.clear()
+
+    async def request(self, pulls: list) -> list:
+        """
+        Returns the rewards of a batch of (bandit, action) pulls
+
+        Parameters
+        ----------
+        pulls : list
+            (bandit, action) pairs
+
+        Raises
+        ------
+        ValueError
+            If the service rejected the request
+        ConnectionError
+            If the connection is closed, or closed before the response arrived
+        """
+        if self.__closed:
+            raise ConnectionError("Connection to the reward service closed")
+        request_id = self.__next_id
+        self.__next_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self.__waiting[request_id] = future
+        try:
+            self.__writer.write(json.dumps({"id": request_id, "pulls": pulls}).encode() + b"\n")
+            await self.__writer.drain()
+        except BaseException:
+            self.__waiting.pop(request_id, None)
+            if not future.cancel() and not future.cancelled():
+                future.exception() # Already failed by the reader, the sending error is the one raised
+            raise
+        return await future
+
+    async def close(self) -> None:
+        """
+        Closes the connection
+        """
+        self.__writer.close()
+        await self.__writer.wait_closed()
+        await self.__reading
+
+
+class BatchingClient:
+    """
+    Client of a reward service which coalesces pulls into batched requests: every pull issued during one event loop
+    iteration (ex: by many agents awaiting their rewards concurrently) is sent in the same request, up to "max_batch"
+    pulls per request. Requests are not waited for before sending the next, so any number are in flight at once
+
+    ...
+
+    Attributes
+    ----------
+    transport : LocalTransport or TCPTransport
+        Transport carrying the requests
+    max_batch : int
+        Most pulls per request (default 4096)
+    requests : int
+        Number of requests sent
+    pulls : int
+        Number of pulls sent
+
+    Methods
+    -------
+    pull(bandit, action)
+        Awaitable, returns the reward of one pull (sent along with every other pull of the same iteration)
+    flush()
+        Sends the pending pulls now
+    """
+
+    def __init__(self, transport, max_batch: int = 4096) -> None:
+        """
+        Parameters
+        ----------
+        transport : LocalTransport or TCPTransport
+            Transport carrying the requests
+        max_batch : int
+            Most pulls per request (default 4096)
+
+        Raises
+        ------
+        ValueError
+            If max_batch is not positive
+        """
+        if max_batch < 1:
+            raise ValueError("Invalid Max Batch, must be positive")
+        self.transport = transport
+        self.max_batch = max_batch
+        self.requests = 0
+        self.pulls = 0
+        self.__pending = []
+        self.__futures = []
+        self.__scheduled = False
+        self.__sending = set()
+
+    def pull(self, bandit: int, action: int) -> asyncio.Future:
+        """
+        Queues a pull, returning a future of its reward. The queued pulls are sent once the current event loop
+        iteration ends (or as soon as "max_batch" are queued)
+
+        Parameters
+        ----------
+        bandit : int
+            Index of the bandit on the service
+        action : int
+            Which action to take
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.__pending.append((bandit, action))
+        self.__futures.append(future)
+        if len(self.__pending) >= self.max_batch:
+            self.flush()
+        elif not self.__scheduled:
+            self.__scheduled = True
+            loop.call_soon(self.flush)
+        return future
+
+    def flush(self) -> None:
+        """
+        Sends the pending pulls as one request now (the response resolves their futures when it arrives)
+        """
+        self.__scheduled = False
+        if not self.__pending:
+            return
+        pulls, futures = self.__pending, self.__futures
+        self.__pending, self.__futures = [], []
+        self.requests += 1
+        self.pulls += len(pulls)
+        task = asyncio.get_running_loop().create_task(self.__send(pulls, futures))
+        self.__sending.add(task) # Keeps a reference until sent
+        task.add_done_callback(self.__sending.discard)
+
+    async def __send(self, pulls: list, futures: list) -> None:
+        """
+        Private method which sends one request, then resolves the futures of its pulls. If the connection is lost, the
+        pulls still queued for later requests are failed too, so no pull is left waiting on a dead connection
+        """
+        try:
+            rewards = await self.transport.request(pulls)
+        except asyncio.CancelledError:
+            for future in futures:
+                future.cancel()
+            raise
+        except Exception as error:
+            if isinstance(error, ConnectionError):
+                futures = futures + self.__futures
+                self.__pending, self.__futures = [], []
+            for future in futures:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for future, reward in zip(futures, rewards):
+            if not future.done():
+                future.set_result(reward)
+
+
+class RemoteBandit(AsyncBandit):
+    """
+    One bandit hosted by a reward service, pulled through a BatchingClient. Extends the "AsyncBandit" interface
+
+    ...
+
+    Attributes
+    ----------
+    client : BatchingClient
+        Client carrying the pulls
+    index : int
+        Index of the bandit on the service
+    k : int
+        Number of "arms" (valid actions) the bandit has
+
+    Methods
+    -------
+    selectAction(a)
+        Awaitable, returns the reward of a pull
+    selectActions(actions)
+        Awaitable, returns the rewards of several pulls, sent in the same request
+    """
+
+    def __init__(self, client: BatchingClient, index: int, k: int) -> None:
+        """
+        Parameters
+        ----------
+        client : BatchingClient
+            Client carrying the pulls
+        index : int
+            Index of the bandit on the service
+        k : int
+            Number of "arms" (valid actions) the bandit has
+        """
+        self.client = client
+        self.index = index
+        self.k = k
+
+    async def selectAction(self, a: int) -> float:
+        """
+        Returns the reward of a pull of the input action
+
+        Parameters
+        ----------
+        a : int
+            Which action to take (from 0 to k)
+
+        Raises
+        ------
+        ValueError
+            If selected action is not within the range of accepted "k" actions
+        """
+        if not 0 <= a < self.k:
+            raise ValueError("Invalid Action, out of range")
+        return await self.client.pull(self.index, int(a))
+
+    async def selectActions(self, actions: np.ndarray) -> np.ndarray:
+        """
+        Returns the rewards of pulls of the input actions, in order
+
+        Parameters
+        ----------
+        actions : np.array
+            Which actions to take (each from 0 to k)
+
+        Raises
+        ------
+        ValueError
+            If any selected action is not within the range of accepted "k" actions
+        """
+        actions = np.asarray(actions).ravel()
+        if actions.size and (actions.min() < 0 or actions.max() >= self.k):
+            raise ValueError("Invalid Action, out of range")
+        futures = [self.client.pull(self.index, a) for a in actions.tolist()]
+        return np.array(await asyncio.gather(*futures), dtype=float)
+
+
+async def runAgents(agents: list, n: int = 1000, in_flight: int = 1) -> None:
+    """
+    Runs n steps of every agent concurrently, each agent keeping up to "in_flight" pulls outstanding on its (async) bandit
+
+    Every agent selects with "select()" and learns with "update()" once the reward arrives, so with in_flight > 1 an agent
+    selects before its earlier rewards are back (delayed feedback, as in serving). in_flight = 1 follows the same steps as
+    the agent's own synchronous run. Total pulls in flight = len(agents) * in_flight, which is what throughput scales with
+
+    Parameters
+    ----------
+    agents : list
+        Agents whose bandit is an AsyncBandit (ex: RemoteBandit)
+    n : int
+        Number of steps per agent (default 1000)
+    in_flight : int
+        Most pulls outstanding per agent (default 1)
+
+    Raises
+    ------
+    ValueError
+        If in_flight is not positive
+    """
+    if in_flight < 1:
+        raise ValueError("Invalid In Flight, must be positive")
+
+    async def worker(agent, steps: int) -> None:
+        select = agent.select
+        pull = agent.bandit.selectAction
+        update = agent.update
+        for _ in range(steps):
+            action = select()
+            update(action, await pull(action))
+
+    workers = []
+    for agent in agents:
+        for i in range(min(in_flight, n)):
+            workers.append(worker(agent, n // in_flight + (i < n % in_flight)))
+    await asyncio.gather(*workers)
+
+
+def runLocal(agent_factory, bandits: list, n: int = 1000, in_flight: int = 1, latency: float = 0, tcp: bool = False,
+             max_batch: int = 4096) -> list:
+    """
+    Runs one agent per bandit against a stand-in BanditServer hosting the bandits (in process, or over localhost TCP),
+    returning the agents
+
+    Parameters
+    ----------
+    agent_factory : callable
+        Returns a new agent, given its RemoteBandit (ex: lambda bandit: EpsilonGreedyAgent(bandit, epsilon = 0.1))
+    bandits : list
+        Local bandits to host (ex: StationaryBandit)
+    n : int
+        Number of steps per agent (default 1000)
+    in_flight : int
+        Most pulls outstanding per agent (default 1)
+    latency : float
+        Seconds every request waits before being answered (default 0)
+    tcp : bool
+        Whether to serve over a localhost TCP connection rather than in process (default False)
+    max_batch : int
+        Most pulls per request (default 4096)
+    """
+    async def main() -> list:
+        server = BanditServer(bandits, latency)
+        if tcp:
+            host, port = await server.start()
+            transport = await TCPTransport.connect(host, port)
+        else:
+            transport = LocalTransport(server)
+        try:
+            client = BatchingClient(transport, max_batch)
+            agents = [agent_factory(RemoteBandit(client, i, bandit.k)) for i, bandit in enumerate(bandits)]
+            await runAgents(agents, n, in_flight)
+            return agents
+        finally:
+            await transport.close()
+            await server.close()
+
+    return asyncio.run(main())
@@ -3,18 +3,26 @@ Bandits Source File
 
 Collection of various Bandit types useful for the k-armed bandit problem.
 
-Requires `numpy` to be installed.
+Requires `numpy` to be installed, and the streams source file to be imported correctly.
 
 Currently contains implementations for:
     - Stationary Bandit
-
-TODO: Add implementations for:
-    - Nonstationary Bandit
+    - Nonstationary Bandit (action values take independent Gaussian random walks)
+    - Bernoulli Bandit (binary rewards)
+    - Reward Tape (common random numbers shared between agents) & its Tape Bandit replays
 """
 
+import math
+import operator
+
 import numpy as np
+from streams import childSeed
+from streams import makeGenerator
 
 class Bandit:
+    # State entries which are arrays updated in place (so they can be backed by memory-mapped files)
+    state_arrays = ()
+
     def selectAction(self, a):
         """
         Returns the associated reward for a given action
@@ -26,6 +34,34 @@ class Bandit:
         """
         pass
 
+    def selectActions(self, actions):
+        """
+        Returns the associated rewards for a whole vector of actions, in a single call
+
+        Parameters
+        ----------
+        actions : np.array
+            Some indicators to select which actions to take
+        """
+        pass
+
+    def getState(self):
+        """
+        Returns everything needed to resume the bandit exactly where it is, as a dict of arrays & scalars
+        """
+        pass
+
+    def setState(self, state):
+        """
+        Restores the bandit to a state returned by "getState"
+
+        Parameters
+        ----------
+        state : dict
+            State of a bandit of the same type & number of actions
+        """
+        pass
+
 
 class StationaryBandit(Bandit):
     """
@@ -50,6 +86,17 @@ class StationaryBandit(Bandit):
         maximum value for the reward (default 10)
     variance : int
         normal distribution variance value (default 1)
+    noise_buffer_size : int
+        number of standard normal draws generated at once and consumed by successive pulls (default 4096)
+    dtype : str
+        dtype of the noise draws ("float64" or "float32"). With "float32", the action values are stored as float32 too, so
+        rewards come out in single precision (default "float64")
+    rng : np.random.Generator
+        Random number generator used for the action values and rewards of this bandit
+    __noise : np.array
+        Pre-generated block of standard normal noise, refilled whenever it runs out
+    __noise_index : int
+        Index of the next unused value in "__noise"
     
     Methods
     -------
@@ -57,9 +104,17 @@ class StationaryBandit(Bandit):
         Returns the associated action value as a standard distribution with:
             - mean = int a
             - variance = 1
+    selectActions(actions)
+        Returns the associated action values of a whole vector of actions, drawn the same way as "selectAction"
+    getState()
+        Returns the true action values, random number generator state & noise buffer
+    setState(state)
+        Restores a state returned by "getState"
     """
 
-    def __init__(self, k: int = 3, min: int = 0, max: int = 10, variance: int = 1) -> None:
+    state_arrays = ("actions",)
+
+    def __init__(self, k: int = 3, min: int = 0, max: int = 10, variance: int = 1, noise_buffer_size: int = 4096, seed = None, dtype: str = "float64") -> None:
         """
         Parameters
         ----------
@@ -71,14 +126,57 @@ class StationaryBandit(Bandit):
             maximum value for the reward (default 10)
         variance : int
             normal distribution variance value (default 1)
+        noise_buffer_size : int
+            number of standard normal draws generated at once and consumed by successive pulls (default 4096)
+        seed : None, int, np.random.SeedSequence or np.random.Generator
+            Seed for the bandit's random number generator (default None)
+        dtype : str
+            dtype of the noise draws, "float64" or "float32" (default "float64")
+
+        Raises
+        ------
+        ValueError
+            If dtype is not "float64" or "float32"
         """
         #TODO: Add "ValueError" checks for this constructor
-        
+        if dtype not in ("float64", "float32"):
+            raise ValueError("Invalid dtype, must be one of ('float64', 'float32')")
+
         self.k = k
         self.min = min
         self.max = max
         self.variance = variance
-        self.actions = np.random.randint(min, max, k)
+        self.dtype = dtype
+        self.rng = makeGenerator(seed)
+        self.actions = self.rng.integers(min, max, k)
+        if dtype == "float32":
+            self.actions = self.actions.astype(np.float32)
+        self.noise_buffer_size = noise_buffer_size
+        self.__refillNoise()
+
+    def __refillNoise(self) -> None:
+        """
+        Private method which replaces the noise buffer with a fresh block of standard normal draws
+        """
+        self.__noise = self.rng.standard_normal(self.noise_buffer_size, dtype=self.dtype)
+        self.__noise_index = 0
+
+    def __drawNoise(self, m: int) -> np.ndarray:
+        """
+        Private method which returns the next m standard normal draws from the noise buffer, refilling it if needed
+
+        Parameters
+        ----------
+        m : int
+            Number of draws needed
+        """
+        if m > self.noise_buffer_size: # Bigger than a whole buffer, so draw it directly
+            return self.rng.standard_normal(m, dtype=self.dtype)
+        if self.__noise_index + m > self.noise_buffer_size:
+            self.__refillNoise()
+        start = self.__noise_index
+        self.__noise_index += m
+        return self.__noise[start:self.__noise_index]
 
     def selectAction(self, a: int) -> float:
         """
@@ -92,12 +190,661 @@ class StationaryBandit(Bandit):
         Raises
         ------
         Value Error
-            If selected action is not within the range of accepted "k" actions
+            If selected action is not an integer, or not within the range of accepted "k" actions
         """
 
-        if a not in range(0,self.k):
+        if a.__class__ is not int: # NumPy integers are converted, anything non-integral (ex: 1.5) is rejected
+            try:
+                a = operator.index(a)
+            except TypeError:
+                raise ValueError("Invalid Action, must be an integer") from None
+        if not 0 <= a < self.k:
             raise ValueError("Invalid Action, out of range")
-        else:
-            return np.random.normal(self.actions[a],self.variance)
+        if self.__noise_index == self.noise_buffer_size:
+            self.__refillNoise()
+        z = self.__noise[self.__noise_index]
+        self.__noise_index += 1
+        return self.actions[a] + self.variance * z
+
+    def selectActions(self, actions: np.ndarray) -> np.ndarray:
+        """
+        Returns the associated rewards for a whole vector of actions, in a single call
+
+        Parameters
+        ----------
+        actions : np.array
+            Which actions to take (each from 0 to k)
+
+        Raises
+        ------
+        Value Error
+            If any selected action is not within the range of accepted "k" actions
+        """
+        actions = np.asarray(actions)
+        if actions.size and (actions.min() < 0 or actions.max() >= self.k):
+            raise ValueError("Invalid Action, out of range")
+        return self.actions[actions] + self.variance * self.__drawNoise(actions.size).reshape(actions.shape)
+
+    def getState(self) -> dict:
+        """
+        Returns the true action values, random number generator state & noise buffer, as a dict (arrays are not copied)
+        """
+        return {"actions": self.actions, "rng": self.rng.bit_generator.state, "noise": self.__noise, "noise_index": self.__noise_index}
+
+    def setState(self, state: dict) -> None:
+        """
+        Restores a state returned by "getState". Arrays are used as is (not copied)
+
+        Parameters
+        ----------
+        state : dict
+            State of a bandit of the same type & number of actions
+
+        Raises
+        ------
+        ValueError
+            If the state has a different number of actions
+        """
+        if len(state["actions"]) != self.k:
+            raise ValueError("Invalid State, number of actions does not match")
+        self.actions = np.asarray(state["actions"])
+        self.rng.bit_generator.state = state["rng"]
+        self.__noise = np.asarray(state["noise"], dtype=self.dtype)
+        self.noise_buffer_size = len(self.__noise)
+        self.__noise_index = int(state["noise_index"])
         
-#class NonstationaryBandit(Bandit):
\ No newline at end of file
+class NonstationaryBandit(StationaryBandit):
+    """
+    Python implementation of the nonstationary k-bandit concept, where every action's value takes an independent Gaussian
+    random walk (one increment per pull). Extends the "StationaryBandit" class
+
+    Drift is applied lazily: an action's value is only brought up to date when it is pulled (a walk of "elapsed" steps is a
+    single draw with scale walk_variance * sqrt(elapsed)), so a pull costs O(1) rather than an O(k) update of every action.
+
+    ...
+
+    Attributes
+    ----------
+    k : int
+        number of "arms" (valid actions) the bandit has (default 3)
+    actions : np.array
+        list of all actions and their rewards, where each action's value is as of the last time it was pulled or synced
+        (use "syncActions()" for every action's CURRENT value)
+    min : int
+        minimum value for the initial rewards (default 0)
+    max : int
+        maximum value for the initial rewards (default 10)
+    variance : int
+        normal distribution variance value (default 1)
+    walk_variance : float
+        variance value of each step of the random walk (passed as the normal distribution's scale, like "variance") (default 0.01)
+    step : int
+        Number of pulls made so far (the current time step)
+    last_value : float
+        True value of the action pulled last by "selectAction", as of that pull (the value its reward was drawn around)
+    __last_synced : np.array
+        Step each action's value in "actions" is up to date as of
+
+    Methods
+    -------
+    selectAction(a)
+        Brings action a's value up to date, then returns its reward like a Stationary Bandit would
+    selectActions(actions)
+        Returns the rewards of consecutive pulls of the input actions (one step each)
+    syncActions()
+        Brings every action's value up to the current step, and returns them
+    peekActions(rng, step = None)
+        Returns every action's value at a step, drawn from the input generator without changing the bandit
+    driftPath(n)
+        Advances the bandit n steps at once, returning every action's value at each of those steps
+    getState()
+        Returns the Stationary Bandit state, plus the current step & the step each action was last brought up to date
+    setState(state)
+        Restores a state returned by "getState"
+    """
+
+    state_arrays = ("actions", "last_synced")
+
+    def __init__(self, k: int = 3, min: int = 0, max: int = 10, variance: int = 1, walk_variance: float = 0.01, noise_buffer_size: int = 4096, seed = None,
+                 dtype: str = "float64") -> None:
+        """
+        Parameters
+        ----------
+        k : int
+            number of "arms" (valid actions) the bandit has (default 3)
+        min : int
+            minimum value for the initial rewards (default 0)
+        max : int
+            maximum value for the initial rewards (default 10)
+        variance : int
+            normal distribution variance value (default 1)
+        walk_variance : float
+            variance value of each step of the random walk (passed as the normal distribution's scale, like "variance") (default 0.01)
+        noise_buffer_size : int
+            number of standard normal draws generated at once and consumed by successive pulls (default 4096)
+        seed : None, int, np.random.SeedSequence or np.random.Generator
+            Seed for the bandit's random number generator (default None)
+        dtype : str
+            dtype of the action values & noise draws, "float64" or "float32" (default "float64")
+
+        Raises
+        ------
+        ValueError
+            If dtype is not "float64" or "float32"
+        """
+        super().__init__(k, min, max, variance, noise_buffer_size, seed, dtype)
+        self.actions = self.actions.astype(dtype)
+        self.walk_variance = walk_variance
+        self.step = 0
+        self.last_value = None
+        self.__last_synced = np.zeros(k, dtype=np.int64)
+
+    def syncActions(self) -> np.ndarray:
+        """
+        Brings every action's value up to the current step (in one vectorized pass), and returns them
+        """
+        elapsed = self.step - self.__last_synced
+        stale = np.flatnonzero(elapsed)
+        if stale.size:
+            self.actions[stale] += self.walk_variance * np.sqrt(elapsed[stale]) * self.rng.standard_normal(stale.size, dtype=self.dtype)
+            self.__last_synced[stale] = self.step
+        return self.actions
+
+    def peekActions(self, rng: np.random.Generator, step: int = None) -> np.ndarray:
+        """
+        Returns every action's value at the input step, drawing the drift since each value was last brought up to date from
+        the input generator. Neither the values nor the bandit's own random number generator are touched, so peeking (ex:
+        from a metrics sink) never changes the experiment. The drift drawn is a fresh sample, not the one a later pull realizes
+
+        Parameters
+        ----------
+        rng : np.random.Generator
+            Generator to draw the drift from (separate from the bandit's "rng")
+        step : int
+            Step to return the values as of, not before any action was last brought up to date (default None, for the current step)
+        """
+        step = self.step if step == None else step
+        elapsed = np.maximum(step - self.__last_synced, 0)
+        return self.actions + self.walk_variance * np.sqrt(elapsed) * rng.standard_normal(self.k)
+
+    def selectAction(self, a: int) -> float:
+        """
+        Brings the given action's value up to date, then returns its associated reward
+
+        Parameters
+        ----------
+        a : int
+            Which action to take (from 0 to k)
+
+        Raises
+        ------
+        Value Error
+            If selected action is not an integer, or not within the range of accepted "k" actions
+        """
+        if a.__class__ is not int: # NumPy integers are converted, anything non-integral (ex: 1.5) is rejected
+            try:
+                a = operator.index(a)
+            except TypeError:
+                raise ValueError("Invalid Action, must be an integer") from None
+        if not 0 <= a < self.k:
+            raise ValueError("Invalid Action, out of range")
+        elapsed = self.step - self.__last_synced[a]
+        if elapsed:
+            self.actions[a] += self.walk_variance * math.sqrt(elapsed) * self.rng.standard_normal()
+            self.__last_synced[a] = self.step
+        self.step += 1
+        self.last_value = float(self.actions[a])
+        return super().selectAction(a)
+
+    def selectActions(self, actions: np.ndarray) -> np.ndarray:
+        """
+        Returns the rewards of consecutive pulls of the input actions, where actions[i] is pulled at step (step + i)
+
+        Parameters
+        ----------
+        actions : np.array
+            Which actions to take (each from 0 to k), in the order they are pulled
+
+        Raises
+        ------
+        Value Error
+            If any selected action is not within the range of accepted "k" actions
+        """
+        actions = np.asarray(actions).ravel()
+        m = actions.size
+        rewards = super().selectActions(actions) # Validates actions, and draws the noise around the values as of their last sync
+        if m == 0:
+            return rewards
+
+        # Group the pulls by action (keeping time order within each group), so each action's walk is one segmented cumulative sum
+        order = np.argsort(actions, kind="stable")
+        sorted_actions = actions[order]
+        sorted_steps = self.step + order
+        first = np.ones(m, dtype=bool)
+        first[1:] = sorted_actions[1:] != sorted_actions[:-1]
+        previous_steps = np.roll(sorted_steps, 1)
+        previous_steps[first] = self.__last_synced[sorted_actions[first]]
+        increments = self.walk_variance * np.sqrt(sorted_steps - previous_steps) * self.rng.standard_normal(m, dtype=self.dtype)
+        totals = np.cumsum(increments)
+        group_starts = np.maximum.accumulate(np.where(first, np.arange(m), 0))
+        drift = totals - (totals[group_starts] - increments[group_starts])
+
+        rewards[order] += drift
+        last = np.ones(m, dtype=bool)
+        last[:-1] = first[1:]
+        self.actions[sorted_actions[last]] += drift[last]
+        self.__last_synced[sorted_actions[last]] = sorted_steps[last]
+        self.step += m
+        return rewards
+
+    def driftPath(self, n: int) -> np.ndarray:
+        """
+        Advances the bandit n steps at once (without pulling), returning every action's value at each of those steps.
+        The whole path is generated in one vectorized cumulative sum, for use by batched simulations.
+
+        Parameters
+        ----------
+        n : int
+            Number of steps to advance
+
+        Returns
+        -------
+        np.array
+            (n, k) array where:
+                - row = step (relative to the current step)
+                - column = action ID
+                - value = action's true value at that step
+        """
+        if n == 0:
+            return np.empty((0, self.k), dtype=self.dtype)
+        start = self.syncActions().copy()
+        increments = self.walk_variance * self.rng.standard_normal((n, self.k), dtype=self.dtype)
+        increments[0] = 0
+        path = start + np.cumsum(increments, axis=0)
+        self.actions[:] = path[-1]
+        self.step += n
+        self.__last_synced.fill(self.step - 1)
+        return path
+
+    def getState(self) -> dict:
+        """
+        Returns the Stationary Bandit state, plus the current step & the step each action was last brought up to date
+        """
+        return {**super().getState(), "step": self.step, "last_synced": self.__last_synced}
+
+    def setState(self, state: dict) -> None:
+        """
+        Restores a state returned by "getState". Arrays are used as is (not copied)
+
+        Parameters
+        ----------
+        state : dict
+            State of a bandit of the same type & number of actions
+
+        Raises
+        ------
+        ValueError
+            If the state has a different number of actions
+        """
+        super().setState(state)
+        self.actions = np.asarray(state["actions"], dtype=self.dtype)
+        self.step = int(state["step"])
+        self.__last_synced = np.asarray(state["last_synced"], dtype=np.int64)
+
+
+class BernoulliBandit(Bandit):
+    """
+    Python implementation of the binary (Bernoulli) k-bandit concept, where every action pays a reward of 1 with its own
+    probability and 0 otherwise. Extends the "Bandit" interface
+
+    ...
+
+    Attributes
+    ----------
+    k : int
+        number of "arms" (valid actions) the bandit has (default 3)
+    actions : np.array
+        list of all actions and their success probabilities where:
+            - index = action ID
+            - value = cooresponding probability of a reward of 1 (which is also its mean reward)
+    noise_buffer_size : int
+        number of uniform draws generated at once and consumed by successive pulls (default 4096)
+    rng : np.random.Generator
+        Random number generator used for the action probabilities and rewards of this bandit
+    __uniforms : np.array
+        Pre-generated block of uniform [0,1) draws, refilled whenever it runs out
+    __uniform_index : int
+        Index of the next unused value in "__uniforms"
+
+    Methods
+    -------
+    selectAction(a)
+        Returns a reward of 1 with action a's probability, and 0 otherwise
+    selectActions(actions)
+        Returns the rewards of a whole vector of actions, drawn the same way as "selectAction"
+    getState()
+        Returns the success probabilities, random number generator state & uniform buffer
+    setState(state)
+        Restores a state returned by "getState"
+    """
+
+    state_arrays = ("actions",)
+
+    def __init__(self, k: int = 3, noise_buffer_size: int = 4096, seed = None) -> None:
+        """
+        Parameters
+        ----------
+        k : int
+            number of "arms" (valid actions) the bandit has (default 3)
+        noise_buffer_size : int
+            number of uniform draws generated at once and consumed by successive pulls (default 4096)
+        seed : None, int, np.random.SeedSequence or np.random.Generator
+            Seed for the bandit's random number generator (default None)
+        """
+        self.k = k
+        self.noise_buffer_size = noise_buffer_size
+        self.rng = makeGenerator(seed)
+        self.actions = self.rng.random(k)
+        self.__refillUniforms()
+
+    def __refillUniforms(self) -> None:
+        """
+        Private method which replaces the uniform buffer with a fresh block of draws
+        """
+        self.__uniforms = self.rng.random(self.noise_buffer_size)
+        self.__uniform_index = 0
+
+    def selectAction(self, a: int) -> float:
+        """
+        Returns a reward of 1 with the given action's probability, and 0 otherwise
+
+        Parameters
+        ----------
+        a : int
+            Which action to take (from 0 to k)
+
+        Raises
+        ------
+        Value Error
+            If selected action is not an integer, or not within the range of accepted "k" actions
+        """
+        if a.__class__ is not int: # NumPy integers are converted, anything non-integral (ex: 1.5) is rejected
+            try:
+                a = operator.index(a)
+            except TypeError:
+                raise ValueError("Invalid Action, must be an integer") from None
+        if not 0 <= a < self.k:
+            raise ValueError("Invalid Action, out of range")
+        if self.__uniform_index == self.noise_buffer_size:
+            self.__refillUniforms()
+        u = self.__uniforms[self.__uniform_index]
+        self.__uniform_index += 1
+        return 1.0 if u < self.actions[a] else 0.0
+
+    def selectActions(self, actions: np.ndarray) -> np.ndarray:
+        """
+        Returns the rewards of a whole vector of actions, in a single call
+
+        Parameters
+        ----------
+        actions : np.array
+            Which actions to take (each from 0 to k)
+
+        Raises
+        ------
+        Value Error
+            If any selected action is not within the range of accepted "k" actions
+        """
+        actions = np.asarray(actions)
+        if actions.size and (actions.min() < 0 or actions.max() >= self.k):
+            raise ValueError("Invalid Action, out of range")
+        return (self.rng.random(actions.shape) < self.actions[actions]).astype(float)
+
+    def getState(self) -> dict:
+        """
+        Returns the success probabilities, random number generator state & uniform buffer, as a dict (arrays are not copied)
+        """
+        return {"actions": self.actions, "rng": self.rng.bit_generator.state, "uniforms": self.__uniforms, "uniform_index": self.__uniform_index}
+
+    def setState(self, state: dict) -> None:
+        """
+        Restores a state returned by "getState". Arrays are used as is (not copied)
+
+        Parameters
+        ----------
+        state : dict
+            State of a bandit of the same type & number of actions
+
+        Raises
+        ------
+        ValueError
+            If the state has a different number of actions
+        """
+        if len(state["actions"]) != self.k:
+            raise ValueError("Invalid State, number of actions does not match")
+        self.actions = np.asarray(state["actions"], dtype=float)
+        self.rng.bit_generator.state = state["rng"]
+        self.__uniforms = np.asarray(state["uniforms"], dtype=float)
+        self.noise_buffer_size = len(self.__uniforms)
+        self.__uniform_index = int(state["uniform_index"])
+
+
+class RewardTape:
+    """
+    Lazily generated (n, k) "tape" holding every arm's reward at every step for a given bandit.
+
+    Rewards are generated in fixed-size chunks, each from its own deterministic random stream, so any number of agents can
+    replay the exact same draws (common random numbers) while only ever holding the chunk they are currently on in memory.
+    Comparisons between agents on the same tape therefore only differ due to the agents themselves, not the noise.
+
+    ...
+
+    Attributes
+    ----------
+    bandit : StationaryBandit
+        Bandit whose true action values and variance the rewards are drawn from
+    chunk_size : int
+        Number of steps (rows of the tape) generated at once (default 1024)
+    seed : np.random.SeedSequence
+        Root seed of the tape. Chunk i is always drawn from the same child stream of this seed
+
+    Methods
+    -------
+    chunk(index)
+        Generates the rewards of every arm for steps [index * chunk_size, (index + 1) * chunk_size)
+    replay()
+        Returns a new Tape Bandit which replays this tape from step 0
+    """
+
+    def __init__(self, bandit: StationaryBandit, chunk_size: int = 1024, seed = None) -> None:
+        """
+        Parameters
+        ----------
+        bandit : StationaryBandit
+            Bandit whose true action values and variance the rewards are drawn from
+        chunk_size : int
+            Number of steps (rows of the tape) generated at once (default 1024)
+        seed : int or np.random.SeedSequence
+            Root seed of the tape (default None, for a random one)
+
+        Raises
+        ------
+        ValueError
+            If chunk_size is not positive
+        """
+        if chunk_size < 1:
+            raise ValueError("Invalid Chunk Size, must be positive")
+        self.bandit = bandit
+        self.chunk_size = chunk_size
+        self.seed = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+
+    def chunk(self, index: int) -> np.ndarray:
+        """
+        Generates the rewards of every arm for steps [index * chunk_size, (index + 1) * chunk_size)
+
+        Parameters
+        ----------
+        index : int
+            Which chunk of the tape to generate
+
+        Returns
+        -------
+        np.array
+            (chunk_size, k) array where:
+                - row = step (relative to the start of the chunk)
+                - column = action ID
+                - value = reward that action gives at that step
+        """
+        noise = makeGenerator(childSeed(self.seed, index)).standard_normal((self.chunk_size, self.bandit.k))
+        return self.bandit.actions + self.bandit.variance * noise
+
+    def replay(self) -> "TapeBandit":
+        """
+        Returns a new Tape Bandit which replays this tape from step 0
+        """
+        return TapeBandit(self)
+
+
+class TapeBandit(Bandit):
+    """
+    Bandit which replays a Reward Tape one step per pull, so every agent given a replay of the same tape sees identical rewards.
+    Extends the "Bandit" interface, and can be used anywhere a Stationary Bandit is.
+
+    ...
+
+    Attributes
+    ----------
+    tape : RewardTape
+        Tape being replayed
+    k : int
+        number of "arms" (valid actions) the underlying bandit has
+    actions : np.array
+        true action values of the underlying bandit
+    variance : int
+        normal distribution variance value of the underlying bandit
+    step : int
+        Number of pulls made so far (the row of the tape the next pull will read)
+    __chunk : np.array
+        Chunk of the tape the current step belongs to. Previous chunks are discarded once consumed
+
+    Methods
+    -------
+    selectAction(a)
+        Returns the reward of action a at the current step of the tape, then moves to the next step
+    selectActions(actions)
+        Returns the rewards of consecutive pulls of the input actions (one step each)
+    rewind()
+        Restarts the replay from step 0
+    getState()
+        Returns the current step (the tape itself is reproduced from its seed)
+    setState(state)
+        Restores a state returned by "getState"
+    """
+
+    state_arrays = ()
+
+    def __init__(self, tape: RewardTape) -> None:
+        """
+        Parameters
+        ----------
+        tape : RewardTape
+            Tape to replay
+        """
+        self.tape = tape
+        self.k = tape.bandit.k
+        self.actions = tape.bandit.actions
+        self.variance = tape.bandit.variance
+        self.rewind()
+
+    def rewind(self) -> None:
+        """
+        Restarts the replay from step 0
+        """
+        self.step = 0
+        self.__chunk_index = 0
+        self.__chunk = self.tape.chunk(0)
+
+    def __loadChunk(self, index: int) -> None:
+        """
+        Private method which swaps the held chunk for the input one, if it isn't already held
+
+        Parameters
+        ----------
+        index : int
+            Which chunk of the tape to hold
+        """
+        if index != self.__chunk_index:
+            self.__chunk_index = index
+            self.__chunk = self.tape.chunk(index)
+
+    def selectAction(self, a: int) -> float:
+        """
+        Returns the reward of the given action at the current step of the tape, then moves to the next step
+
+        Parameters
+        ----------
+        a : int
+            Which action to take (from 0 to k)
+
+        Raises
+        ------
+        Value Error
+            If selected action is not an integer, or not within the range of accepted "k" actions
+        """
+        if a.__class__ is not int: # NumPy integers are converted, anything non-integral (ex: 1.5) is rejected
+            try:
+                a = operator.index(a)
+            except TypeError:
+                raise ValueError("Invalid Action, must be an integer") from None
+        if not 0 <= a < self.k:
+            raise ValueError("Invalid Action, out of range")
+        chunk_index, row = divmod(self.step, self.tape.chunk_size)
+        self.__loadChunk(chunk_index)
+        self.step += 1
+        return self.__chunk[row, a]
+
+    def selectActions(self, actions: np.ndarray) -> np.ndarray:
+        """
+        Returns the rewards of consecutive pulls of the input actions, where actions[i] is pulled at step (step + i)
+
+        Parameters
+        ----------
+        actions : np.array
+            Which actions to take (each from 0 to k), in the order they are pulled
+
+        Raises
+        ------
+        Value Error
+            If any selected action is not within the range of accepted "k" actions
+        """
+        actions = np.asarray(actions).ravel()
+        if actions.size and (actions.min() < 0 or actions.max() >= self.k):
+            raise ValueError("Invalid Action, out of range")
+        rewards = np.empty(actions.size)
+        chunk_size = self.tape.chunk_size
+        done = 0
+        while done < actions.size:
+            chunk_index, row = divmod(self.step, chunk_size)
+            self.__loadChunk(chunk_index)
+            m = min(actions.size - done, chunk_size - row)
+            rewards[done:done + m] = self.__chunk[np.arange(row, row + m), actions[done:done + m]]
+            self.step += m
+            done += m
+        return rewards
+
+    def getState(self) -> dict:
+        """
+        Returns the current step (the tape itself is reproduced from its seed)
+        """
+        return {"step": self.step}
+
+    def setState(self, state: dict) -> None:
+        """
+        Restores a state returned by "getState". The replay must be of the same tape
+
+        Parameters
+        ----------
+        state : dict
+            State of a replay of the same tape
+        """
+        self.step = int(state["step"])
@@ -0,0 +1,470 @@
+"""
+Batched Source File
+
+Vectorized engine for running many independent bandit/agent pairs at once.
+
+Rather than stepping one agent object at a time through its `runSequence` loop, every run's true action values,
+reward estimates and select counts are held as (runs, k) arrays, so that a single NumPy operation advances ALL runs
+by one step. This is the intended way to produce learning curves averaged over thousands of runs.
+
+Requires `numpy` to be installed, and the agents & streams source files to be imported correctly.
+
+For massive simulations (runs x k in the hundreds of millions), the state can be kept compact: "dtype" = "float32" stores
+the action values, reward estimates and reward draws in single precision, and "count_dtype" = "uint32" or "uint16" stores the
+select counts as integers. Float32 + uint16 takes 10 bytes per (run, action) instead of 24, fitting 2-4x more runs per node.
+Accuracy bounds of the compact state:
+    - float32 estimates carry a relative rounding error of 2**-24 (~6e-8) per update, so the learning curves match float64
+      ones to within Monte Carlo noise (see `compareDtypes` in the benchmark source file). Once an action has been pulled
+      more than about noise / (|estimate| * 2**-24) times (millions of pulls, for rewards of ~10 with noise 1), single
+      updates fall below float32 resolution, so its estimate stops moving at an already accurate value
+    - integer counts saturate rather than wrap: once an action has been pulled 2**16 - 1 (uint16) or 2**32 - 1 (uint32)
+      times, its count stops growing, so its sample average becomes a constant step-size average with alpha = 1 / (2**16 - 1),
+      whose estimate has a standard deviation of about noise * 0.003 (uint16)
+    - points totals & learning curves are always accumulated in float64
+
+Currently supports batched versions (on stationary or random-walk nonstationary bandits) of:
+    - Epsilon Greedy Agent
+    - Greedy Agent
+    - Optimistic Greedy Agent
+    - Random Agent
+    - UCB Agent
+    - Thompson Sampling Agent (Normal-Normal posterior only, since the batched bandits always give Gaussian rewards)
+"""
+
+import inspect
+
+import numpy as np
+from agents import EpsilonGreedyAgent
+from agents import GreedyAgent
+from agents import OptimisticGreedyAgent
+from agents import RandomAgent
+from agents import ThompsonSamplingAgent
+from agents import UpperConfidenceBoundAgent
+from streams import childSeed
+from streams import makeGenerator
+
+# Agent constructor arguments which configure the scalar implementation rather than the agent's behaviour
+NON_HYPERPARAMETERS = ("bandit", "seed", "argmax_tree_threshold", "refresh_tolerance")
+
+# Supported dtypes of the action values, reward estimates & reward draws, and of the select counts
+DTYPES = ("float64", "float32")
+COUNT_DTYPES = ("float64", "uint32", "uint16")
+
+# Index of the child of the engine's seed which the random walk increments are drawn from (far from any spawned child)
+DRIFT_STREAM = 2**31 - 1
+# Most steps of random walk drawn at once, and most values per chunk (about 2 MB in float64, so a chunk stays in cache)
+DRIFT_CHUNK_STEPS = 256
+DRIFT_CHUNK_VALUES = 2**18
+
+# Agent classes which have a batched policy
+SUPPORTED_AGENTS = (EpsilonGreedyAgent, GreedyAgent, OptimisticGreedyAgent, RandomAgent, UpperConfidenceBoundAgent, ThompsonSamplingAgent)
+
+
+class BatchedAgents:
+    """
+    Vectorized implementation of "runs" independent copies of an agent, each operating on its own stationary bandit
+
+    ...
+
+    Attributes
+    ----------
+    agent_class : type
+        Agent class (from the agents source file) whose logic is being run in batch
+    runs : int
+        Number of independent bandit/agent pairs being simulated (default 2000)
+    k : int
+        Number of "arms" (valid actions) each bandit has (default 3)
+    variance : float
+        Normal distribution variance value used for every bandit's rewards (default 1)
+        (NOTE: Like `StationaryBandit`, this is passed as the scale of the normal distribution)
+    walk_variance : float
+        Variance value of each step of the random walk every action value takes, as in `NonstationaryBandit` (default 0, for stationary bandits)
+    params : dict
+        Hyperparameters of the agent (ex: epsilon, optimistic_val, c), defaulting to the agent class' own defaults
+    dtype : str
+        dtype of the action values, reward estimates & reward draws: "float64" or "float32" (default "float64")
+    count_dtype : str
+        dtype of the select counts: "float64", "uint32" or "uint16" (integer counts saturate at their maximum)
+    actions : np.array
+        (runs, k) array of every bandit's true action values, where:
+            - row = run ID
+            - column = action ID
+            - value = cooresponding mean reward
+    total_points : np.array
+        Running total of all points for each run
+    __reward_estimates : np.array
+        (runs, k) array of each run's estimated reward for each action
+    __reward_select_counts : np.array
+        (runs, k) array of how many times each run has selected each action
+    __drift_path : np.array
+        (steps, runs * k) array of every action value of every run at each step of the current chunk of random walk
+        (nonstationary only). "actions" is a view of the current step's row, so a step's drift costs no copy
+    __drift_start : np.array
+        Action values the current chunk's path starts from, which the chunk can be redrawn from when resuming
+
+    Methods
+    -------
+    chooseActions()
+        Selects one action for every run, realizes the rewards and updates every run's estimates.
+        Returns the selected actions and their rewards.
+    runSequence(n = 1000)
+        Steps every run n times, returning the per-step mean reward and % optimal action curves
+    reset()
+        Reset values associated with every run's progress
+    changeBandits(bandits)
+        Changes the bandits that the runs operate on
+    getState()
+        Returns everything needed to resume every run exactly where it is
+    setState(state)
+        Restores a state returned by "getState"
+    """
+
+    def __init__(self, agent_class: type, runs: int = 2000, k: int = 3, min: int = 0, max: int = 10, variance: float = 1, walk_variance: float = 0, seed = None,
+                 dtype: str = "float64", count_dtype: str = None, **agent_params) -> None:
+        """
+        Parameters
+        ----------
+        agent_class : type
+            Agent class to run in batch. Must be one of the agent classes from the agents source file
+        runs : int
+            Number of independent bandit/agent pairs to simulate (default 2000)
+        k : int
+            Number of "arms" (valid actions) each bandit has (default 3)
+        min : int
+            Minimum value for the reward (default 0)
+        max : int
+            Maximum value for the reward (default 10)
+        variance : float
+            Normal distribution variance value (default 1)
+        walk_variance : float
+            Variance value of each step of the random walk every action value takes (default 0, for stationary bandits)
+        seed : None, int, np.random.SeedSequence or np.random.Generator
+            Seed for the engine's random number generator (default None)
+        dtype : str
+            dtype of the action values, reward estimates & reward draws: "float64" or "float32" (default "float64")
+        count_dtype : str
+            dtype of the select counts: "float64", "uint32" or "uint16" (default None, for "float64" with float64 and "uint32" with float32)
+        **agent_params
+            Hyperparameters forwarded to the agent logic (ex: epsilon = 0.1)
+
+        Raises
+        ------
+        ValueError
+            If agent class is not supported, the dtypes are not supported, or if any hyperparameter is invalid
+        TypeError
+            If a hyperparameter is not accepted by the agent class
+        """
+        policies = {
+            EpsilonGreedyAgent: self.__epsilonGreedyActions,
+            GreedyAgent: self.__greedyActions,
+            OptimisticGreedyAgent: self.__greedyActions,
+            RandomAgent: self.__randomActions,
+            UpperConfidenceBoundAgent: self.__ucbActions,
+            ThompsonSamplingAgent: self.__thompsonActions,
+        }
+        if agent_class not in policies:
+            raise ValueError(f"Unsupported agent class: {agent_class.__name__}")
+
+        # Use the agent class' own constructor defaults, so batched & scalar agents always agree
+        self.params = {name: param.default for name, param in inspect.signature(agent_class).parameters.items()
+                       if name not in NON_HYPERPARAMETERS and param.default is not inspect.Parameter.empty}
+        for name in agent_params:
+            if name not in self.params:
+                raise TypeError(f"{agent_class.__name__} got an unexpected hyperparameter '{name}'")
+        self.params.update(agent_params)
+        if "epsilon" in self.params and (self.params["epsilon"] < 0 or self.params["epsilon"] > 1):
+            raise ValueError("Invalid Epsilon, must be within (0,1)")
+        if "variant" in self.params and self.params["variant"] not in agent_class.variants:
+            raise ValueError(f"Invalid Variant, must be one of {agent_class.variants}")
+        if self.params.get("model") not in (None, "normal"):
+            raise ValueError("Invalid Model, batched bandits only give Gaussian rewards, so must be \"normal\"")
+        if count_dtype == None:
+            count_dtype = "float64" if dtype == "float64" else "uint32"
+        if dtype not in DTYPES:
+            raise ValueError(f"Invalid dtype, must be one of {DTYPES}")
+        if count_dtype not in COUNT_DTYPES:
+            raise ValueError(f"Invalid Count dtype, must be one of {COUNT_DTYPES}")
+
+        self.agent_class = agent_class
+        self.runs = runs
+        self.k = k
+        self.variance = variance
+        self.walk_variance = walk_variance
+        self.dtype = dtype
+        self.count_dtype = count_dtype
+        # Integer counts saturate at this value (None for float counts)
+        self.__count_limit = np.iinfo(count_dtype).max if count_dtype != "float64" else None
+        self.__rng = makeGenerator(seed)
+        self.__drift_seed = childSeed(self.__rng.bit_generator.seed_seq, DRIFT_STREAM)
+        self.__policy = policies[agent_class]
+        self.__step_size = self.params.get("step_size")
+        self.__setActions(self.__rng.integers(min, max, (runs, k)))
+
+    def __setActions(self, actions: np.ndarray) -> None:
+        """
+        Private method which installs a new (runs, k) array of true action values and resets every run's progress
+
+        Parameters
+        ----------
+        actions : np.array
+            (runs, k) array of true action values
+        """
+        self.runs, self.k = actions.shape
+        # Flat (row * k + action) offsets let every per-step gather/scatter be a single 1-D `take`/`put`
+        self.__offsets = np.arange(self.runs) * self.k
+        self.__optimal = (actions == actions.max(axis=1, keepdims=True)).ravel()
+        self.__flat_actions = actions.astype(self.dtype).ravel()
+        self.actions = self.__flat_actions.reshape(self.runs, self.k)
+        self.__drift_rows = max(1, min(DRIFT_CHUNK_STEPS, DRIFT_CHUNK_VALUES // actions.size))
+        self.__drift_path = None
+        self.__drift_start = None
+        self.__reward_estimates = np.zeros((self.runs, self.k), dtype=self.dtype)
+        self.__reward_select_counts = np.zeros((self.runs, self.k), dtype=self.count_dtype)
+        self.__flat_estimates = self.__reward_estimates.reshape(-1)
+        self.__flat_counts = self.__reward_select_counts.reshape(-1)
+        self.__reward_square_sums = np.zeros((self.runs, self.k), dtype=self.dtype) if self.params.get("variant") == "ucb1-tuned" else None
+        self.reset()
+
+    def __greedyActions(self) -> np.ndarray:
+        """
+        Private method which selects the greedy action of every run (ties broken towards the lowest action ID, like `np.argmax`)
+        """
+        return self.__reward_estimates.argmax(axis=1)
+
+    def __epsilonGreedyActions(self) -> np.ndarray:
+        """
+        Private method which selects the greedy action of every run, replacing it with a random action with probability epsilon
+        """
+        selected_actions = self.__reward_estimates.argmax(axis=1)
+        explore = self.__rng.random(self.runs) < self.params["epsilon"]
+        selected_actions[explore] = self.__rng.integers(0, self.k, int(np.count_nonzero(explore)))
+        return selected_actions
+
+    def __randomActions(self) -> np.ndarray:
+        """
+        Private method which selects a uniformly random action for every run
+        """
+        return self.__rng.integers(0, self.k, self.runs)
+
+    def __ucbActions(self) -> np.ndarray:
+        """
+        Private method which selects the action maximizing Q + bonus for every run, using the same variants as UpperConfidenceBoundAgent
+        (ex: bonus = c * sqrt(ln(t) / N) for "ucb1"). Actions which have never been selected are treated as maximizing, as the textbook describes.
+        """
+        counts = self.__reward_select_counts
+        estimates = self.__reward_estimates
+        c = self.params["c"]
+        log_t = np.log(self.__step)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if self.params["variant"] == "ucb1":
+                bonus = c * np.sqrt(log_t / counts)
+            elif self.params["variant"] == "kl-ucb":
+                bonus = c * np.sqrt(2 * self.variance * self.variance * log_t / counts)
+            else:
+                variance = np.maximum(self.__reward_square_sums / counts - estimates * estimates, 0) + np.sqrt(2 * log_t / counts)
+                bonus = c * np.sqrt(log_t / counts * variance)
+        scores = estimates + bonus
+        scores[counts == 0] = np.inf
+        return scores.argmax(axis=1)
+
+    def __thompsonActions(self) -> np.ndarray:
+        """
+        Private method which draws one sample from every run's Normal posterior over every action's reward (all (runs, k)
+        samples in a single call) and selects the action with the highest sample, like ThompsonSamplingAgent.
+        The posteriors follow directly from each run's sample-average estimates and select counts.
+        """
+        counts = self.__reward_select_counts
+        prior_precision = 1 / self.params["prior_variance"]
+        noise_variance = self.params["noise_variance"]
+        noise_precision = 1 / (noise_variance if noise_variance != None else self.variance * self.variance)
+        precisions = prior_precision + noise_precision * counts
+        means = (self.params["prior_mean"] * prior_precision + noise_precision * counts * self.__reward_estimates) / precisions
+        samples = self.__rng.standard_normal((self.runs, self.k))
+        samples /= np.sqrt(precisions)
+        samples += means
+        return samples.argmax(axis=1)
+
+    def chooseActions(self) -> tuple:
+        """
+        Public method which selects an action for every run, realizes their associated rewards and updates every run's estimates.
+        Uses the sample-average "Q" value updating formula described in textbook, Q = Q + (1/N) * (R - Q), with N counted after the selection.
+
+        Returns
+        -------
+        tuple
+            (selected_actions, selected_rewards), both arrays of length runs
+        """
+        selected_actions = self.__advance()[0]
+        return selected_actions, self.__last_rewards
+
+    def __drawDrift(self, start: np.ndarray, chunk: int) -> None:
+        """
+        Private method which draws the random walk increments of every action value of every run for a whole chunk of steps
+        in one bulk call (from the chunk's own stream, so it can be redrawn exactly when resuming), and turns them into the
+        chunk's path with a single cumulative sum from the input start values
+
+        Parameters
+        ----------
+        start : np.array
+            Flat (runs * k) action values before the chunk's first step
+        chunk : int
+            Index of the chunk (its first step is chunk * steps per chunk + 1)
+        """
+        rng = makeGenerator(childSeed(self.__drift_seed, chunk))
+        path = rng.standard_normal((self.__drift_rows, start.size), dtype=self.dtype)
+        path *= self.walk_variance
+        path[0] += start
+        for row in range(1, len(path)): # Cumulative sum row by row, so every addition runs over contiguous memory
+            np.add(path[row], path[row - 1], out=path[row])
+        self.__drift_path = path
+        self.__drift_start = start
+
+    def __advance(self) -> tuple:
+        """
+        Private method which advances every run by one step, storing the realized rewards in "__last_rewards".
+
+        Returns
+        -------
+        tuple
+            (selected_actions, flat_indices) where flat_indices index the raveled (runs, k) arrays
+        """
+        self.__step += 1
+        if self.walk_variance:
+            # Nonstationary: every action value of every run takes one step of its random walk, read from the chunk's path
+            chunk, row = divmod(self.__step - 1, self.__drift_rows)
+            if row == 0:
+                self.__drawDrift(self.__flat_actions.copy(), chunk)
+            self.__flat_actions = self.__drift_path[row]
+            self.actions = self.__flat_actions.reshape(self.runs, self.k)
+        selected_actions = self.__policy()
+        flat = self.__offsets + selected_actions
+        selected_rewards = self.__rng.standard_normal(self.runs, dtype=self.dtype)
+        selected_rewards *= self.variance
+        selected_rewards += self.__flat_actions.take(flat)
+        self.total_points += selected_rewards
+        self.__last_rewards = selected_rewards
+
+        # Masked incremental-mean update: each run only touches the single action it selected, in place on (runs,) vectors
+        counts = self.__flat_counts
+        estimates = self.__flat_estimates
+        n = counts.take(flat)
+        if self.__count_limit != None: # Saturate rather than wrap around
+            np.minimum(n, self.__count_limit - 1, out=n)
+        n += 1
+        counts[flat] = n
+        q = estimates.take(flat)
+        delta = selected_rewards - q
+        if self.__step_size != None:
+            delta *= self.__step_size
+        else:
+            np.divide(delta, n, out=delta, casting="unsafe")
+        q += delta
+        estimates[flat] = q
+        if self.__reward_square_sums is not None:
+            square_sums = self.__reward_square_sums.reshape(-1)
+            square_sums[flat] = square_sums.take(flat) + selected_rewards * selected_rewards
+        return selected_actions, flat
+
+    def runSequence(self, n: int = 1000) -> tuple:
+        """
+        Step every run n times, recording the learning curves averaged across all runs
+
+        Parameters
+        ----------
+        n : int
+            Number of times to call "chooseActions()" (default 1000)
+
+        Returns
+        -------
+        tuple
+            (mean_rewards, percent_optimal), both arrays of length n where:
+                - index = step
+                - value = mean reward / percentage of runs which selected an optimal action at that step
+        """
+        mean_rewards = np.empty(n)
+        percent_optimal = np.empty(n)
+        optimal = self.__optimal
+        for i in range(n):
+            flat = self.__advance()[1]
+            mean_rewards[i] = self.__last_rewards.sum()
+            if self.walk_variance: # Optimal actions move as the values drift
+                optimal_count = np.count_nonzero(self.__flat_actions.take(flat) == self.actions.max(axis=1))
+            else:
+                optimal_count = np.count_nonzero(optimal.take(flat))
+            percent_optimal[i] = optimal_count
+        mean_rewards /= self.runs
+        percent_optimal *= 100 / self.runs
+        return mean_rewards, percent_optimal
+
+    def reset(self) -> None:
+        """
+        Reset values associated with every run's progress
+        """
+        self.__step = 0
+        self.total_points = np.zeros(self.runs)
+        self.__reward_estimates.fill(self.params.get("optimistic_val", 0))
+        self.__reward_select_counts.fill(0)
+        if self.__reward_square_sums is not None:
+            self.__reward_square_sums.fill(0)
+
+    def changeBandits(self, bandits: list) -> None:
+        """
+        Updates the runs to operate on the input bandits (one bandit per run)
+
+        Parameters
+        ----------
+        bandits : list
+            List of bandits sharing the same k, variance (and walk_variance, for nonstationary bandits), with true values stored in their "actions" attribute
+
+        Raises
+        ------
+        ValueError
+            If the bandits do not share the same k and variance
+        """
+        walk_variances = {getattr(bandit, "walk_variance", 0) for bandit in bandits}
+        if len({bandit.k for bandit in bandits}) != 1 or len({bandit.variance for bandit in bandits}) != 1 or len(walk_variances) != 1:
+            raise ValueError("Invalid Bandits, must all share the same k and variance")
+        self.variance = bandits[0].variance
+        self.walk_variance = walk_variances.pop()
+        self.__setActions(np.array([bandit.syncActions() if hasattr(bandit, "syncActions") else bandit.actions for bandit in bandits]))
+
+    def getState(self) -> dict:
+        """
+        Returns everything needed to resume every run exactly where it is (step, points totals, true action values, reward
+        estimates, select counts, random number generator state & the values the current chunk of random walk started from),
+        as a dict of arrays & scalars (arrays are not copied)
+        """
+        drift_start = self.__drift_start.reshape(self.runs, self.k) if self.__drift_start is not None else None
+        return {"step": self.__step, "total_points": self.total_points, "actions": self.actions, "reward_estimates": self.__reward_estimates,
+                "reward_select_counts": self.__reward_select_counts, "reward_square_sums": self.__reward_square_sums, "rng": self.__rng.bit_generator.state,
+                "drift_start": drift_start}
+
+    def setState(self, state: dict) -> None:
+        """
+        Restores a state returned by "getState", from an engine of the same agent class & hyperparameters
+
+        Parameters
+        ----------
+        state : dict
+            State returned by "getState"
+
+        Raises
+        ------
+        ValueError
+            If the state has a different number of runs or actions
+        """
+        actions = np.asarray(state["actions"], dtype=float)
+        if actions.shape != (self.runs, self.k):
+            raise ValueError("Invalid State, number of runs or actions does not match")
+        self.__setActions(actions)
+        self.__step = int(state["step"])
+        if self.walk_variance and self.__step % self.__drift_rows: # Mid-chunk, so the rest of the chunk's path is redrawn exactly
+            self.__drawDrift(np.asarray(state["drift_start"], dtype=self.dtype).ravel().copy(), (self.__step - 1) // self.__drift_rows)
+            self.__flat_actions = self.__drift_path[(self.__step - 1) % self.__drift_rows]
+            self.actions = self.__flat_actions.reshape(self.runs, self.k)
+        self.total_points = np.array(state["total_points"], dtype=float)
+        self.__reward_estimates[...] = state["reward_estimates"]
+        self.__reward_select_counts[...] = state["reward_select_counts"]
+        if self.__reward_square_sums is not None:
+            self.__reward_square_sums[...] = state["reward_square_sums"]
+        self.__rng.bit_generator.state = state["rng"]
@@ -0,0 +1,349 @@
+"""
+Benchmark Source File
+
+Benchmark suite measuring how fast every agent and bandit runs, so performance changes can be compared between commits.
+
+For every agent class and bandit size k, this measures:
+    - Steps per second of the scalar (one agent object) `runSequence` loop
+    - Per-step latency percentiles of `chooseAction`
+    - Peak memory allocated while running
+    - Steps per second of the batched (BatchedAgents) engine, for comparison
+It also compares the bandit's scalar `selectAction` against its batched `selectActions`, and (with --dtypes) checks that
+the batched engine's compact float32 / integer count state gives the same learning curves as float64, within Monte Carlo noise.
+
+Results are printed as a table and written as JSON. Passing a previous JSON file to --compare prints the speedup of every entry.
+
+Requires `numpy` to be installed, and the agents, bandits & batched source files to be imported correctly.
+
+Usage:
+    python benchmark.py --quick --output bench.json
+    python benchmark.py --output after.json --compare bench.json
+    python benchmark.py --dtypes
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+from agents import EpsilonGreedyAgent
+from agents import GradientBanditAgent
+from agents import GreedyAgent
+from agents import OptimisticGreedyAgent
+from agents import RandomAgent
+from agents import ThompsonSamplingAgent
+from agents import UpperConfidenceBoundAgent
+from bandits import StationaryBandit
+from batched import SUPPORTED_AGENTS
+from batched import BatchedAgents
+
+AGENT_CLASSES = [GreedyAgent, EpsilonGreedyAgent, OptimisticGreedyAgent, UpperConfidenceBoundAgent, ThompsonSamplingAgent, GradientBanditAgent, RandomAgent]
+K_VALUES = [3, 10, 100, 10000]
+
+# (dtype, count_dtype) pairs compared against float64 by "compareDtypes"
+DTYPE_PAIRS = [("float64", "float64"), ("float32", "uint32"), ("float32", "uint16")]
+
+# Mode name -> (scalar steps, latency samples, memory steps, batched runs, batched steps)
+MODES = {
+    "quick": (100000, 10000, 10000, 1000, 200),
+    "full": (10000000, 100000, 100000, 2000, 1000),
+}
+
+
+def benchmarkScalar(agent_class: type, k: int, n: int, latency_samples: int, memory_steps: int, seed: int = 0) -> dict:
+    """
+    Times a single agent object's `runSequence` loop on a stationary bandit
+
+    Parameters
+    ----------
+    agent_class : type
+        Agent class to benchmark
+    k : int
+        Number of "arms" the bandit has
+    n : int
+        Number of steps to time
+    latency_samples : int
+        Number of individually timed `chooseAction` calls used for the latency percentiles
+    memory_steps : int
+        Number of steps run under tracemalloc to measure peak memory
+    seed : int
+        Seed of the bandit & agent (default 0)
+
+    Returns
+    -------
+    dict
+        steps_per_sec, latency_ns (p50, p90, p99, max) and peak_memory_bytes
+    """
+    agent = agent_class(StationaryBandit(k, seed = seed), seed = seed)
+    start = time.perf_counter()
+    agent.runSequence(n)
+    elapsed = time.perf_counter() - start
+
+    latencies = np.empty(latency_samples)
+    choose_action = agent.chooseAction
+    clock = time.perf_counter_ns
+    for i in range(latency_samples):
+        before = clock()
+        choose_action()
+        latencies[i] = clock() - before
+
+    agent = agent_class(StationaryBandit(k, seed = seed), seed = seed)
+    tracemalloc.start()
+    agent.runSequence(memory_steps)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "steps_per_sec": n / elapsed,
+        "latency_ns": dict(zip(["p50", "p90", "p99", "max"], np.percentile(latencies, [50, 90, 99, 100]).tolist())),
+        "peak_memory_bytes": peak_memory,
+    }
+
+
+def benchmarkBatched(agent_class: type, k: int, runs: int, n: int, seed: int = 0) -> dict:
+    """
+    Times the batched engine running many copies of an agent at once
+
+    Parameters
+    ----------
+    agent_class : type
+        Agent class to benchmark
+    k : int
+        Number of "arms" each bandit has
+    runs : int
+        Number of runs simulated at once (reduced for large k, to keep each array around 10^6 entries)
+    n : int
+        Number of steps to time
+    seed : int
+        Seed of the engine (default 0)
+
+    Returns
+    -------
+    dict
+        runs, steps_per_sec (counting every run's step) and peak_memory_bytes
+    """
+    runs = max(1, min(runs, 10**6 // k))
+    tracemalloc.start()
+    engine = BatchedAgents(agent_class, runs, k, seed = seed)
+    start = time.perf_counter()
+    engine.runSequence(n)
+    elapsed = time.perf_counter() - start
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"runs": runs, "steps_per_sec": runs * n / elapsed, "peak_memory_bytes": peak_memory}
+
+
+def benchmarkBandit(k: int, n: int, seed: int = 0) -> dict:
+    """
+    Compares the bandit's scalar `selectAction` against its batched `selectActions`
+
+    Parameters
+    ----------
+    k : int
+        Number of "arms" the bandit has
+    n : int
+        Number of pulls to time
+    seed : int
+        Seed of the bandit (default 0)
+
+    Returns
+    -------
+    dict
+        scalar_pulls_per_sec and batched_pulls_per_sec
+    """
+    bandit = StationaryBandit(k, seed = seed)
+    actions = np.random.default_rng(seed).integers(0, k, n)
+    action_list = actions.tolist()
+    select_action = bandit.selectAction
+    start = time.perf_counter()
+    for a in action_list:
+        select_action(a)
+    scalar_elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    bandit.selectActions(actions)
+    batched_elapsed = time.perf_counter() - start
+    return {"scalar_pulls_per_sec": n / scalar_elapsed, "batched_pulls_per_sec": n / batched_elapsed}
+
+
+def compareDtypes(agent_class: type = EpsilonGreedyAgent, runs: int = 2000, k: int = 10, n: int = 1000, window: int = 50,
+                  seed: int = 0, **agent_params) -> list:
+    """
+    Runs the batched engine with every (dtype, count_dtype) pair of DTYPE_PAIRS on the same seed, checking that each compact
+    state's learning curve matches the float64 one to within Monte Carlo noise
+
+    The curves are averaged over windows of consecutive steps, and a pair passes when every window's difference from float64
+    is within 4 standard errors of a difference of two independent runs (the compact state drifts onto its own random
+    trajectory as soon as one rounded comparison goes the other way, so two independent runs is the honest reference).
+    The standard errors come from the spread of each run's own window mean, since rewards within a window of one run are
+    correlated through the arm it keeps choosing
+
+    Parameters
+    ----------
+    agent_class : type
+        Batched agent class to compare (default EpsilonGreedyAgent)
+    runs : int
+        Number of runs simulated at once (default 2000)
+    k : int
+        Number of "arms" each bandit has (default 10)
+    n : int
+        Number of steps (default 1000), rounded down to a whole number of windows
+    window : int
+        Number of consecutive steps each compared window averages over (default 50)
+    seed : int
+        Seed of the engine (default 0)
+    **agent_params
+        Hyperparameters forwarded to the agent logic (ex: epsilon = 0.1)
+
+    Returns
+    -------
+    list
+        One dict per pair: dtype, count_dtype, bytes_per_entry (of the (runs, k) state), steps_per_sec,
+        max_z (largest window difference in standard errors) and passed
+    """
+    windows = n // window
+    results = []
+    reference = None
+    for dtype, count_dtype in DTYPE_PAIRS:
+        engine = BatchedAgents(agent_class, runs, k, seed = seed, dtype = dtype, count_dtype = count_dtype, **agent_params)
+        state = engine.getState()
+        bytes_per_entry = sum(state[name].itemsize for name in ("actions", "reward_estimates", "reward_select_counts"))
+        # Each run's mean reward over every window, from the change of its total points
+        run_means = np.empty((windows, runs))
+        elapsed = 0
+        for i in range(windows):
+            previous = engine.total_points.copy()
+            start = time.perf_counter()
+            engine.runSequence(window)
+            elapsed += time.perf_counter() - start
+            run_means[i] = (engine.total_points - previous) / window
+        curve = run_means.mean(axis=1)
+        spread = run_means.var(axis=1, ddof=1)
+        if reference is None:
+            reference, reference_spread = curve, spread
+        standard_error = np.sqrt((spread + reference_spread) / runs)
+        max_z = float((np.abs(curve - reference) / np.maximum(standard_error, np.finfo(float).tiny)).max())
+        results.append({
+            "dtype": dtype,
+            "count_dtype": count_dtype,
+            "bytes_per_entry": bytes_per_entry,
+            "steps_per_sec": runs * windows * window / elapsed,
+            "max_z": max_z,
+            "passed": max_z < 4,
+        })
+        print(f"{dtype:>9}{count_dtype:>9}{results[-1]['bytes_per_entry']:>5} B/entry{results[-1]['steps_per_sec']:>16,.0f} steps/s"
+              f"{max_z:>8.2f} SE{'  ok' if max_z < 4 else '  MISMATCH':>10}")
+    return results
+
+
+def runBenchmarks(mode: str = "quick", k_values: list = None, agent_classes: list = None) -> dict:
+    """
+    Runs every benchmark, returning the machine-readable results
+
+    Parameters
+    ----------
+    mode : str
+        "quick" (a few minutes) or "full" (n = 10^7 scalar steps per entry) (default "quick")
+    k_values : list
+        Bandit sizes to benchmark (default [3, 10, 100, 10000])
+    agent_classes : list
+        Agent classes to benchmark (default every agent class)
+    """
+    n, latency_samples, memory_steps, runs, batched_n = MODES[mode]
+    k_values = K_VALUES if k_values is None else k_values
+    agent_classes = AGENT_CLASSES if agent_classes is None else agent_classes
+
+    results = {"meta": _metadata(mode), "agents": [], "bandits": []}
+    for k in k_values:
+        results["bandits"].append({"k": k, **benchmarkBandit(k, n)})
+        for agent_class in agent_classes:
+            entry = {"agent": agent_class.__name__, "k": k, "n": n}
+            entry["scalar"] = benchmarkScalar(agent_class, k, n, latency_samples, memory_steps)
+            entry["batched"] = benchmarkBatched(agent_class, k, runs, batched_n) if agent_class in SUPPORTED_AGENTS else None
+            results["agents"].append(entry)
+            _printEntry(entry)
+    return results
+
+
+def compareResults(before: dict, after: dict) -> None:
+    """
+    Prints the speedup (after / before steps per second) of every entry found in both result sets
+
+    Parameters
+    ----------
+    before : dict
+        Results of the earlier run (ex: loaded from a previous commit's JSON)
+    after : dict
+        Results of the later run
+    """
+    previous = {(entry["agent"], entry["k"]): entry for entry in before["agents"]}
+    print(f"{'agent':<28}{'k':>7}{'scalar':>10}{'batched':>10}")
+    for entry in after["agents"]:
+        old = previous.get((entry["agent"], entry["k"]))
+        if old == None:
+            continue
+        scalar = entry["scalar"]["steps_per_sec"] / old["scalar"]["steps_per_sec"]
+        if entry["batched"] == None or old["batched"] == None:
+            print(f"{entry['agent']:<28}{entry['k']:>7}{scalar:>9.2f}x{'-':>10}")
+            continue
+        batched = entry["batched"]["steps_per_sec"] / old["batched"]["steps_per_sec"]
+        print(f"{entry['agent']:<28}{entry['k']:>7}{scalar:>9.2f}x{batched:>9.2f}x")
+
+
+def _metadata(mode: str) -> dict:
+    """
+    Returns information about the machine & code the benchmarks were run on
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output = True, text = True, check = True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "mode": mode,
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+    }
+
+
+def _printEntry(entry: dict) -> None:
+    """
+    Prints a single agent benchmark entry as a table row
+    """
+    scalar = entry["scalar"]
+    batched = f"{entry['batched']['steps_per_sec']:>16,.0f} batched steps/s" if entry["batched"] != None else f"{'(no batched policy)':>32}"
+    print(f"{entry['agent']:<28}{entry['k']:>7}{scalar['steps_per_sec']:>14,.0f} steps/s"
+          f"{scalar['latency_ns']['p50']:>9,.0f}ns p50{scalar['latency_ns']['p99']:>9,.0f}ns p99"
+          f"{scalar['peak_memory_bytes'] / 1024:>9,.0f}KiB{batched}")
+
+
+def main(argv: list = None) -> None:
+    parser = argparse.ArgumentParser(description = "Benchmark every agent and bandit size")
+    parser.add_argument("--quick", action = "store_true", help = "run the quick (few minute) mode instead of the full one")
+    parser.add_argument("--k", type = int, nargs = "+", default = None, help = "bandit sizes to benchmark")
+    parser.add_argument("--output", default = None, help = "JSON file to write results to")
+    parser.add_argument("--compare", default = None, help = "previous JSON results to compare against")
+    parser.add_argument("--dtypes", action = "store_true", help = "only compare the batched engine's compact dtypes against float64")
+    args = parser.parse_args(argv)
+
+    if args.dtypes:
+        compareDtypes(k = args.k[0] if args.k else 10, epsilon = 0.1)
+        return
+
+    results = runBenchmarks("quick" if args.quick else "full", args.k)
+    if args.output != None:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent = 2)
+    if args.compare != None:
+        with open(args.compare) as file:
+            compareResults(json.load(file), results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+"""
+Cache Source File
+
+On-disk, content-addressed cache of batched experiment results, so rerunning an identical configuration is instant.
+
+Every entry is keyed by a hash of the full configuration (agent class, every hyperparameter including the class' own
+defaults, runs, k, min, max, variance, walk variance, seed & dtypes) together with a hash of the source files the results depend
+on, so editing an agent or bandit never serves stale results. An entry holds the per-step result curves (compressed),
+plus the engine's full state after its last step, so asking for MORE steps than are cached resumes from that state
+instead of recomputing from step 0 (and gives bit-identical results to an uninterrupted run).
+
+Entries are written atomically (through a temporary file unique to the writing process), so any number of processes
+(ex: a process pool sweep) can share one cache directory: readers never see a partial entry, and concurrent writers of
+the same entry simply replace each other with identical results. Once the cache grows past "max_bytes", the least
+recently used entries are evicted.
+
+Requires `numpy` to be installed, and the bandits, batched, checkpoints & streams source files to be imported correctly.
+
+Usage:
+    cache = ResultCache("results_cache")
+    mean_rewards, percent_optimal = cache.runBatched(EpsilonGreedyAgent, n = 1000, runs = 2000, k = 10, seed = 0, epsilon = 0.1)
+"""
+
+import hashlib
+import json
+import os
+
+import numpy as np
+from bandits import NonstationaryBandit
+from bandits import StationaryBandit
+from batched import BatchedAgents
+from checkpoints import flattenState
+from checkpoints import unflattenState
+from checkpoints import writeAtomic
+from streams import childSeed
+
+# Source files whose contents determine batched results (any change to them invalidates every entry)
+CODE_FILES = ("agents.py", "bandits.py", "batched.py", "streams.py", "trees.py")
+
+_code_version = None
+
+
+def codeVersion() -> str:
+    """
+    Returns a hash of the source files listed in CODE_FILES (computed once per process)
+    """
+    global _code_version
+    if _code_version == None:
+        digest = hashlib.sha256()
+        directory = os.path.dirname(os.path.abspath(__file__))
+        for name in CODE_FILES:
+            with open(os.path.join(directory, name), "rb") as file:
+                digest.update(name.encode() + b"\0" + file.read() + b"\0")
+        _code_version = digest.hexdigest()
+    return _code_version
+
+
+def normalizeConfig(config):
+    """
+    Returns a configuration with every NumPy scalar or array (ex: a float32 hyperparameter taken from `np.linspace`) replaced
+    by the equivalent Python value, and every SeedSequence by its entropy & spawn key, so it can be written as JSON and
+    hashes the same as its plain Python form
+
+    Parameters
+    ----------
+    config : dict, list, tuple or value
+        Configuration, or any value within it
+    """
+    if isinstance(config, dict):
+        return {name: normalizeConfig(value) for name, value in config.items()}
+    if isinstance(config, (list, tuple)):
+        return [normalizeConfig(value) for value in config]
+    if isinstance(config, (np.generic, np.ndarray)):
+        return config.tolist()
+    if isinstance(config, np.random.SeedSequence):
+        return {"entropy": config.entropy, "spawn_key": list(config.spawn_key)}
+    return config
+
+
+class ResultCache:
+    """
+    Content-addressed cache of batched experiment results, stored as compressed .npz files in a directory
+
+    ...
+
+    Attributes
+    ----------
+    directory : str
+        Directory holding the cache entries (created if needed)
+    max_bytes : int
+        Total size of the entries above which the least recently used are evicted (default 1 GiB)
+    hits : int
+        Number of requests served entirely from the cache
+    partial_hits : int
+        Number of requests which resumed from a cached entry holding fewer steps
+    misses : int
+        Number of requests computed from step 0
+
+    Methods
+    -------
+    key(config)
+        Returns the key of a configuration
+    load(key)
+        Returns the arrays of a cached entry, or None
+    store(key, arrays)
+        Atomically writes an entry, then evicts the least recently used entries past "max_bytes"
+    runBatched(agent_class, n = 1000, runs = 2000, k = 3, min = 0, max = 10, variance = 1, walk_variance = 0, seed = 0, **agent_params)
+        Returns the learning curves of a batched experiment, computing only the steps not already cached
+    size()
+        Returns the total size of the entries in bytes
+    clear()
+        Removes every entry
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 2**30) -> None:
+        """
+        Parameters
+        ----------
+        directory : str
+            Directory to hold the cache entries (created if needed)
+        max_bytes : int
+            Total size of the entries above which the least recently used are evicted (default 1 GiB)
+
+        Raises
+        ------
+        ValueError
+            If max_bytes is not positive
+        """
+        if max_bytes < 1:
+            raise ValueError("Invalid Max Bytes, must be positive")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.partial_hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok = True)
+
+    def __path(self, key: str) -> str:
+        """
+        Private method which returns the path of an entry
+        """
+        return os.path.join(self.directory, key + ".npz")
+
+    def __entries(self) -> list:
+        """
+        Private method which returns (last use time, size, path) of every entry, least recently used first
+        """
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".npz"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError: # Evicted by another process meanwhile
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return sorted(entries)
+
+    def key(self, config: dict) -> str:
+        """
+        Returns the key of a configuration: a hash of its canonical JSON form and the code version
+
+        Parameters
+        ----------
+        config : dict
+            JSON serializable configuration (NumPy scalars & arrays are taken as their Python values)
+        """
+        text = json.dumps({"config": normalizeConfig(config), "code": codeVersion()}, sort_keys = True)
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def load(self, key: str) -> dict:
+        """
+        Returns the arrays of a cached entry (marking it as most recently used), or None if it is not cached
+
+        Parameters
+        ----------
+        key : str
+            Key of the entry
+        """
+        path = self.__path(key)
+        try:
+            with np.load(path, allow_pickle = False) as data:
+                arrays = {name: data[name] for name in data.files}
+            os.utime(path)
+        except FileNotFoundError: # Not cached, or evicted by another process meanwhile
+            return None
+        return arrays
+
+    def store(self, key: str, arrays: dict) -> None:
+        """
+        Atomically writes an entry (replacing any previous one under the same key), then evicts the least recently used
+        entries until the cache fits in "max_bytes" again (the new entry is never evicted)
+
+        Parameters
+        ----------
+        key : str
+            Key of the entry
+        arrays : dict
+            Arrays to store, by name
+        """
+        path = self.__path(key)
+        writeAtomic(path, arrays, compressed = True)
+        entries = self.__entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry_path in entries:
+            if total <= self.max_bytes:
+                break
+            if entry_path == path:
+                continue
+            try:
+                os.remove(entry_path)
+            except FileNotFoundError: # Already evicted by another process
+                pass
+            total -= size
+
+    def __seedBandits(self, engine: BatchedAgents, bandit_seed: np.random.SeedSequence, k: int, min: int, max: int, variance: float,
+                      walk_variance: float) -> None:
+        """
+        Private method which installs the bandits created from the children of bandit_seed into the engine (run i facing
+        the i-th child's bandit), unless bandit_seed is None
+        """
+        if bandit_seed is None:
+            return
+        if walk_variance:
+            bandits = [NonstationaryBandit(k, min, max, variance, walk_variance, seed = childSeed(bandit_seed, run)) for run in range(engine.runs)]
+        else:
+            bandits = [StationaryBandit(k, min, max, variance, seed = childSeed(bandit_seed, run)) for run in range(engine.runs)]
+        engine.changeBandits(bandits)
+
+    def runBatched(self, agent_class: type, n: int = 1000, runs: int = 2000, k: int = 3, min: int = 0, max: int = 10, variance: float = 1,
+                   walk_variance: float = 0, seed: int = 0, bandit_seed: np.random.SeedSequence = None, **agent_params) -> tuple:
+        """
+        Returns the learning curves of a BatchedAgents experiment, served from the cache when the same configuration has
+        already been run for at least n steps, and otherwise resumed from the longest cached run (or computed from step 0)
+
+        Parameters
+        ----------
+        agent_class : type
+            Agent class to run in batch (ex: EpsilonGreedyAgent)
+        n : int
+            Number of steps (default 1000)
+        runs : int
+            Number of independent bandit/agent pairs (default 2000)
+        k : int
+            Number of "arms" (valid actions) each bandit has (default 3)
+        min : int
+            Minimum value for the reward (default 0)
+        max : int
+            Maximum value for the reward (default 10)
+        variance : float
+            Normal distribution variance value (default 1)
+        walk_variance : float
+            Variance value of each step of the random walk every action value takes (default 0, for stationary bandits)
+        seed : int or np.random.SeedSequence
+            Seed of the experiment (default 0). None computes the experiment without caching it, since it could never be repeated
+        bandit_seed : int or np.random.SeedSequence
+            Parent stream of the bandits, where run i faces a StationaryBandit (or NonstationaryBandit, with a walk_variance)
+            created from its i-th child, as the scalar engine builds them (default None, for values drawn by the engine itself)
+        **agent_params
+            Hyperparameters forwarded to the agent logic (ex: epsilon = 0.1), or the engine's "dtype" & "count_dtype"
+
+        Returns
+        -------
+        tuple
+            (mean_rewards, percent_optimal), as returned by `BatchedAgents.runSequence(n)`
+        """
+        engine = BatchedAgents(agent_class, runs, k, min, max, variance, walk_variance, seed, **agent_params)
+        if bandit_seed is not None and not isinstance(bandit_seed, np.random.SeedSequence):
+            bandit_seed = np.random.SeedSequence(bandit_seed)
+        if seed is None:
+            self.misses += 1
+            self.__seedBandits(engine, bandit_seed, k, min, max, variance, walk_variance)
+            return engine.runSequence(n)
+        config = normalizeConfig({"agent": agent_class.__name__, "params": engine.params, "runs": runs, "k": k, "min": min, "max": max,
+                                  "variance": variance, "walk_variance": walk_variance, "seed": seed, "bandit_seed": bandit_seed, "dtype": engine.dtype,
+                                  "count_dtype": engine.count_dtype})
+        key = self.key(config)
+        arrays = self.load(key)
+        if arrays != None and len(arrays["result.mean_rewards"]) >= n:
+            self.hits += 1
+            return arrays["result.mean_rewards"][:n], arrays["result.percent_optimal"][:n]
+
+        if arrays != None:
+            self.partial_hits += 1
+            engine.setState(unflattenState(arrays, "state"))
+            mean_rewards, percent_optimal = engine.runSequence(n - len(arrays["result.mean_rewards"]))
+            mean_rewards = np.concatenate((arrays["result.mean_rewards"], mean_rewards))
+            percent_optimal = np.concatenate((arrays["result.percent_optimal"], percent_optimal))
+        else:
+            self.misses += 1
+            self.__seedBandits(engine, bandit_seed, k, min, max, variance, walk_variance)
+            mean_rewards, percent_optimal = engine.runSequence(n)
+        self.store(key, {"result.mean_rewards": mean_rewards, "result.percent_optimal": percent_optimal,
+                         "meta.config": np.array(json.dumps(config, sort_keys = True)), **flattenState("state", engine.getState())})
+        return mean_rewards, percent_optimal
+
+    def size(self) -> int:
+        """
+        Returns the total size of the entries in bytes
+        """
+        return sum(size for _, size, _ in self.__entries())
+
+    def clear(self) -> None:
+        """
+        Removes every entry
+        """
+        for _, _, path in self.__entries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,264 @@
+"""
+Checkpoints Source File
+
+Saving & restoring agent runs, so long runs can be interrupted and resumed exactly where they left off.
+
+A checkpoint holds the full state of an agent and its bandit (as returned by their `getState` methods): reward estimates,
+select counts, points total, random number generator states & buffered draws, and the bandit's true action values.
+Restoring a checkpoint into freshly constructed objects of the same classes & hyperparameters therefore continues the
+exact same trajectory an uninterrupted run would have taken.
+
+Checkpoints are a single uncompressed .npz file (no pickling), which replaces the previous checkpoint atomically. For large k,
+a MemmapCheckpoint instead backs the agent's & bandit's per-action arrays directly by memory-mapped .npy files, so saving a
+checkpoint only flushes the pages that changed, plus a small file holding the remaining state.
+
+Requires `numpy` to be installed.
+
+Usage:
+    saveCheckpoint("run.npz", agent)
+    ...
+    agent = EpsilonGreedyAgent(StationaryBandit(k), epsilon) # Same classes & hyperparameters as the saved agent
+    loadCheckpoint("run.npz", agent)
+"""
+
+import json
+import os
+
+import numpy as np
+
+
+def saveCheckpoint(path: str, agent) -> None:
+    """
+    Saves the state of an agent and its bandit to a single .npz file, atomically replacing any previous checkpoint at that path
+
+    Parameters
+    ----------
+    path : str
+        File to write (used exactly as given, so include the .npz extension)
+    agent : Agent
+        Agent to save (along with its bandit)
+    """
+    arrays = _metadata(agent)
+    for prefix, owner in _owners(agent):
+        arrays.update(flattenState(prefix, owner.getState()))
+    writeAtomic(path, arrays)
+
+
+def loadCheckpoint(path: str, agent) -> None:
+    """
+    Restores an agent and its bandit from a checkpoint written by "saveCheckpoint"
+
+    Parameters
+    ----------
+    path : str
+        Checkpoint file to read
+    agent : Agent
+        Agent to restore into, constructed with the same class & hyperparameters as the saved agent, on a bandit of the
+        same class & number of actions
+
+    Raises
+    ------
+    ValueError
+        If the checkpoint was saved from a different agent or bandit class, or a different number of actions
+    """
+    with np.load(path, allow_pickle = False) as data:
+        arrays = {key: data[key] for key in data.files}
+    _checkClasses(arrays, agent)
+    for prefix, owner in _owners(agent):
+        owner.setState(unflattenState(arrays, prefix))
+
+
+class MemmapCheckpoint:
+    """
+    Checkpoint directory which backs an agent's and its bandit's per-action arrays (their "state_arrays") by memory-mapped .npy
+    files, so the run updates the files' pages in place and saving a checkpoint is close to free: the mapped arrays are only
+    flushed, and the remaining (small) state is written atomically to "state.npz".
+
+    Agents & bandits allocate new arrays when reset or given a new bandit, so "attach" must be called again after
+    `reset()` or `changeBandit()`. Agents which keep their estimates as Python lists (small k) have nothing to map, and are
+    simply saved whole into "state.npz".
+
+    NOTE: The mapped arrays are flushed before "state.npz" is replaced, so a crash in between leaves the arrays one save ahead of it
+
+    ...
+
+    Attributes
+    ----------
+    directory : str
+        Directory holding the .npy files & "state.npz"
+    agent : Agent
+        Agent being checkpointed (along with its bandit)
+    __mapped : dict
+        Memory-mapped arrays currently backing the agent & bandit, by "owner.name" key
+
+    Methods
+    -------
+    attach()
+        Moves the agent's & bandit's arrays into fresh memory-mapped files, then saves
+    save()
+        Flushes the mapped arrays, then atomically writes the remaining state
+    restore()
+        Restores the agent & bandit from the directory, keeping their arrays mapped to its files
+    """
+
+    def __init__(self, directory: str, agent) -> None:
+        """
+        Parameters
+        ----------
+        directory : str
+            Directory to hold the checkpoint (created if needed)
+        agent : Agent
+            Agent to checkpoint (along with its bandit)
+        """
+        self.directory = directory
+        self.agent = agent
+        self.__mapped = {}
+        os.makedirs(directory, exist_ok = True)
+
+    def __path(self, name: str) -> str:
+        """
+        Private method which returns the path of a file in the checkpoint directory
+        """
+        return os.path.join(self.directory, name)
+
+    def attach(self) -> None:
+        """
+        Copies the agent's & bandit's in-place arrays into fresh memory-mapped files (overwriting any previous checkpoint),
+        makes the agent & bandit use the mapped arrays from then on, then saves
+        """
+        self.__mapped = {}
+        for prefix, owner in _owners(self.agent):
+            state = owner.getState()
+            for name in owner.state_arrays:
+                value = state.get(name)
+                if isinstance(value, np.ndarray):
+                    key = f"{prefix}.{name}"
+                    mapped = np.lib.format.open_memmap(self.__path(key + ".npy"), mode = "w+", dtype = value.dtype, shape = value.shape)
+                    mapped[...] = value
+                    state[name] = self.__mapped[key] = mapped
+            owner.setState(state)
+        self.save()
+
+    def save(self) -> None:
+        """
+        Flushes every mapped array to disk, then atomically writes the remaining state to "state.npz"
+        """
+        for mapped in self.__mapped.values():
+            mapped.flush()
+        arrays = _metadata(self.agent)
+        arrays["meta.mapped"] = np.array(sorted(self.__mapped), dtype = str)
+        for prefix, owner in _owners(self.agent):
+            arrays.update((key, value) for key, value in flattenState(prefix, owner.getState()).items() if key not in self.__mapped)
+        writeAtomic(self.__path("state.npz"), arrays)
+
+    def restore(self) -> None:
+        """
+        Restores the agent & bandit from the directory, re-opening its arrays as memory maps so later saves keep flushing into them
+
+        Raises
+        ------
+        ValueError
+            If the checkpoint was saved from a different agent or bandit class, or a different number of actions
+        """
+        with np.load(self.__path("state.npz"), allow_pickle = False) as data:
+            arrays = {key: data[key] for key in data.files}
+        _checkClasses(arrays, self.agent)
+        self.__mapped = {key: np.lib.format.open_memmap(self.__path(key + ".npy"), mode = "r+") for key in arrays["meta.mapped"].tolist()}
+        arrays.update(self.__mapped)
+        for prefix, owner in _owners(self.agent):
+            owner.setState(unflattenState(arrays, prefix))
+
+
+def _owners(agent) -> list:
+    """
+    Returns the (key prefix, object) pairs saved in a checkpoint: the agent and its bandit
+    """
+    return [("agent", agent), ("bandit", agent.bandit)]
+
+
+def _metadata(agent) -> dict:
+    """
+    Returns the entries recording which agent & bandit classes a checkpoint was saved from
+    """
+    return {"meta.agent": np.array(type(agent).__name__), "meta.bandit": np.array(type(agent.bandit).__name__)}
+
+
+def _checkClasses(arrays: dict, agent) -> None:
+    """
+    Raises a ValueError if a checkpoint was saved from different agent or bandit classes than the input agent's
+    """
+    for key, obj in (("meta.agent", agent), ("meta.bandit", agent.bandit)):
+        saved = arrays[key].item()
+        if saved != type(obj).__name__:
+            raise ValueError(f"Invalid Checkpoint, saved from a {saved}, not a {type(obj).__name__}")
+
+
+def flattenState(prefix: str, state: dict) -> dict:
+    """
+    Returns a state dict (as returned by a `getState` method) as flat "prefix.name" arrays, ready to be saved to an .npz
+    file. None values are left out, and dicts (random number generator states) are stored as JSON strings under "prefix.name.json"
+
+    Parameters
+    ----------
+    prefix : str
+        Prefix of every array name (ex: "agent")
+    state : dict
+        State to flatten
+    """
+    arrays = {}
+    for name, value in state.items():
+        if value is None:
+            continue
+        if isinstance(value, dict):
+            arrays[f"{prefix}.{name}.json"] = np.array(json.dumps(value, default = lambda array: array.tolist()))
+        else:
+            arrays[f"{prefix}.{name}"] = np.asarray(value)
+    return arrays
+
+
+def unflattenState(arrays: dict, prefix: str) -> dict:
+    """
+    Returns the state dict stored under "prefix." by "flattenState", with 0-d arrays turned back into Python scalars
+
+    Parameters
+    ----------
+    arrays : dict
+        Arrays loaded from an .npz file, by name
+    prefix : str
+        Prefix the state was flattened under
+    """
+    state = {}
+    start = len(prefix) + 1
+    for key, value in arrays.items():
+        if not key.startswith(prefix + "."):
+            continue
+        name = key[start:]
+        if name.endswith(".json"):
+            state[name[:-len(".json")]] = json.loads(value.item())
+        elif value.ndim == 0:
+            state[name] = value.item()
+        else:
+            state[name] = value
+    return state
+
+
+def writeAtomic(path: str, arrays: dict, compressed: bool = False) -> None:
+    """
+    Writes arrays to an .npz file through a temporary file, so a crash never leaves a partially written file behind. The
+    temporary file is unique to the writing process, so concurrent writers of the same path never interleave: the last one wins
+
+    Parameters
+    ----------
+    path : str
+        File to write (used exactly as given, so include the .npz extension)
+    arrays : dict
+        Arrays to write, by name
+    compressed : bool
+        Whether to compress the arrays (default False)
+    """
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as file:
+        (np.savez_compressed if compressed else np.savez)(file, **arrays)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
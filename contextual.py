@@ -0,0 +1,602 @@
+"""
+Contextual Source File
+
+Contextual bandits, where every step presents a context (a feature vector, ex: a user's features) before the action is
+selected, and the reward depends on both, plus the LinUCB agent which learns a linear reward model of each action.
+
+A contextual bandit keeps a queue of pending contexts: `getContext()` / `getContexts(m)` look at the next context(s) without
+consuming them, and `selectAction(a)` / `selectActions(actions)` realize the reward of the next pending context(s), consuming
+them. Contexts are drawn in fixed size blocks from their own random number stream (separate from the reward noise), so the
+sequence of contexts depends only on the seed, not on how many are looked at or consumed at once (ex: a scalar run & a
+mini-batch run see the same contexts).
+
+Requires `numpy` to be installed, and the agents, bandits & streams source files to be imported correctly.
+
+Currently contains implementations for:
+    - Contextual Bandit (base class, supplying the context queue)
+    - Linear Contextual Bandit (synthetic rewards linear in the context, for testing)
+    - LinUCB Agent (disjoint linear models, Sherman-Morrison updates, mini-batch selection & learning)
+
+Usage:
+    bandit = LinearContextualBandit(k = 10, d = 20, seed = 0)
+    agent = LinUCBAgent(bandit, alpha = 1, seed = 0)
+    agent.runSequence(10000)              # One context per step
+    agent.runBatches(10000, batch_size = 64) # Mini-batches of 64 contexts, all scored against the same model
+"""
+
+from collections import deque
+
+import numpy as np
+from agents import Agent
+from bandits import Bandit
+from streams import spawnGenerators
+
+
+class ContextualBandit(Bandit):
+    """
+    Base class of every contextual bandit, which owns the queue of pending contexts. Extends the "Bandit" interface.
+    Subclasses supply how contexts are drawn ("_drawContexts") and the rewards of actions taken in contexts ("_rewards").
+
+    ...
+
+    Attributes
+    ----------
+    k : int
+        Number of "arms" (valid actions) the bandit has
+    d : int
+        Number of features of every context
+    context_buffer_size : int
+        Number of contexts drawn at once
+    context_rng : np.random.Generator
+        Random number generator used for the contexts
+    rng : np.random.Generator
+        Random number generator used for the rewards
+    __pending : np.array
+        (pending contexts, d) array of contexts drawn but not consumed yet
+    __index : int
+        Index of the next pending context in "__pending"
+
+    Methods
+    -------
+    getContext()
+        Returns the next pending context, without consuming it
+    getContexts(m)
+        Returns the next m pending contexts, without consuming them
+    selectAction(a)
+        Returns the reward of the input action in the next pending context, consuming it
+    selectActions(actions)
+        Returns the rewards of the input actions in the next len(actions) pending contexts, consuming them
+    getState()
+        Returns the random number generator states & pending contexts
+    setState(state)
+        Restores a state returned by "getState"
+    """
+
+    def __init__(self, k: int, d: int, context_buffer_size: int = 1024, seed = None) -> None:
+        """
+        Parameters
+        ----------
+        k : int
+            Number of "arms" (valid actions) the bandit has
+        d : int
+            Number of features of every context
+        context_buffer_size : int
+            Number of contexts drawn at once (default 1024)
+        seed : None, int, np.random.SeedSequence or np.random.Generator
+            Seed for the bandit's random number generators (default None)
+
+        Raises
+        ------
+        ValueError
+            If k, d or context_buffer_size is not positive
+        """
+        if k < 1 or d < 1:
+            raise ValueError("Invalid Bandit, k and d must be positive")
+        if context_buffer_size < 1:
+            raise ValueError("Invalid Context Buffer Size, must be positive")
+        self.k = k
+        self.d = d
+        self.context_buffer_size = context_buffer_size
+        self.context_rng, self.rng = spawnGenerators(seed, 2)
+        self.__pending = np.empty((0, d))
+        self.__index = 0
+
+    def _drawContexts(self, m: int) -> np.ndarray:
+        """
+        Protected method which returns m new contexts as an (m, d) array, drawn from "context_rng" (implemented by every contextual bandit)
+        """
+        raise NotImplementedError
+
+    def _rewards(self, contexts: np.ndarray, actions: np.ndarray) -> np.ndarray:
+        """
+        Protected method which returns the rewards of actions[i] taken in contexts[i], drawing any noise from "rng"
+        (implemented by every contextual bandit)
+        """
+        raise NotImplementedError
+
+    def getContexts(self, m: int) -> np.ndarray:
+        """
+        Returns the next m pending contexts as an (m, d) array (a view), drawing more blocks of contexts if needed. They stay
+        pending until consumed by "selectAction" or "selectActions"
+
+        Parameters
+        ----------
+        m : int
+            Number of contexts to look at
+        """
+        # Blocks are only ever replaced (never written in place), so views returned earlier stay valid
+        available = len(self.__pending) - self.__index
+        if available < m:
+            blocks = [self.__pending[self.__index:]]
+            while available < m:
+                blocks.append(self._drawContexts(self.context_buffer_size))
+                available += self.context_buffer_size
+            self.__pending = np.concatenate(blocks)
+            self.__index = 0
+        return self.__pending[self.__index:self.__index + m]
+
+    def getContext(self) -> np.ndarray:
+        """
+        Returns the next pending context as a (d,) array, without consuming it
+        """
+        if self.__index == len(self.__pending):
+            self.getContexts(1)
+        return self.__pending[self.__index]
+
+    def selectAction(self, a: int) -> float:
+        """
+        Returns the reward of the input action in the next pending context, consuming it
+
+        Parameters
+        ----------
+        a : int
+            Which action to take (from 0 to k)
+
+        Raises
+        ------
+        ValueError
+            If selected action is not within the range of accepted "k" actions
+        """
+        if not 0 <= a < self.k:
+            raise ValueError("Invalid Action, out of range")
+        context = self.getContext()
+        self.__index += 1
+        return self._rewards(context[None], np.array([a]))[0]
+
+    def selectActions(self, actions: np.ndarray) -> np.ndarray:
+        """
+        Returns the rewards of actions[i] taken in the i-th next pending context, consuming len(actions) contexts
+
+        Parameters
+        ----------
+        actions : np.array
+            Which actions to take (each from 0 to k), in the order of the pending contexts
+
+        Raises
+        ------
+        ValueError
+            If any selected action is not within the range of accepted "k" actions
+        """
+        actions = np.asarray(actions).ravel()
+        if actions.size and (actions.min() < 0 or actions.max() >= self.k):
+            raise ValueError("Invalid Action, out of range")
+        contexts = self.getContexts(actions.size)
+        self.__index += actions.size
+        return self._rewards(contexts, actions)
+
+    def getState(self) -> dict:
+        """
+        Returns the random number generator states & pending contexts, as a dict (arrays are not copied)
+        """
+        return {"context_rng": self.context_rng.bit_generator.state, "rng": self.rng.bit_generator.state,
+                "pending": self.__pending[self.__index:]}
+
+    def setState(self, state: dict) -> None:
+        """
+        Restores a state returned by "getState"
+
+        Parameters
+        ----------
+        state : dict
+            State of a bandit of the same type & dimensions
+
+        Raises
+        ------
+        ValueError
+            If the state's contexts have a different number of features
+        """
+        pending = np.asarray(state["pending"], dtype=float)
+        if pending.ndim != 2 or pending.shape[1] != self.d:
+            raise ValueError("Invalid State, number of features does not match")
+        self.context_rng.bit_generator.state = state["context_rng"]
+        self.rng.bit_generator.state = state["rng"]
+        self.__pending = pending
+        self.__index = 0
+
+
+class LinearContextualBandit(ContextualBandit):
+    """
+    Synthetic contextual bandit whose expected rewards are linear in the context: the reward of action a in context x is
+    x · coefficients[a] plus Gaussian noise. Extends the "ContextualBandit" base class
+
+    Contexts are standard normal vectors scaled by 1 / sqrt(d) (and coefficients standard normal), so expected rewards have a
+    standard deviation of about 1 whatever the number of features.
+
+    ...
+
+    Attributes
+    ----------
+    coefficients : np.array
+        (k, d) array of every action's true coefficients
+    variance : float
+        Normal distribution variance value of the reward noise (default 1)
+        (NOTE: Like `StationaryBandit`, this is passed as the scale of the normal distribution)
+
+    Methods
+    -------
+    getExpectedRewards(contexts)
+        Returns the expected reward of every action in every input context
+    getState()
+        Returns the Contextual Bandit state, plus the true coefficients
+    setState(state)
+        Restores a state returned by "getState"
+    """
+
+    state_arrays = ("coefficients",)
+
+    def __init__(self, k: int = 3, d: int = 5, variance: float = 1, context_buffer_size: int = 1024, seed = None) -> None:
+        """
+        Parameters
+        ----------
+        k : int
+            Number of "arms" (valid actions) the bandit has (default 3)
+        d : int
+            Number of features of every context (default 5)
+        variance : float
+            Normal distribution variance value of the reward noise (default 1)
+        context_buffer_size : int
+            Number of contexts drawn at once (default 1024)
+        seed : None, int, np.random.SeedSequence or np.random.Generator
+            Seed for the bandit's random number generators (default None)
+        """
+        super().__init__(k, d, context_buffer_size, seed)
+        self.variance = variance
+        self.coefficients = self.rng.standard_normal((k, d))
+
+    def _drawContexts(self, m: int) -> np.ndarray:
+        return self.context_rng.standard_normal((m, self.d)) / np.sqrt(self.d)
+
+    def _rewards(self, contexts: np.ndarray, actions: np.ndarray) -> np.ndarray:
+        means = np.einsum("md,md->m", contexts, self.coefficients[actions])
+        return means + self.variance * self.rng.standard_normal(len(actions))
+
+    def getExpectedRewards(self, contexts: np.ndarray) -> np.ndarray:
+        """
+        Returns the (m, k) array of every action's expected reward in each of the input contexts (ex: to measure regret)
+
+        Parameters
+        ----------
+        contexts : np.array
+            (m, d) array of contexts
+        """
+        return np.asarray(contexts) @ self.coefficients.T
+
+    def getState(self) -> dict:
+        """
+        Returns the Contextual Bandit state, plus the true coefficients
+        """
+        return {**super().getState(), "coefficients": self.coefficients}
+
+    def setState(self, state: dict) -> None:
+        """
+        Restores a state returned by "getState". Arrays are used as is (not copied)
+
+        Parameters
+        ----------
+        state : dict
+            State of a bandit of the same type & dimensions
+
+        Raises
+        ------
+        ValueError
+            If the state has a different number of actions or features
+        """
+        if np.shape(state["coefficients"]) != (self.k, self.d):
+            raise ValueError("Invalid State, number of actions or features does not match")
+        super().setState(state)
+        self.coefficients = np.asarray(state["coefficients"])
+
+
+class LinUCBAgent(Agent):
+    """
+    Python implementation of the (disjoint) LinUCB Agent, which keeps a ridge regression model of each action's reward given
+    the context, and selects the action with the highest upper confidence bound x · theta_a + alpha * sqrt(x^T A_a^-1 x).
+    Extends the "Agent" base class
+
+    Each action's inverse design matrix A_a^-1 is kept up to date with Sherman-Morrison rank-one updates rather than being
+    re-inverted, so learning from a step costs O(d^2), and scoring every action costs O(k d^2) (one batched matrix product),
+    with no O(d^3) inversion anywhere.
+
+    Mini-batches ("selectActions", "updateBatch", "chooseActions", "runBatches") score m contexts at once against the same
+    model, and learn from the whole batch afterwards: the batch is split into rounds holding at most one step of each action
+    (in batch order), so every round is a single vectorized rank-one update of several actions' inverses.
+
+    ...
+
+    Attributes
+    ----------
+    alpha : float
+        Width multiplier of the confidence bound (default 1)
+    regularization : float
+        Ridge regularization (lambda): every A_a starts as lambda * I (default 1)
+    _inverses : np.array
+        (k, d, d) array of every action's inverse design matrix A_a^-1
+    _response_sums : np.array
+        (k, d) array of every action's sum of reward * context, b_a
+    _coefficients : np.array
+        (k, d) array of every action's ridge regression estimate, theta_a = A_a^-1 b_a
+    _pending_contexts : list
+        Queue of the contexts of each action's selections not learnt from yet, oldest first, which "_updateRewards" takes
+        its context from (so delayed updates use the context their selection was made in)
+
+    Methods
+    -------
+    selectActions(contexts)
+        Returns the action with the highest upper confidence bound in each input context
+    updateBatch(contexts, actions, rewards)
+        Learns from a whole batch of (context, action, reward) steps
+    chooseActions(m)
+        Selects actions for the next m contexts at once, realizes their rewards and learns from them
+    runBatches(n = 1000, batch_size = 64)
+        Runs n steps as consecutive mini-batches
+    getCoefficients()
+        Returns a copy of every action's current coefficient estimates
+    getActionProbabilities()
+        Returns the agent's current policy in the bandit's next context (all probability on the highest bound)
+    getState()
+        Returns the Agent state, plus every action's inverse design matrix, response sums & coefficients
+    setState(state)
+        Restores a state returned by "getState"
+    """
+
+    __slots__ = ("alpha", "regularization", "_inverses", "_response_sums", "_coefficients", "_pending_contexts")
+    label = "LinUCB Agent"
+    state_arrays = ("inverses", "response_sums", "coefficients")
+
+    def __init__(self, bandit: ContextualBandit, alpha: float = 1, regularization: float = 1, seed = None) -> None:
+        """
+        Parameters
+        ----------
+        bandit : ContextualBandit
+            Associated contextual bandit for the agent to operate on
+        alpha : float
+            Width multiplier of the confidence bound, non-negative (default 1)
+        regularization : float
+            Ridge regularization (lambda), positive (default 1)
+        seed : None, int, np.random.SeedSequence or np.random.Generator
+            Seed for the agent's random number generator (default None)
+
+        Raises
+        ------
+        ValueError
+            If alpha is negative or regularization is not positive
+        """
+        if alpha < 0:
+            raise ValueError("Invalid Alpha, must be non-negative")
+        if regularization <= 0:
+            raise ValueError("Invalid Regularization, must be positive")
+        self.alpha = alpha
+        self.regularization = regularization
+        super().__init__(bandit, seed)
+
+    def __scores(self, contexts: np.ndarray) -> np.ndarray:
+        """
+        Private method which returns the (m, k) upper confidence bounds of every action in each of the (m, d) input contexts
+        """
+        means = contexts @ self._coefficients.T
+        projected = np.matmul(contexts, self._inverses) # (k, m, d): every context times every action's inverse
+        widths = np.einsum("kmd,md->mk", projected, contexts)
+        return means + self.alpha * np.sqrt(np.maximum(widths, 0))
+
+    def _selectAction(self) -> int:
+        """
+        Protected method which selects the action with the highest upper confidence bound in the bandit's next context
+        (ties broken towards the lowest action ID), queueing the context for the action's "_updateRewards"
+        """
+        context = self.bandit.getContext()
+        means = self._coefficients @ context
+        widths = np.matmul(self._inverses, context) @ context
+        selected_action = int((means + self.alpha * np.sqrt(np.maximum(widths, 0))).argmax())
+        self._pending_contexts[selected_action].append(context)
+        return selected_action
+
+    def _selectWithPropensity(self) -> tuple:
+        """
+        Protected method which selects the action with the highest upper confidence bound, which the agent was certain to select
+        """
+        return self._selectAction(), 1.0
+
+    def _updateRewards(self, selected_action: int, selected_reward: float) -> None:
+        """
+        Protected method which learns from the input action, reward pair in the context it was selected in, with a
+        Sherman-Morrison update of the action's inverse: A^-1 -= (A^-1 x)(A^-1 x)^T / (1 + x^T A^-1 x).
+        Any number of selections can be pending: an action's updates are matched to its selections in the order they were made
+
+        Parameters
+        ----------
+        selected_action : int
+            Action ID component of selected action ID/cooresponding reward pair
+        selected_reward : float
+            Reward component of selected action ID/cooresponding reward pair
+
+        Raises
+        ------
+        ValueError
+            If the action has no selection pending
+        """
+        pending = self._pending_contexts[selected_action]
+        if not pending:
+            raise ValueError("Invalid Action, has no pending selection to learn from")
+        context = pending.popleft()
+        inverse = self._inverses[selected_action]
+        u = inverse @ context
+        inverse -= np.outer(u, u) / (1 + context @ u)
+        self._response_sums[selected_action] += selected_reward * context
+        self._coefficients[selected_action] = inverse @ self._response_sums[selected_action]
+
+    def selectActions(self, contexts: np.ndarray) -> np.ndarray:
+        """
+        Returns the action with the highest upper confidence bound in each input context, all scored against the current
+        model in a single batched matrix product (ties broken towards the lowest action ID)
+
+        Parameters
+        ----------
+        contexts : np.array
+            (m, d) array of contexts
+        """
+        return self.__scores(np.asarray(contexts, dtype=float)).argmax(axis=1)
+
+    def updateBatch(self, contexts: np.ndarray, actions: np.ndarray, rewards: np.ndarray) -> None:
+        """
+        Learns from a whole batch of steps, giving the same model as learning from them one at a time (up to rounding)
+
+        Parameters
+        ----------
+        contexts : np.array
+            (m, d) array of the contexts the actions were taken in
+        actions : np.array
+            Action taken in each context
+        rewards : np.array
+            Reward of each action
+
+        Raises
+        ------
+        ValueError
+            If the contexts, actions & rewards do not have matching lengths
+        """
+        contexts = np.asarray(contexts, dtype=float)
+        actions = np.asarray(actions).ravel()
+        rewards = np.asarray(rewards, dtype=float).ravel()
+        if not len(contexts) == len(actions) == len(rewards):
+            raise ValueError("Invalid Batch, contexts, actions & rewards must have matching lengths")
+        if len(actions) == 0:
+            return
+
+        # Rank of every step among the steps of the same action, so round r updates every action's r-th step at once
+        order = np.argsort(actions, kind="stable")
+        sorted_actions = actions[order]
+        first = np.ones(len(actions), dtype=bool)
+        first[1:] = sorted_actions[1:] != sorted_actions[:-1]
+        group_starts = np.maximum.accumulate(np.where(first, np.arange(len(actions)), 0))
+        ranks = np.empty(len(actions), dtype=np.int64)
+        ranks[order] = np.arange(len(actions)) - group_starts
+        by_round = np.argsort(ranks, kind="stable")
+        round_bounds = np.concatenate(([0], np.cumsum(np.bincount(ranks))))
+        for r in range(len(round_bounds) - 1):
+            steps = by_round[round_bounds[r]:round_bounds[r + 1]]
+            round_actions = actions[steps]
+            round_contexts = contexts[steps]
+            inverses = self._inverses[round_actions]
+            u = np.einsum("pde,pe->pd", inverses, round_contexts)
+            denominators = 1 + np.einsum("pd,pd->p", round_contexts, u)
+            inverses -= u[:, :, None] * u[:, None, :] / denominators[:, None, None]
+            self._inverses[round_actions] = inverses
+
+        np.add.at(self._response_sums, actions, rewards[:, None] * contexts)
+        touched = sorted_actions[first]
+        self._coefficients[touched] = np.einsum("pde,pe->pd", self._inverses[touched], self._response_sums[touched])
+
+    def chooseActions(self, m: int) -> tuple:
+        """
+        Selects actions for the bandit's next m contexts at once, realizes their rewards and learns from the whole batch
+
+        Parameters
+        ----------
+        m : int
+            Number of contexts in the batch
+
+        Returns
+        -------
+        tuple
+            (selected_actions, selected_rewards) arrays
+        """
+        contexts = self.bandit.getContexts(m)
+        selected_actions = self.selectActions(contexts)
+        selected_rewards = np.asarray(self.bandit.selectActions(selected_actions), dtype=float)
+        self.total_points += float(selected_rewards.sum())
+        self.updateBatch(contexts, selected_actions, selected_rewards)
+        return selected_actions, selected_rewards
+
+    def runBatches(self, n: int = 1000, batch_size: int = 64) -> None:
+        """
+        Runs n steps as consecutive mini-batches of batch_size contexts (the last one possibly smaller)
+
+        Parameters
+        ----------
+        n : int
+            Number of steps to run (default 1000)
+        batch_size : int
+            Number of contexts selected for at once, against the same model (default 64)
+
+        Raises
+        ------
+        ValueError
+            If batch_size is not positive
+        """
+        if batch_size < 1:
+            raise ValueError("Invalid Batch Size, must be positive")
+        for start in range(0, n, batch_size):
+            self.chooseActions(min(batch_size, n - start))
+
+    def getCoefficients(self) -> np.ndarray:
+        """
+        Returns a copy of every action's current coefficient estimates, as a (k, d) array
+        """
+        return self._coefficients.copy()
+
+    def getActionProbabilities(self) -> np.ndarray:
+        """
+        Returns the agent's current policy in the bandit's next context, which puts all probability on the action with the
+        highest upper confidence bound
+        """
+        probabilities = np.zeros(self.bandit.k)
+        probabilities[self.selectActions(self.bandit.getContext()[None])[0]] = 1
+        return probabilities
+
+    def reset(self) -> None:
+        """
+        Reset values associated with the agent's progress, (re)allocating the models for the current bandit
+        """
+        super().reset()
+        k, d = self.bandit.k, self.bandit.d
+        self._inverses = np.tile(np.eye(d) / self.regularization, (k, 1, 1))
+        self._response_sums = np.zeros((k, d))
+        self._coefficients = np.zeros((k, d))
+        self._pending_contexts = [deque() for _ in range(k)]
+
+    def getState(self) -> dict:
+        """
+        Returns the Agent state, plus every action's inverse design matrix, response sums & coefficients
+        """
+        return {**super().getState(), "inverses": self._inverses, "response_sums": self._response_sums, "coefficients": self._coefficients}
+
+    def setState(self, state: dict) -> None:
+        """
+        Restores a state returned by "getState". Arrays are used as is (not copied)
+
+        Parameters
+        ----------
+        state : dict
+            State returned by "getState"
+
+        Raises
+        ------
+        ValueError
+            If the state has a different number of actions or features
+        """
+        if np.shape(state["inverses"]) != (self.bandit.k, self.bandit.d, self.bandit.d):
+            raise ValueError("Invalid State, number of actions or features does not match")
+        super().setState(state)
+        self._inverses = np.asarray(state["inverses"], dtype=float)
+        self._response_sums = np.asarray(state["response_sums"], dtype=float)
+        self._coefficients = np.asarray(state["coefficients"], dtype=float)
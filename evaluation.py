@@ -0,0 +1,270 @@
+"""
+Evaluation Source File
+
+Off-policy evaluation: estimating how one agent would have performed from a trajectory logged by another (ex: a deployed
+EpsilonGreedyAgent logged with propensities), without running it live.
+
+Every estimator streams the log one chunk at a time (views of its memory-mapped columns), so logs larger than memory
+are evaluated in bounded memory. Confidence intervals come from a Poisson bootstrap over blocks of consecutive records:
+every replicate weights each block by an independent Poisson(1) draw, which (unlike a multinomial resample) can be drawn
+one chunk at a time, so every chunk updates all replicates with a single (replicates x blocks) matrix product. Blocks
+(rather than single records) keep the interval honest when consecutive rewards are correlated, as they are under a
+learning logging agent.
+
+Requires `numpy` to be installed, and the streams & trajectories source files to be imported correctly.
+
+Currently contains implementations for:
+    - Replay (runs the target agent's own selection & learning logic on the logged records it agrees with)
+    - Inverse Propensity Scoring ("ips"), Self-Normalized IPS ("snips") & Doubly Robust ("dr") estimates of a target policy
+
+Usage:
+    log = TrajectoryReader("deployed_log") # Logged by a TrajectoryWriter with propensities = True
+    replayValue(log, UpperConfidenceBoundAgent(StationaryBandit(k)))["estimate"]
+    offPolicyValue(log, trained_agent, estimator = "dr")["estimate"]
+"""
+
+import numpy as np
+from streams import makeGenerator
+from trajectories import TrajectoryReader
+
+ESTIMATORS = ("ips", "snips", "dr")
+
+
+def offPolicyValue(log: TrajectoryReader, target, estimator: str = "dr", logging_policy: np.ndarray = None, reward_model: np.ndarray = None,
+                   replicates: int = 200, level: float = 0.95, block_size: int = 1024, chunk_size: int = 2**20, seed = None) -> dict:
+    """
+    Estimates the mean reward per step of a target policy from a logged trajectory, weighting every logged record by the
+    target's probability of the logged action over the logging agent's (computed a whole chunk at a time)
+
+    An agent target is evaluated at its current policy (its `getActionProbabilities()`, which follows its own selection
+    logic), so a deterministic agent (ex: UCB or Optimistic Greedy) is evaluated at the action it would select next. To
+    evaluate an agent which keeps learning over the log, use "replayValue" instead
+
+    Parameters
+    ----------
+    log : TrajectoryReader
+        Logged trajectory
+    target : Agent or np.array
+        Agent whose current policy to evaluate, or the probability of the target selecting each action
+    estimator : str
+        "ips" (inverse propensity scoring), "snips" (self-normalized IPS) or "dr" (doubly robust) (default "dr")
+    logging_policy : np.array
+        Logging agent's probability of selecting each action, used when the log holds no propensities (default None)
+    reward_model : np.array
+        Estimated reward of each action for the "dr" estimator (default None, for the log's mean reward of each action)
+    replicates : int
+        Number of bootstrap replicates (default 200)
+    level : float
+        Confidence level of the interval, within (0,1) (default 0.95)
+    block_size : int
+        Number of consecutive records resampled together by the bootstrap (default 1024)
+    chunk_size : int
+        Number of records processed at once, rounded down to a multiple of block_size (default 2**20)
+    seed : None, int, np.random.SeedSequence or np.random.Generator
+        Seed for the bootstrap's random number generator (default None)
+
+    Returns
+    -------
+    dict
+        - estimate : estimated mean reward per step of the target policy
+        - lower, upper : bootstrap confidence interval of the estimate
+        - records : number of logged records used
+        - effective_sample_size : (sum of weights)^2 / sum of squared weights, how many records the estimate is worth
+
+    Raises
+    ------
+    ValueError
+        If the estimator is not supported, the policies do not match the log, or the log holds no propensities and no logging_policy was given
+    """
+    if estimator not in ESTIMATORS:
+        raise ValueError(f"Invalid Estimator, must be one of {ESTIMATORS}")
+    _checkLevel(level)
+    policy = np.asarray(target.getActionProbabilities() if hasattr(target, "getActionProbabilities") else target, dtype=float)
+    k = len(policy)
+    propensities = _propensities(log, logging_policy, k)
+    if estimator == "dr":
+        if reward_model is None:
+            reward_model = _loggedMeans(log, k, chunk_size)
+        reward_model = np.asarray(reward_model, dtype=float)
+        if len(reward_model) != k:
+            raise ValueError("Invalid Reward Model, must have one estimate per action")
+        direct = float(policy @ reward_model)
+    chunk_size = max(block_size, chunk_size // block_size * block_size)
+    bootstrap = _PoissonBootstrap(replicates, block_size, makeGenerator(seed))
+    weight_sum = weight_square_sum = 0.0
+    for _, actions, rewards, logged in log.chunks(chunk_size):
+        weights = policy[actions] / propensities(actions, logged)
+        weight_sum += float(weights.sum())
+        weight_square_sum += float(weights @ weights)
+        if estimator == "ips":
+            bootstrap.add(weights * rewards, np.ones(len(weights)))
+        elif estimator == "snips":
+            bootstrap.add(weights * rewards, weights)
+        else:
+            bootstrap.add(direct + weights * (rewards - reward_model[actions]), np.ones(len(weights)))
+    estimate, lower, upper = bootstrap.ratio(level)
+    return {"estimate": estimate, "lower": lower, "upper": upper, "records": len(log),
+            "effective_sample_size": weight_sum * weight_sum / weight_square_sum if weight_square_sum else 0.0}
+
+
+def replayValue(log: TrajectoryReader, agent, logging_policy: np.ndarray = None, replicates: int = 200, level: float = 0.95,
+                block_size: int = 1024, chunk_size: int = 2**20, seed = None) -> dict:
+    """
+    Estimates the mean reward per step a (learning) agent would have earned, by replaying the log through the agent's own
+    selection & learning logic: the agent's selected action is held until a logged record of that same action comes up,
+    whose reward the agent then receives & learns from before selecting again. Records of other actions are skipped.
+
+    Replay is unbiased when the log's actions were selected uniformly at random. Logs with propensities (or a known
+    logging_policy) are first thinned by rejection sampling, keeping each record with probability (smallest propensity /
+    its propensity), which leaves exactly a uniformly logged subsample (ex: an epsilon greedy log keeps its exploration steps).
+    Only the matched records are visited in Python; finding each action's next record is a binary search
+
+    NOTE: The agent is updated in place (its estimates & points total include every replayed step), so pass a freshly reset agent
+
+    Parameters
+    ----------
+    log : TrajectoryReader
+        Logged trajectory
+    agent : Agent
+        Agent to replay the log through, on a bandit with the log's number of actions
+    logging_policy : np.array
+        Logging agent's probability of selecting each action, used when the log holds no propensities
+        (default None, for a log whose actions were selected uniformly at random when it holds no propensities either)
+    replicates : int
+        Number of bootstrap replicates (default 200)
+    level : float
+        Confidence level of the interval, within (0,1) (default 0.95)
+    block_size : int
+        Number of consecutive replayed steps resampled together by the bootstrap (default 1024)
+    chunk_size : int
+        Number of records processed at once (default 2**20)
+    seed : None, int, np.random.SeedSequence or np.random.Generator
+        Seed for the rejection sampling's & bootstrap's random number generator (default None)
+
+    Returns
+    -------
+    dict
+        - estimate : mean reward per replayed step
+        - lower, upper : bootstrap confidence interval of the estimate
+        - records : number of logged records
+        - matched : number of steps replayed (records whose action the agent had selected)
+
+    Raises
+    ------
+    ValueError
+        If the logging_policy does not match the agent's number of actions
+    """
+    _checkLevel(level)
+    rng = makeGenerator(seed)
+    k = agent.bandit.k
+    propensities = _propensities(log, logging_policy, k) if log.propensities is not None or logging_policy is not None else None
+    if propensities != None:
+        smallest = min((float(propensities(actions, logged).min()) for _, actions, _, logged in log.chunks(chunk_size)), default = 1.0)
+    select = agent._selectAction
+    update = agent._updateRewards
+    bootstrap = _PoissonBootstrap(replicates, block_size, rng)
+    matched = 0
+    action = int(select())
+    for _, actions, rewards, logged in log.chunks(chunk_size):
+        if propensities != None:
+            candidates = np.flatnonzero(rng.random(len(actions)) * propensities(actions, logged) < smallest)
+        else:
+            candidates = np.arange(len(actions))
+        # Candidate positions grouped by action (in log order), so each action's next record is a binary search away
+        candidate_actions = actions[candidates]
+        order = np.argsort(candidate_actions, kind = "stable")
+        positions = candidates[order]
+        bounds = np.searchsorted(candidate_actions[order], np.arange(k + 1))
+        rewards = np.asarray(rewards)
+        replayed = []
+        position = -1
+        while True:
+            low, high = bounds[action], bounds[action + 1]
+            i = low + int(np.searchsorted(positions[low:high], position, side = "right"))
+            if i == high: # No later record of the held action in this chunk
+                break
+            position = positions[i]
+            reward = float(rewards[position])
+            agent.total_points += reward
+            update(action, reward)
+            replayed.append(reward)
+            action = int(select())
+        matched += len(replayed)
+        bootstrap.add(np.array(replayed), np.ones(len(replayed)))
+    estimate, lower, upper = bootstrap.ratio(level)
+    return {"estimate": estimate, "lower": lower, "upper": upper, "records": len(log), "matched": matched}
+
+
+class _PoissonBootstrap:
+    """
+    Streaming Poisson bootstrap of a ratio of sums (numerator sum / denominator sum), over blocks of consecutive values
+    """
+
+    def __init__(self, replicates: int, block_size: int, rng: np.random.Generator) -> None:
+        if replicates < 1:
+            raise ValueError("Invalid Replicates, must be positive")
+        if block_size < 1:
+            raise ValueError("Invalid Block Size, must be positive")
+        self.block_size = block_size
+        self.rng = rng
+        self.totals = np.zeros(2)
+        self.replicate_totals = np.zeros((replicates, 2))
+
+    def add(self, numerators: np.ndarray, denominators: np.ndarray) -> None:
+        """
+        Adds a chunk of (numerator, denominator) values to the full sums, and to every replicate's Poisson weighted sums
+        """
+        if len(numerators) == 0:
+            return
+        values = np.column_stack((numerators, denominators))
+        block_sums = np.add.reduceat(values, np.arange(0, len(values), self.block_size), axis = 0)
+        self.totals += block_sums.sum(axis = 0)
+        self.replicate_totals += self.rng.poisson(1.0, (len(self.replicate_totals), len(block_sums))) @ block_sums
+
+    def ratio(self, level: float) -> tuple:
+        """
+        Returns the ratio estimate, and the lower & upper percentiles of the replicates' ratios at the input confidence level
+        """
+        with np.errstate(invalid = "ignore", divide = "ignore"):
+            estimate = self.totals[0] / self.totals[1] if self.totals[1] else float("nan")
+            ratios = self.replicate_totals[:, 0] / self.replicate_totals[:, 1]
+        ratios = ratios[np.isfinite(ratios)]
+        if len(ratios) == 0:
+            return float(estimate), float("nan"), float("nan")
+        lower, upper = np.percentile(ratios, [50 * (1 - level), 50 * (1 + level)])
+        return float(estimate), float(lower), float(upper)
+
+
+def _checkLevel(level: float) -> None:
+    """
+    Raises a ValueError if a confidence level is not within (0,1)
+    """
+    if level <= 0 or level >= 1:
+        raise ValueError("Invalid Level, must be within (0,1)")
+
+
+def _propensities(log: TrajectoryReader, logging_policy: np.ndarray, k: int):
+    """
+    Returns a function of a chunk's (actions, logged propensities) giving the logging agent's propensity of each record:
+    the logged propensities if the log holds them, and the logging_policy's otherwise
+    """
+    if log.propensities is not None:
+        return lambda actions, logged: logged
+    if logging_policy is None:
+        raise ValueError("Invalid Log, holds no propensities and no logging_policy was given")
+    logging_policy = np.asarray(logging_policy, dtype=float)
+    if len(logging_policy) != k:
+        raise ValueError("Invalid Logging Policy, must have one probability per action")
+    return lambda actions, logged: logging_policy[actions]
+
+
+def _loggedMeans(log: TrajectoryReader, k: int, chunk_size: int) -> np.ndarray:
+    """
+    Returns the log's mean reward of each action (0 for actions never logged), in one streamed pass
+    """
+    sums = np.zeros(k)
+    counts = np.zeros(k)
+    for _, actions, rewards, _ in log.chunks(chunk_size):
+        sums += np.bincount(actions, weights = rewards, minlength = k)
+        counts += np.bincount(actions, minlength = k)
+    return np.divide(sums, counts, out = np.zeros(k), where = counts > 0)
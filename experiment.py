@@ -0,0 +1,417 @@
+"""
+Experiment Source File
+
+Command line entry point which runs a whole experiment (several agents on the same bandit setup) non-interactively, from
+a JSON spec file and/or flags, and writes every agent's learning curves to a results file.
+
+The engine running each agent is chosen automatically from the size of the experiment (unless the spec forces one):
+    - "scalar" : one agent object per run, for agents or bandits without a batched implementation, or a single run
+    - "batched" : every run at once with BatchedAgents
+    - "parallel" : BatchedAgents sharded across a process pool (runSweep), once runs x steps reaches PARALLEL_STEPS
+Progress is shown on a single status line (rewritten in place, at most every STATUS_INTERVAL seconds). Only the modules the
+chosen engines need are imported, and nothing beyond the standard library is imported to parse the arguments, so startup
+(and --help) stays fast.
+
+Results are written as an .npz file (or .json, by extension) holding the resolved spec (including the seed actually
+used) and, for every agent i, "agent{i}.mean_rewards" & "agent{i}.percent_optimal" per-step curves averaged over the runs.
+
+Requires `numpy` to be installed, and the agents, bandits, batched, cache, checkpoints, metrics, streams & sweeps source files
+to be imported correctly.
+
+Usage:
+    python experiment.py --spec spec.json --output results.npz
+    python experiment.py --agent EpsilonGreedyAgent:epsilon=0.1 --agent UpperConfidenceBoundAgent:c=1 --k 10 --runs 2000 --steps 1000
+
+Spec file (every key is optional, and flags override it):
+    {"bandit": {"type": "stationary", "k": 10, "min": 0, "max": 10, "variance": 1, "walk_variance": 0.01},
+     "agents": [{"class": "EpsilonGreedyAgent", "params": {"epsilon": 0.1}}, {"class": "GreedyAgent"}],
+     "runs": 2000, "steps": 1000, "seed": 0, "engine": "auto", "workers": null}
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+BANDIT_TYPES = ("stationary", "nonstationary", "bernoulli")
+ENGINES = ("auto", "scalar", "batched", "parallel")
+
+# From this many total steps (runs x steps), the "auto" engine shards batched runs across a process pool
+PARALLEL_STEPS = 10**8
+
+# Minimum number of seconds between two redraws of the status line
+STATUS_INTERVAL = 0.1
+
+DEFAULT_SPEC = {
+    "bandit": {"type": "stationary", "k": 10, "min": 0, "max": 10, "variance": 1, "walk_variance": 0.01},
+    "agents": [{"class": "EpsilonGreedyAgent", "params": {"epsilon": 0.1}}],
+    "runs": 2000,
+    "steps": 1000,
+    "seed": None,
+    "engine": "auto",
+    "workers": None,
+}
+
+
+class StatusLine:
+    """
+    Single status line, rewritten in place (with a carriage return) at most every "interval" seconds, so reporting
+    progress costs next to nothing however often it is updated
+
+    ...
+
+    Attributes
+    ----------
+    stream : file
+        Stream the line is written to (default sys.stderr)
+    interval : float
+        Minimum number of seconds between two redraws (default STATUS_INTERVAL)
+    enabled : bool
+        Whether anything is written at all (default True)
+
+    Methods
+    -------
+    update(text, force = False)
+        Redraws the line with the input text, unless it was redrawn less than "interval" seconds ago
+    finish(text)
+        Redraws the line one last time, and moves on to the next line
+    """
+
+    def __init__(self, stream = None, interval: float = STATUS_INTERVAL, enabled: bool = True) -> None:
+        self.stream = stream if stream != None else sys.stderr
+        self.interval = interval
+        self.enabled = enabled
+        self.__last_draw = None
+        self.__width = 0
+
+    def update(self, text: str, force: bool = False) -> None:
+        """
+        Redraws the line with the input text, unless it was redrawn less than "interval" seconds ago
+
+        Parameters
+        ----------
+        text : str
+            New contents of the line
+        force : bool
+            Whether to redraw regardless of the interval (default False)
+        """
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        if not force and self.__last_draw != None and now - self.__last_draw < self.interval:
+            return
+        self.__last_draw = now
+        self.stream.write("\r" + text.ljust(self.__width))
+        self.stream.flush()
+        self.__width = len(text)
+
+    def finish(self, text: str) -> None:
+        """
+        Redraws the line one last time, and moves on to the next line
+
+        Parameters
+        ----------
+        text : str
+            Final contents of the line
+        """
+        if not self.enabled:
+            return
+        self.update(text, force = True)
+        self.stream.write("\n")
+        self.__last_draw = None
+        self.__width = 0
+
+
+def loadSpec(path: str = None) -> dict:
+    """
+    Returns the experiment spec read from a JSON file, with every missing key filled in from DEFAULT_SPEC
+
+    Parameters
+    ----------
+    path : str
+        JSON spec file (default None, for the default spec)
+    """
+    spec = json.loads(json.dumps(DEFAULT_SPEC)) # Deep copy
+    if path != None:
+        with open(path) as file:
+            loaded = json.load(file)
+        spec["bandit"].update(loaded.pop("bandit", {}))
+        spec.update(loaded)
+    return spec
+
+
+def parseAgent(text: str) -> dict:
+    """
+    Returns the spec entry of an agent given on the command line as "ClassName" or "ClassName:name=value,name=value".
+    Values are parsed as JSON where possible (ex: 0.1, null, true), and kept as strings otherwise (ex: ucb1-tuned)
+
+    Parameters
+    ----------
+    text : str
+        Agent given on the command line
+    """
+    name, _, assignments = text.partition(":")
+    params = {}
+    for assignment in filter(None, assignments.split(",")):
+        key, separator, value = assignment.partition("=")
+        if not separator:
+            raise ValueError(f"Invalid Agent, expected name=value but got '{assignment}'")
+        try:
+            params[key.strip()] = json.loads(value)
+        except json.JSONDecodeError:
+            params[key.strip()] = value.strip()
+    return {"class": name.strip(), "params": params}
+
+
+def chooseEngine(agent_class: type, spec: dict) -> str:
+    """
+    Returns the engine to run an agent class with: the spec's engine if set, and otherwise the fastest engine able to run it
+
+    Parameters
+    ----------
+    agent_class : type
+        Agent class to run
+    spec : dict
+        Experiment spec
+
+    Raises
+    ------
+    ValueError
+        If the spec forces a batched engine onto an agent class or bandit type without a batched implementation
+    """
+    from batched import SUPPORTED_AGENTS
+
+    batchable = agent_class in SUPPORTED_AGENTS and spec["bandit"]["type"] != "bernoulli"
+    if spec["engine"] != "auto":
+        if spec["engine"] != "scalar" and not batchable:
+            raise ValueError(f"Invalid Engine, {agent_class.__name__} on a {spec['bandit']['type']} bandit has no batched implementation")
+        return spec["engine"]
+    if not batchable or spec["runs"] == 1:
+        return "scalar"
+    if spec["runs"] * spec["steps"] >= PARALLEL_STEPS and spec["workers"] != 1 and (os.cpu_count() or 1) > 1:
+        return "parallel"
+    return "batched"
+
+
+def _banditFactory(bandit: dict):
+    """
+    Returns a picklable callable creating a new bandit of the spec'd type, given its seed through the "seed" keyword
+    """
+    from functools import partial
+    from bandits import BernoulliBandit
+    from bandits import NonstationaryBandit
+    from bandits import StationaryBandit
+
+    if bandit["type"] == "bernoulli":
+        return partial(BernoulliBandit, bandit["k"])
+    if bandit["type"] == "nonstationary":
+        return partial(NonstationaryBandit, bandit["k"], bandit["min"], bandit["max"], bandit["variance"], bandit["walk_variance"])
+    return partial(StationaryBandit, bandit["k"], bandit["min"], bandit["max"], bandit["variance"])
+
+
+def _runScalar(agent_class: type, params: dict, spec: dict, seed, status: StatusLine, label: str) -> tuple:
+    """
+    Runs every run with its own agent object & bandit, returning the (mean_rewards, percent_optimal) curves averaged over the runs
+    """
+    import numpy as np
+    from metrics import CurveRecorder
+    from streams import childSeed
+
+    runs, steps = spec["runs"], spec["steps"]
+    factory = _banditFactory(spec["bandit"])
+    bandit_seed, agent_seed = childSeed(seed, 0), childSeed(seed, 1)
+    mean_rewards = np.zeros(steps)
+    percent_optimal = np.zeros(steps)
+    for run in range(runs):
+        agent = agent_class(factory(seed = childSeed(bandit_seed, run)), seed = childSeed(agent_seed, run), **params)
+        recorder = CurveRecorder()
+        agent.run(steps, recorder)
+        mean_rewards += recorder.mean_rewards
+        percent_optimal += recorder.percent_optimal
+        status.update(f"{label}: run {run + 1}/{runs}")
+    return mean_rewards / runs, percent_optimal / runs
+
+
+def _runBatched(agent_class: type, params: dict, spec: dict, seed, status: StatusLine, label: str, cache_directory: str = None) -> tuple:
+    """
+    Runs every run at once with BatchedAgents (through the result cache, if a cache directory is given), returning the
+    (mean_rewards, percent_optimal) curves averaged over the runs
+    """
+    import numpy as np
+    from streams import childSeed
+
+    bandit = spec["bandit"]
+    walk_variance = bandit["walk_variance"] if bandit["type"] == "nonstationary" else 0
+    arguments = (agent_class, spec["runs"], bandit["k"], bandit["min"], bandit["max"], bandit["variance"], walk_variance)
+    # Run i faces the same bandit as with the scalar engine, while the agents of every run share the engine's stream
+    bandit_seed, agent_seed = childSeed(seed, 0), childSeed(seed, 1)
+    if cache_directory != None:
+        from cache import ResultCache
+
+        status.update(f"{label}: running (cached)", force = True)
+        return ResultCache(cache_directory).runBatched(agent_class, spec["steps"], *arguments[1:], seed = agent_seed, bandit_seed = bandit_seed, **params)
+
+    from batched import BatchedAgents
+
+    engine = BatchedAgents(*arguments, seed = agent_seed, **params)
+    factory = _banditFactory(bandit)
+    engine.changeBandits([factory(seed = childSeed(bandit_seed, run)) for run in range(spec["runs"])])
+    steps = spec["steps"]
+    chunk = max(1, steps // 100) # Steps run between two status updates
+    curves = []
+    for done in range(0, steps, chunk):
+        curves.append(engine.runSequence(min(chunk, steps - done)))
+        status.update(f"{label}: step {done + len(curves[-1][0])}/{steps}")
+    return np.concatenate([curve[0] for curve in curves]), np.concatenate([curve[1] for curve in curves])
+
+
+def _runParallel(agent_class: type, params: dict, spec: dict, seed, status: StatusLine, label: str) -> tuple:
+    """
+    Runs every run with BatchedAgents sharded across a process pool, returning the (mean_rewards, percent_optimal) curves
+    averaged over the runs
+    """
+    from streams import childSeed
+    from sweeps import runSweep
+
+    # Run i faces the same bandit as with the scalar engine
+    _, mean_rewards, percent_optimal = runSweep(agent_class, {name: [value] for name, value in params.items()}, _banditFactory(spec["bandit"]),
+                                                seeds = spec["runs"], n = spec["steps"], workers = spec["workers"], seed = childSeed(seed, 1),
+                                                progress = lambda done, total: status.update(f"{label}: task {done}/{total}"),
+                                                bandit_seed = childSeed(seed, 0))
+    return mean_rewards[0], percent_optimal[0]
+
+
+def runExperiment(spec: dict, status: StatusLine = None, cache_directory: str = None) -> dict:
+    """
+    Runs every agent of an experiment spec, returning their learning curves
+
+    Parameters
+    ----------
+    spec : dict
+        Experiment spec (see DEFAULT_SPEC). A None seed is replaced by a fresh random one, recorded in the spec
+    status : StatusLine
+        Status line to report progress on (default None, for none)
+    cache_directory : str
+        Directory of a ResultCache to serve batched runs from (default None, for no caching)
+
+    Returns
+    -------
+    dict
+        {"spec": resolved spec, "agents": list of {"class", "params", "engine", "mean_rewards", "percent_optimal", "seconds"}}
+
+    Raises
+    ------
+    ValueError
+        If the spec is invalid
+    """
+    import numpy as np
+    import agents
+
+    status = status if status != None else StatusLine(enabled = False)
+    if spec["bandit"]["type"] not in BANDIT_TYPES:
+        raise ValueError(f"Invalid Bandit Type, must be one of {BANDIT_TYPES}")
+    if spec["engine"] not in ENGINES:
+        raise ValueError(f"Invalid Engine, must be one of {ENGINES}")
+    if spec["runs"] < 1 or spec["steps"] < 1:
+        raise ValueError("Invalid Experiment, runs and steps must be positive")
+    if spec["seed"] == None:
+        spec["seed"] = int(np.random.SeedSequence().entropy % 2**63)
+
+    results = []
+    for index, entry in enumerate(spec["agents"]):
+        agent_class = getattr(agents, entry["class"], None)
+        if not isinstance(agent_class, type) or not issubclass(agent_class, agents.Agent) or agent_class in (agents.Agent, agents.ActionValueAgent):
+            raise ValueError(f"Invalid Agent, unknown agent class '{entry['class']}'")
+        params = entry.get("params", {})
+        engine = chooseEngine(agent_class, spec)
+        # Every agent runs on the same seed, and every engine creates run i's bandit from the same child of it (childSeed(seed, 0)),
+        # so every agent faces the same bandits
+        seed = np.random.SeedSequence(spec["seed"])
+        label = f"[{index + 1}/{len(spec['agents'])}] {entry['class']} ({engine})"
+        start = time.perf_counter()
+        if engine == "scalar":
+            curves = _runScalar(agent_class, params, spec, seed, status, label)
+        elif engine == "batched":
+            curves = _runBatched(agent_class, params, spec, seed, status, label, cache_directory)
+        else:
+            curves = _runParallel(agent_class, params, spec, seed, status, label)
+        seconds = time.perf_counter() - start
+        status.finish(f"{label}: done in {seconds:.2f}s, final mean reward {curves[0][-1]:.3f}, {curves[1][-1]:.1f}% optimal")
+        results.append({"class": entry["class"], "params": params, "engine": engine, "mean_rewards": curves[0], "percent_optimal": curves[1], "seconds": seconds})
+    return {"spec": spec, "agents": results}
+
+
+def writeResults(path: str, results: dict) -> None:
+    """
+    Writes experiment results to a file: JSON if the path ends in ".json", and a compressed .npz file (written atomically) otherwise
+
+    Parameters
+    ----------
+    path : str
+        File to write
+    results : dict
+        Results returned by "runExperiment"
+    """
+    summary = {"spec": results["spec"], "agents": [{key: entry[key] for key in ("class", "params", "engine", "seconds")} for entry in results["agents"]]}
+    if path.endswith(".json"):
+        for entry, row in zip(results["agents"], summary["agents"]):
+            row["mean_rewards"] = entry["mean_rewards"].tolist()
+            row["percent_optimal"] = entry["percent_optimal"].tolist()
+        with open(path, "w") as file:
+            json.dump(summary, file)
+        return
+
+    import numpy as np
+    from checkpoints import writeAtomic
+
+    arrays = {"meta.summary": np.array(json.dumps(summary))}
+    for index, entry in enumerate(results["agents"]):
+        arrays[f"agent{index}.mean_rewards"] = entry["mean_rewards"]
+        arrays[f"agent{index}.percent_optimal"] = entry["percent_optimal"]
+    writeAtomic(path, arrays, compressed = True)
+
+
+def main(argv: list = None) -> None:
+    parser = argparse.ArgumentParser(description = "Run a bandit experiment from a spec file and/or flags, writing every agent's learning curves to a file")
+    parser.add_argument("--spec", default = None, help = "JSON experiment spec (flags override its values)")
+    parser.add_argument("--agent", action = "append", default = None, help = "agent to run, as ClassName or ClassName:name=value,... (repeatable; replaces the spec's agents)")
+    parser.add_argument("--bandit", choices = BANDIT_TYPES, default = None, help = "bandit type")
+    parser.add_argument("--k", type = int, default = None, help = "number of arms")
+    parser.add_argument("--min", type = int, default = None, help = "minimum true action value")
+    parser.add_argument("--max", type = int, default = None, help = "maximum true action value")
+    parser.add_argument("--variance", type = float, default = None, help = "reward noise scale")
+    parser.add_argument("--walk-variance", type = float, default = None, help = "random walk step scale of nonstationary bandits")
+    parser.add_argument("--runs", type = int, default = None, help = "number of independent runs per agent")
+    parser.add_argument("--steps", type = int, default = None, help = "number of steps per run")
+    parser.add_argument("--seed", type = int, default = None, help = "root seed (default: a fresh random seed, recorded in the results)")
+    parser.add_argument("--engine", choices = ENGINES, default = None, help = "engine to run every agent with (default: auto)")
+    parser.add_argument("--workers", type = int, default = None, help = "worker processes of the parallel engine (default: one per core)")
+    parser.add_argument("--cache", default = None, help = "directory of a result cache to serve batched runs from")
+    parser.add_argument("--output", default = "results.npz", help = "results file, .npz or .json (default: results.npz)")
+    parser.add_argument("--quiet", action = "store_true", help = "do not show the status line")
+    args = parser.parse_args(argv)
+
+    try:
+        spec = loadSpec(args.spec)
+        if args.agent != None:
+            spec["agents"] = [parseAgent(text) for text in args.agent]
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+    for flag, key in (("bandit", "type"), ("k", "k"), ("min", "min"), ("max", "max"), ("variance", "variance"), ("walk_variance", "walk_variance")):
+        if getattr(args, flag) != None:
+            spec["bandit"][key] = getattr(args, flag)
+    for key in ("runs", "steps", "seed", "engine", "workers"):
+        if getattr(args, key) != None:
+            spec[key] = getattr(args, key)
+
+    try:
+        results = runExperiment(spec, StatusLine(enabled = not args.quiet), args.cache)
+    except ValueError as error:
+        parser.error(str(error))
+    writeResults(args.output, results)
+    print(f"Wrote results of {len(results['agents'])} agents to {args.output} (seed {spec['seed']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,500 @@
+"""
+Metrics Source File
+
+Collection of metrics "sinks" which an agent's `runSequence` reports every step to.
+
+A sink is bound to the agent at the start of a sequence, then receives one `record(action, reward)` call per step.
+Recording sinks write into NumPy arrays preallocated at bind time with O(1) work per step (no string formatting or
+allocation in the hot loop), while printing is just one more sink. When no sink is given, `runSequence` records nothing.
+On a drifting (nonstationary) bandit the true values change every step, so recorders instead read the selected action's
+value as of its pull (the bandit's "last_value"), and refresh the best value every "refresh_interval" steps from a peek
+at every action (drawn from its own stream, so recording never changes the experiment), keeping O(1) amortized work per step.
+
+Requires `numpy` to be installed.
+
+Currently contains implementations for:
+    - Curve Recorder (per-step or decimated learning curves)
+    - Ring Buffer Recorder (the most recent steps, in full detail)
+    - Print Sink (the classic `runSequence` printouts)
+    - Multi Sink (reporting to several sinks at once)
+"""
+
+import numpy as np
+
+
+class _DriftingValues:
+    """
+    Tracks the selected & best true action values of a drifting (nonstationary) bandit with O(1) amortized work per step.
+    The selected action's value is the bandit's "last_value" (its value as of the pull). The best value is refreshed every
+    "refresh_interval" steps from a peek at every action's value, drawn from a stream spawned from the bandit's (so the
+    bandit's own draws are untouched), and raised in between whenever a selected action's value exceeds it
+    """
+
+    def __init__(self, bandit, refresh_interval: int) -> None:
+        self.bandit = bandit
+        self.refresh_interval = refresh_interval
+        self.rng = bandit.rng.spawn(1)[0]
+        self.refresh(bandit.step)
+
+    def refresh(self, step: int) -> None:
+        """
+        Peeks at every action's value as of the input step, and makes the best of them the best value
+        """
+        values = self.bandit.peekActions(self.rng, step)
+        self.best_action = int(values.argmax())
+        self.best = float(values[self.best_action])
+        self.until_refresh = self.refresh_interval
+
+    def observe(self, action: int) -> tuple:
+        """
+        Returns the (selected action's value, best value) of the step just pulled, refreshing the best value when due
+        """
+        value = self.bandit.last_value
+        if action == self.best_action or value > self.best:
+            self.best_action = action
+            self.best = value
+        best = self.best
+        self.until_refresh -= 1
+        if self.until_refresh == 0:
+            self.refresh(self.bandit.step) # As of the next pull
+        return value, best
+
+
+class MetricsSink:
+    def bind(self, agent, n):
+        """
+        Prepares the sink for a new sequence of steps
+
+        Parameters
+        ----------
+        agent : Agent
+            Agent about to run (its bandit holds the true action values)
+        n : int
+            Number of steps about to be run
+        """
+        pass
+
+    def record(self, action, reward):
+        """
+        Records a single step
+
+        Parameters
+        ----------
+        action : int
+            Action the agent selected
+        reward : float
+            Reward the agent received
+        """
+        pass
+
+    def finish(self):
+        """
+        Called once the sequence of steps is complete
+        """
+        pass
+
+
+class CurveRecorder(MetricsSink):
+    """
+    Records learning curves into arrays preallocated at bind time, optionally decimated into bins of "bin_size" steps.
+    Extends the "MetricsSink" interface
+
+    ...
+
+    Attributes
+    ----------
+    bin_size : int
+        Number of consecutive steps averaged into each entry of the curves (default 1, for per-step curves)
+    mean_rewards : np.array
+        Mean reward received in each bin
+    percent_optimal : np.array
+        Percentage of steps in each bin where an optimal action was selected
+    cumulative_regret : np.array
+        Total regret (best true action value - selected action's true value) accumulated by the end of each bin
+    out : tuple
+        (mean_rewards, percent_optimal, cumulative_regret) arrays the curves are written into, instead of allocating them
+        (ex: rows of a shared result matrix), or None
+    refresh_interval : int
+        Number of steps between refreshes of the best action value, on a drifting bandit (default 100)
+
+    Methods
+    -------
+    bind(agent, n)
+        Allocates the curves for n steps (or takes them from "out") and caches the agent's bandit true action values
+        (when they do not drift)
+    record(action, reward)
+        Adds a single step to the current bin
+    finish()
+        Closes off the last (possibly partial) bin
+    """
+
+    def __init__(self, bin_size: int = 1, out: tuple = None, refresh_interval: int = 100) -> None:
+        """
+        Parameters
+        ----------
+        bin_size : int
+            Number of consecutive steps averaged into each entry of the curves (default 1, for per-step curves)
+        out : tuple
+            (mean_rewards, percent_optimal, cumulative_regret) arrays to write the curves into, each holding at least one
+            entry per bin, instead of allocating them at bind time (default None)
+        refresh_interval : int
+            Number of steps between refreshes of the best action value, on a drifting bandit (default 100)
+
+        Raises
+        ------
+        ValueError
+            If bin_size or refresh_interval is not positive, or out does not hold 3 arrays
+        """
+        if bin_size < 1:
+            raise ValueError("Invalid Bin Size, must be positive")
+        if out != None and len(out) != 3:
+            raise ValueError("Invalid Out, must hold the mean_rewards, percent_optimal & cumulative_regret arrays")
+        if refresh_interval < 1:
+            raise ValueError("Invalid Refresh Interval, must be positive")
+        self.bin_size = bin_size
+        self.out = out
+        self.refresh_interval = refresh_interval
+        self.mean_rewards = np.empty(0)
+        self.percent_optimal = np.empty(0)
+        self.cumulative_regret = np.empty(0)
+
+    def bind(self, agent, n: int) -> None:
+        """
+        Allocates the curves for n steps and caches the agent's bandit true action values (when they do not drift)
+
+        Parameters
+        ----------
+        agent : Agent
+            Agent about to run
+        n : int
+            Number of steps about to be run
+
+        Raises
+        ------
+        ValueError
+            If the "out" arrays hold fewer entries than there are bins
+        """
+        bins = -(-n // self.bin_size)
+        if self.out != None:
+            if min(len(curve) for curve in self.out) < bins:
+                raise ValueError("Invalid Out, arrays must hold one entry per bin")
+            self.mean_rewards, self.percent_optimal, self.cumulative_regret = (curve[:bins] for curve in self.out)
+        else:
+            self.mean_rewards = np.zeros(bins)
+            self.percent_optimal = np.zeros(bins)
+            self.cumulative_regret = np.zeros(bins)
+        # Python lists & floats keep each "record" call free of NumPy scalar overhead
+        self.__values = agent.bandit.actions.tolist()
+        self.__best = max(self.__values)
+        self.__drift = _DriftingValues(agent.bandit, self.refresh_interval) if getattr(agent.bandit, "walk_variance", 0) else None
+        self.__bin = 0
+        self.__in_bin = 0
+        self.__reward_sum = 0.0
+        self.__optimal_count = 0
+        self.__regret = 0.0
+
+    def record(self, action: int, reward: float) -> None:
+        """
+        Adds a single step to the current bin
+
+        Parameters
+        ----------
+        action : int
+            Action the agent selected
+        reward : float
+            Reward the agent received
+        """
+        if self.__drift == None:
+            value = self.__values[action]
+            best = self.__best
+        else:
+            value, best = self.__drift.observe(action)
+        self.__reward_sum += reward
+        self.__regret += best - value
+        if value == best:
+            self.__optimal_count += 1
+        self.__in_bin += 1
+        if self.__in_bin == self.bin_size:
+            self.__closeBin()
+
+    def finish(self) -> None:
+        """
+        Closes off the last (possibly partial) bin
+        """
+        if self.__in_bin:
+            self.__closeBin()
+
+    def __closeBin(self) -> None:
+        """
+        Private method which writes the current bin into the curves and starts the next one
+        """
+        i = self.__bin
+        self.mean_rewards[i] = self.__reward_sum / self.__in_bin
+        self.percent_optimal[i] = 100 * self.__optimal_count / self.__in_bin
+        self.cumulative_regret[i] = self.__regret
+        self.__bin += 1
+        self.__in_bin = 0
+        self.__reward_sum = 0.0
+        self.__optimal_count = 0
+
+
+class RingBufferRecorder(MetricsSink):
+    """
+    Keeps the most recent "capacity" steps in full detail, in preallocated ring buffers.
+    Extends the "MetricsSink" interface
+
+    ...
+
+    Attributes
+    ----------
+    capacity : int
+        Number of most recent steps kept (default 10000)
+    refresh_interval : int
+        Number of steps between refreshes of the best action value, on a drifting bandit (default 100)
+    steps : np.array
+        Step number (starting from 1) of each buffered step
+    actions : np.array
+        Action selected at each buffered step
+    rewards : np.array
+        Reward received at each buffered step
+    optimal : np.array
+        Whether an optimal action was selected at each buffered step
+    cumulative_regret : np.array
+        Total regret accumulated by each buffered step
+
+    Methods
+    -------
+    bind(agent, n)
+        Clears the buffers and caches the agent's bandit true action values (when they do not drift)
+    record(action, reward)
+        Writes a single step over the oldest buffered step
+    ordered()
+        Returns the buffered steps from oldest to newest
+    """
+
+    def __init__(self, capacity: int = 10000, refresh_interval: int = 100) -> None:
+        """
+        Parameters
+        ----------
+        capacity : int
+            Number of most recent steps kept (default 10000)
+        refresh_interval : int
+            Number of steps between refreshes of the best action value, on a drifting bandit (default 100)
+
+        Raises
+        ------
+        ValueError
+            If capacity or refresh_interval is not positive
+        """
+        if capacity < 1:
+            raise ValueError("Invalid Capacity, must be positive")
+        if refresh_interval < 1:
+            raise ValueError("Invalid Refresh Interval, must be positive")
+        self.capacity = capacity
+        self.refresh_interval = refresh_interval
+        self.steps = np.zeros(capacity, dtype=np.int64)
+        self.actions = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity)
+        self.optimal = np.zeros(capacity, dtype=bool)
+        self.cumulative_regret = np.zeros(capacity)
+        self.__step = 0
+
+    def bind(self, agent, n: int) -> None:
+        """
+        Clears the buffers and caches the agent's bandit true action values (when they do not drift)
+
+        Parameters
+        ----------
+        agent : Agent
+            Agent about to run
+        n : int
+            Number of steps about to be run
+        """
+        # Python lists & floats keep each "record" call free of NumPy scalar overhead
+        self.__values = agent.bandit.actions.tolist()
+        self.__best = max(self.__values)
+        self.__drift = _DriftingValues(agent.bandit, self.refresh_interval) if getattr(agent.bandit, "walk_variance", 0) else None
+        self.__step = 0
+        self.__regret = 0.0
+
+    def record(self, action: int, reward: float) -> None:
+        """
+        Writes a single step over the oldest buffered step
+
+        Parameters
+        ----------
+        action : int
+            Action the agent selected
+        reward : float
+            Reward the agent received
+        """
+        if self.__drift == None:
+            value = self.__values[action]
+            best = self.__best
+        else:
+            value, best = self.__drift.observe(action)
+        self.__regret += best - value
+        i = self.__step % self.capacity
+        self.__step += 1
+        self.steps[i] = self.__step
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.optimal[i] = value == best
+        self.cumulative_regret[i] = self.__regret
+
+    def ordered(self) -> tuple:
+        """
+        Returns the buffered steps from oldest to newest
+
+        Returns
+        -------
+        tuple
+            (steps, actions, rewards, optimal, cumulative_regret) arrays, each holding min(steps recorded, capacity) entries
+        """
+        if self.__step <= self.capacity:
+            order = np.arange(self.__step)
+        else:
+            order = np.roll(np.arange(self.capacity), -(self.__step % self.capacity))
+        return self.steps[order], self.actions[order], self.rewards[order], self.optimal[order], self.cumulative_regret[order]
+
+
+class PrintSink(MetricsSink):
+    """
+    Prints an agent's progress, the way `runSequence` always has: its reward estimates every "print_interval" steps,
+    then its final estimates & total points. Extends the "MetricsSink" interface
+
+    ...
+
+    Attributes
+    ----------
+    print_interval : int
+        Interval between which to print current reward estimate (default None, for only the final printout)
+
+    Methods
+    -------
+    bind(agent, n)
+        Remembers the agent to print the progress of
+    record(action, reward)
+        Counts a single step, printing the reward estimates every "print_interval" steps
+    finish()
+        Prints the final reward estimates & total points
+    """
+
+    def __init__(self, print_interval: int = None) -> None:
+        """
+        Parameters
+        ----------
+        print_interval : int
+            Interval between which to print current reward estimate (default None, for only the final printout)
+        """
+        self.print_interval = print_interval
+
+    def bind(self, agent, n: int) -> None:
+        """
+        Remembers the agent to print the progress of
+
+        Parameters
+        ----------
+        agent : Agent
+            Agent about to run
+        n : int
+            Number of steps about to be run
+        """
+        self.__agent = agent
+        self.__step = 0
+        # Counting down to the next printout avoids a modulo every step
+        self.__until_print = self.print_interval if self.print_interval is not None else n + 1
+
+    def record(self, action: int, reward: float) -> None:
+        """
+        Counts a single step, printing the reward estimates every "print_interval" steps
+
+        Parameters
+        ----------
+        action : int
+            Action the agent selected
+        reward : float
+            Reward the agent received
+        """
+        self.__step += 1
+        self.__until_print -= 1
+        if self.__until_print == 0:
+            self.__until_print = self.print_interval
+            if hasattr(self.__agent, "getRewardEstimates"):
+                print(f"{self.__agent.label} Reward Estimate at Step #{self.__step}: {self.__agent.getRewardEstimates()}")
+
+    def finish(self) -> None:
+        """
+        Prints the final reward estimates & total points
+        """
+        if hasattr(self.__agent, "getRewardEstimates"):
+            print(f"FINAL {self.__agent.label} Reward Estimate: {self.__agent.getRewardEstimates()}")
+        print(f"Total {self.__agent.label} Points: {self.__agent.total_points}")
+        print("-----------------------------------------------------")
+
+
+class MultiSink(MetricsSink):
+    """
+    Reports every step to several sinks at once. Extends the "MetricsSink" interface
+
+    ...
+
+    Attributes
+    ----------
+    sinks : list
+        Sinks being reported to, in order
+
+    Methods
+    -------
+    bind(agent, n)
+        Binds every sink
+    record(action, reward)
+        Records the step in every sink
+    finish()
+        Finishes every sink
+    """
+
+    def __init__(self, sinks: list) -> None:
+        """
+        Parameters
+        ----------
+        sinks : list
+            Sinks to report to, in order
+        """
+        self.sinks = list(sinks)
+
+    def bind(self, agent, n: int) -> None:
+        """
+        Binds every sink
+
+        Parameters
+        ----------
+        agent : Agent
+            Agent about to run
+        n : int
+            Number of steps about to be run
+        """
+        for sink in self.sinks:
+            sink.bind(agent, n)
+        self.__records = [sink.record for sink in self.sinks]
+
+    def record(self, action: int, reward: float) -> None:
+        """
+        Records the step in every sink
+
+        Parameters
+        ----------
+        action : int
+            Action the agent selected
+        reward : float
+            Reward the agent received
+        """
+        for record in self.__records:
+            record(action, reward)
+
+    def finish(self) -> None:
+        """
+        Finishes every sink
+        """
+        for sink in self.sinks:
+            sink.finish()
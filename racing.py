@@ -0,0 +1,249 @@
+"""
+Racing Source File
+
+Adaptive early stopping for parameter sweeps: configurations are evaluated in rounds, and the ones which are clearly
+worse are dropped as soon as the evidence allows, instead of running every configuration on every seed.
+
+Every round, each surviving configuration runs a new block of seeds (with BatchedAgents, sharded across a process pool
+like runSweep). Seed j always gets the same bandit in every configuration (common random numbers), so differences between
+configurations are not drowned in bandit-to-bandit noise. For every configuration, running means & variances of two
+per-run metrics are kept:
+    - final_reward : mean reward over the last "final_window" steps of a run (higher is better)
+    - regret : total regret of a run, the best true action value minus the selected action's, summed over every step (lower is better)
+After each round, configurations are dropped by one of two strategies:
+    - "race" : drop every configuration whose confidence interval lies entirely below the best configuration's
+    - "halving" : successive halving, keep only the better half of the configurations (by mean)
+Each round runs the same total number of seeds, shared among the survivors, so the compute freed by dropped configurations
+goes to the remaining contenders. The race ends once a single configuration is left, or every survivor has run "max_seeds" seeds.
+
+Confidence intervals are normal approximations, Bonferroni-corrected across the configurations (not across rounds, so
+"race" is slightly more eager than its level suggests).
+
+Requires `numpy` to be installed, and the batched, streams & sweeps source files to be imported correctly.
+
+Example:
+    from functools import partial
+    result = raceConfigs(EpsilonGreedyAgent, {"epsilon": [0, 0.01, 0.1, 0.3]}, partial(StationaryBandit, 10, 0, 10, 1), max_seeds = 2000, n = 1000)
+    printRace(result)
+"""
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+
+import numpy as np
+from batched import BatchedAgents
+from streams import childSeed
+from sweeps import expandGrid
+
+METRICS = ("final_reward", "regret")
+STRATEGIES = ("race", "halving")
+
+
+class _RunningStats:
+    """
+    Running count, mean & sum of squared deviations of a metric, merged one block of values at a time (Chan et al.)
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def merge(self, values: np.ndarray) -> None:
+        n = len(values)
+        mean = float(values.mean())
+        m2 = float(((values - mean) ** 2).sum())
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.count * n / total
+        self.count = total
+
+    def interval(self, z: float) -> tuple:
+        """
+        Returns the (lower, upper) normal confidence interval of the mean, for the input z value
+        """
+        if self.count < 2:
+            return -math.inf, math.inf
+        half_width = z * math.sqrt(self.m2 / (self.count - 1) / self.count)
+        return self.mean - half_width, self.mean + half_width
+
+
+def _runBlock(agent_class: type, params: dict, bandit_factory, bandit_seed: np.random.SeedSequence, agent_seed: np.random.SeedSequence,
+              start: int, runs: int, n: int, final_window: int) -> tuple:
+    """
+    Runs seeds start, ..., start + runs - 1 of one configuration (executed inside a worker process)
+
+    Returns
+    -------
+    tuple
+        (final_rewards, regrets), both arrays with one value per run
+    """
+    bandits = [bandit_factory(seed = childSeed(bandit_seed, start + i)) for i in range(runs)]
+    engine = BatchedAgents(agent_class, runs, bandits[0].k, seed = agent_seed, **params)
+    engine.changeBandits(bandits)
+    rows = np.arange(runs)
+    best = engine.actions.max(axis=1)
+    final_rewards = np.zeros(runs)
+    regrets = np.zeros(runs)
+    for step in range(n):
+        selected_actions, selected_rewards = engine.chooseActions()
+        if engine.walk_variance: # The best action value moves as the values drift
+            best = engine.actions.max(axis=1)
+        regrets += best - engine.actions[rows, selected_actions]
+        if step >= n - final_window:
+            final_rewards += selected_rewards
+    return final_rewards / final_window, regrets
+
+
+def raceConfigs(agent_class: type, param_grid: dict, bandit_factory, max_seeds: int = 2000, n: int = 1000, runs_per_round: int = 50,
+                objective: str = "final_reward", strategy: str = "race", level: float = 0.95, min_rounds: int = 2, final_window: int = None,
+                workers: int = None, seed = None) -> dict:
+    """
+    Races every configuration of a parameter grid, dropping configurations as soon as they are clearly worse
+
+    Parameters
+    ----------
+    agent_class : type
+        Agent class to sweep (ex: EpsilonGreedyAgent)
+    param_grid : dict
+        Dictionary mapping hyperparameter name to the list of values to sweep (ex: {"epsilon": [0.01, 0.1]})
+    bandit_factory : callable
+        Picklable callable returning a new bandit, given its seed through the "seed" keyword (ex: functools.partial(StationaryBandit, k, min, max, variance))
+    max_seeds : int
+        Most seeds any configuration runs, as in the exhaustive sweep being replaced (default 2000)
+    n : int
+        Number of steps per run (default 1000)
+    runs_per_round : int
+        Number of seeds every configuration runs in a round while all of them survive (default 50)
+    objective : str
+        Metric configurations are dropped by: "final_reward" (maximized) or "regret" (minimized) (default "final_reward")
+    strategy : str
+        "race" (drop configurations whose confidence interval is entirely worse than the best's) or "halving" (keep the better half) (default "race")
+    level : float
+        Confidence level of the intervals, within (0,1) (default 0.95)
+    min_rounds : int
+        Number of rounds run before any configuration may be dropped (default 2)
+    final_window : int
+        Number of final steps the final_reward metric averages over, within [1, n] (default None, for the last 10% of the steps)
+    workers : int
+        Number of worker processes (default None, for one per core). 1 runs everything in this process
+    seed : int or np.random.SeedSequence
+        Root seed of the race (default None, for a random one)
+
+    Returns
+    -------
+    dict
+        - configs : list of every configuration's {"params", "seeds", "dropped_round", and (mean, lower, upper) of every metric}
+        - best : index of the best surviving configuration (by mean objective)
+        - rounds : number of rounds run
+        - run_steps : number of (run, step) pairs simulated
+        - exhaustive_run_steps : number of (run, step) pairs the exhaustive sweep would simulate
+        - compute_saved : fraction of the exhaustive sweep's compute which was saved
+
+    Raises
+    ------
+    ValueError
+        If the objective or strategy is not supported, the level is not within (0,1), max_seeds, n or runs_per_round are not
+        positive, or final_window is not within [1, n]
+    """
+    if objective not in METRICS:
+        raise ValueError(f"Invalid Objective, must be one of {METRICS}")
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Invalid Strategy, must be one of {STRATEGIES}")
+    if level <= 0 or level >= 1:
+        raise ValueError("Invalid Level, must be within (0,1)")
+    if max_seeds < 1 or n < 1 or runs_per_round < 1:
+        raise ValueError("Invalid Race, max_seeds, n and runs_per_round must be positive")
+    final_window = final_window if final_window != None else max(1, n // 10)
+    if final_window < 1 or final_window > n:
+        raise ValueError("Invalid Final Window, must be within [1, n]")
+    configs = expandGrid(param_grid)
+    root = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    bandit_seed, agent_root = childSeed(root, 0), childSeed(root, 1)
+    # Bonferroni correction across configurations
+    z = NormalDist().inv_cdf(1 - (1 - level) / (2 * len(configs)))
+    sign = 1 if objective == "final_reward" else -1 # Scores are always maximized
+
+    stats = [{metric: _RunningStats() for metric in METRICS} for _ in configs]
+    seeds = [0] * len(configs)
+    dropped_round = [None] * len(configs)
+    alive = list(range(len(configs)))
+    round_budget = len(configs) * runs_per_round
+    if workers is None:
+        workers = os.cpu_count() or 1
+    pool = ProcessPoolExecutor(workers) if workers > 1 else None
+    rounds = 0
+    try:
+        while len(alive) > 1 or (rounds == 0 and alive):
+            share = max(runs_per_round, round_budget // len(alive))
+            tasks = [(i, seeds[i], min(share, max_seeds - seeds[i])) for i in alive if seeds[i] < max_seeds]
+            if not tasks:
+                break
+            rounds += 1
+            arguments = [(agent_class, configs[i], bandit_factory, bandit_seed, childSeed(agent_root, i * max_seeds + start), start, runs, n, final_window)
+                         for i, start, runs in tasks]
+            results = pool.map(_runBlock, *zip(*arguments)) if pool != None else (_runBlock(*task) for task in arguments)
+            for (i, start, runs), (final_rewards, regrets) in zip(tasks, results):
+                stats[i]["final_reward"].merge(final_rewards)
+                stats[i]["regret"].merge(regrets)
+                seeds[i] += runs
+            if rounds < min_rounds:
+                continue
+
+            scores = {i: sign * stats[i][objective].mean for i in alive}
+            if strategy == "halving":
+                survivors = sorted(alive, key = lambda i: -scores[i])[:math.ceil(len(alive) / 2)]
+            else:
+                intervals = {i: stats[i][objective].interval(z) for i in alive}
+                lowers = {i: min(sign * bound for bound in intervals[i]) for i in alive}
+                uppers = {i: max(sign * bound for bound in intervals[i]) for i in alive}
+                best_lower = max(lowers.values())
+                survivors = [i for i in alive if uppers[i] >= best_lower]
+            for i in alive:
+                if i not in survivors:
+                    dropped_round[i] = rounds
+            alive = survivors
+    finally:
+        if pool != None:
+            pool.shutdown()
+
+    results = []
+    for i, params in enumerate(configs):
+        entry = {"params": params, "seeds": seeds[i], "dropped_round": dropped_round[i]}
+        for metric in METRICS:
+            entry[metric] = (stats[i][metric].mean, *stats[i][metric].interval(z))
+        results.append(entry)
+    run_steps = sum(seeds) * n
+    exhaustive_run_steps = len(configs) * max_seeds * n
+    return {
+        "configs": results,
+        "best": max(alive, key = lambda i: sign * stats[i][objective].mean),
+        "rounds": rounds,
+        "run_steps": run_steps,
+        "exhaustive_run_steps": exhaustive_run_steps,
+        "compute_saved": 1 - run_steps / exhaustive_run_steps,
+    }
+
+
+def printRace(result: dict) -> None:
+    """
+    Prints the outcome of a race as a table, followed by the compute saved versus the exhaustive sweep
+
+    Parameters
+    ----------
+    result : dict
+        Result returned by "raceConfigs"
+    """
+    print(f"{'configuration':<36}{'seeds':>7}{'final reward (CI)':>28}{'regret (CI)':>32}{'dropped':>10}")
+    for i, entry in enumerate(result["configs"]):
+        params = ", ".join(f"{name}={value}" for name, value in entry["params"].items()) + (" *" if i == result["best"] else "")
+        final, final_lower, final_upper = entry["final_reward"]
+        regret, regret_lower, regret_upper = entry["regret"]
+        dropped = f"round {entry['dropped_round']}" if entry["dropped_round"] != None else "-"
+        print(f"{params:<36}{entry['seeds']:>7}{final:>10.3f} ({final_lower:.3f}, {final_upper:.3f})"
+              f"{regret:>12.1f} ({regret_lower:.1f}, {regret_upper:.1f}){dropped:>10}")
+    print(f"Ran {result['run_steps']:,} of {result['exhaustive_run_steps']:,} run steps in {result['rounds']} rounds "
+          f"({100 * result['compute_saved']:.1f}% compute saved)")
@@ -0,0 +1,232 @@
+"""
+Serving Source File
+
+Concurrent serving mode, where one agent answers action requests from many threads at once (ex: the workers of a web
+server), and rewards come back later (delayed feedback) through separate update calls.
+
+The "ConcurrentAgent" wrapper splits the agent's loop the way serving needs it:
+    - select() never takes a lock: every thread draws its uniform values from its own random number stream (spawned from
+      the agent's), and the greedy action is read from a snapshot which is republished after every batch of updates
+    - update(action, reward) only appends to a queue of pending updates (a `collections.deque`, whose appends are atomic).
+      Once "batch_size" updates are pending, whichever thread finds the lock free applies the whole batch in vectorized
+      bulk (`np.bincount` of the counts & rewards of every action); the others carry on without waiting
+So selections see estimates which are at most one batch (plus the updates in flight) behind, the usual trade-off of a
+served bandit, and the agent's arrays are only ever written by one thread at a time.
+
+Requires `numpy` to be installed, and the agents source file to be imported correctly.
+
+Currently supports serving:
+    - Epsilon Greedy Agent
+    - Greedy Agent
+    - Optimistic Greedy Agent
+
+Usage:
+    served = ConcurrentAgent(EpsilonGreedyAgent(StationaryBandit(k), epsilon = 0.1), batch_size = 1024)
+    action = served.select()        # In any request thread
+    served.update(action, reward)   # Whenever the reward arrives, in any thread
+    served.flush()                  # Apply every pending update (ex: before reading the estimates)
+"""
+
+import threading
+from collections import deque
+
+import numpy as np
+from agents import EpsilonGreedyAgent
+from agents import GreedyAgent
+from agents import OptimisticGreedyAgent
+
+# Agent classes whose selection (greedy, plus uniform exploration) can be served without locking
+SUPPORTED_AGENTS = (EpsilonGreedyAgent, GreedyAgent, OptimisticGreedyAgent)
+
+
+class ConcurrentAgent:
+    """
+    Thread-safe wrapper serving a single action-value agent to many threads, with lock-free selection and batched updates
+
+    ...
+
+    Attributes
+    ----------
+    agent : ActionValueAgent
+        Wrapped agent, whose estimates, select counts & points total the batched updates are applied to
+    batch_size : int
+        Number of pending updates which triggers applying them (default 1024)
+    epsilon : float
+        Chance of selecting a uniformly random action (the agent's epsilon, or 0 for greedy agents)
+    greedy_action : int
+        Snapshot of the agent's greedy action, republished after every applied batch
+    updates_applied : int
+        Number of updates applied to the agent so far
+    batches_applied : int
+        Number of batches the updates were applied in
+
+    Methods
+    -------
+    select()
+        Selects an action, without locking
+    update(action, reward)
+        Queues the reward of an action selected earlier, applying the pending batch once it is full
+    flush()
+        Applies every pending update, waiting for the lock
+    pendingUpdates()
+        Returns the number of updates not applied yet
+    """
+
+    uniform_buffer_size = 1024
+
+    def __init__(self, agent, batch_size: int = 1024) -> None:
+        """
+        Parameters
+        ----------
+        agent : ActionValueAgent
+            Agent to serve (one of SUPPORTED_AGENTS). Should not be used directly while it is being served
+        batch_size : int
+            Number of pending updates which triggers applying them (default 1024)
+
+        Raises
+        ------
+        ValueError
+            If the agent class is not supported, or batch_size is not positive
+        """
+        if not isinstance(agent, SUPPORTED_AGENTS):
+            raise ValueError(f"Invalid Agent, serving supports {[agent_class.__name__ for agent_class in SUPPORTED_AGENTS]}")
+        if batch_size < 1:
+            raise ValueError("Invalid Batch Size, must be positive")
+        self.agent = agent
+        self.batch_size = batch_size
+        self.epsilon = getattr(agent, "epsilon", 0)
+        self.greedy_action = int(agent._greedyAction())
+        self.updates_applied = 0
+        self.batches_applied = 0
+        self.__k = agent.bandit.k
+        self.__pending = deque()
+        self.__lock = threading.Lock()
+        self.__rng_lock = threading.Lock()
+        self.__local = threading.local()
+
+    def __refillUniforms(self) -> list:
+        """
+        Private method which refills (creating on first use) the calling thread's buffer of uniform [0,1) values, drawn
+        from a stream spawned from the agent's random number generator
+        """
+        local = self.__local
+        if not hasattr(local, "rng"):
+            with self.__rng_lock:
+                local.rng = self.agent.rng.spawn(1)[0]
+        local.uniforms = local.rng.random(self.uniform_buffer_size).tolist()
+        local.index = 0
+        return local.uniforms
+
+    def select(self) -> int:
+        """
+        Selects a uniformly random action with probability epsilon, and the greedy action (as of the last applied batch)
+        otherwise. Takes no lock, and draws a single uniform value from the calling thread's own stream
+        """
+        local = self.__local
+        try:
+            uniforms = local.uniforms
+            i = local.index
+        except AttributeError: # First selection of this thread
+            uniforms = self.__refillUniforms()
+            i = 0
+        if i == len(uniforms):
+            uniforms = self.__refillUniforms()
+            i = 0
+        local.index = i + 1
+        u = uniforms[i]
+        if u < self.epsilon: # Random action (u / epsilon is uniform on [0,1) again)
+            return int(u / self.epsilon * self.__k)
+        return self.greedy_action
+
+    def update(self, action: int, reward: float) -> None:
+        """
+        Queues the reward of an action selected earlier (feedback may be delayed & arrive in any order). Once "batch_size"
+        updates are pending, applies them if no other thread is already doing so
+
+        Parameters
+        ----------
+        action : int
+            Action ID returned by an earlier "select"
+        reward : float
+            Reward the action realized
+
+        Raises
+        ------
+        ValueError
+            If the action is not within the range of accepted "k" actions
+        """
+        if not 0 <= action < self.__k:
+            raise ValueError("Invalid Action, out of range")
+        pending = self.__pending
+        pending.append((action, reward))
+        if len(pending) >= self.batch_size and self.__lock.acquire(blocking=False):
+            try:
+                self.__apply()
+            finally:
+                self.__lock.release()
+
+    def flush(self) -> int:
+        """
+        Applies every pending update (waiting for any batch being applied by another thread), returning how many were applied
+        """
+        with self.__lock:
+            return self.__apply()
+
+    def pendingUpdates(self) -> int:
+        """
+        Returns the number of updates queued but not applied yet
+        """
+        return len(self.__pending)
+
+    def __apply(self) -> int:
+        """
+        Private method which applies the pending updates in one vectorized pass (called with the lock held), giving the same
+        estimates as applying them one at a time in queue order (up to rounding)
+        """
+        pending = self.__pending
+        m = len(pending)
+        if m == 0:
+            return 0
+        popleft = pending.popleft
+        batch = np.array([popleft() for _ in range(m)], dtype=float) # Only this thread pops, so m entries are there
+        actions = batch[:, 0].astype(np.int64)
+        rewards = batch[:, 1]
+
+        agent = self.agent
+        k = self.__k
+        estimates = np.array(agent._reward_estimates, dtype=float)
+        counts = np.bincount(actions, minlength=k)
+        touched = np.flatnonzero(counts)
+        if agent.step_size == None: # Sample averages only depend on each action's reward sum
+            sums = np.bincount(actions, weights=rewards, minlength=k)
+            totals = np.asarray(agent._reward_select_counts, dtype=float)[touched] + counts[touched]
+            estimates[touched] += (sums[touched] - counts[touched] * estimates[touched]) / totals
+        else: # Constant step-size: each reward is discounted by (1 - alpha) per later update of the same action
+            decay = 1 - agent.step_size
+            order = np.argsort(actions, kind="stable")
+            sorted_actions = actions[order]
+            later = np.empty(m, dtype=np.int64)
+            later[order] = np.searchsorted(sorted_actions, sorted_actions, side="right") - np.arange(m) - 1
+            weighted = np.bincount(actions, weights=agent.step_size * decay ** later * rewards, minlength=k)
+            estimates[touched] = decay ** counts[touched] * estimates[touched] + weighted[touched]
+
+        agent_estimates = agent._reward_estimates
+        agent_counts = agent._reward_select_counts
+        if agent._python_floats:
+            for a, q, n in zip(touched.tolist(), estimates[touched].tolist(), counts[touched].tolist()):
+                agent_estimates[a] = q
+                agent_counts[a] += n
+        else:
+            agent_estimates[touched] = estimates[touched]
+            agent_counts[touched] += counts[touched]
+        tree = agent._argmax_tree
+        if tree != None:
+            for a, q in zip(touched.tolist(), estimates[touched].tolist()):
+                tree.update(a, q)
+            self.greedy_action = tree.argmax()
+        else:
+            self.greedy_action = int(estimates.argmax())
+        agent.total_points += float(rewards.sum())
+        self.updates_applied += m
+        self.batches_applied += 1
+        return m
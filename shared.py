@@ -0,0 +1,413 @@
+"""
+Shared Source File
+
+Shared memory versions of the bandit, reward tape & result arrays, for fanning experiments out to worker processes
+without copying them: every large array lives in a named `multiprocessing.shared_memory` block, and pickling an object
+holding one (ex: to send it to a ProcessPoolExecutor worker) only sends the block's name, shape & dtype. The worker
+attaches to the same block by name, so a (steps, k) reward tape or a (k,) array of true action values exists once, however
+many workers read it, and workers write their learning curves straight into a shared result matrix.
+
+The process which creates a block owns it: it must call "unlink()" (or use the object as a context manager) once every
+worker is done, or the block outlives it. Attached copies only "close()" their mapping (which happens on garbage collection).
+
+Requires `numpy` to be installed, and the bandits & metrics source files to be imported correctly.
+
+Currently contains implementations for:
+    - Shared Array (a NumPy array backed by a shared memory block)
+    - Shared Stationary Bandit (true action values in shared memory)
+    - Shared Reward Tape (a whole precomputed reward tape in shared memory, replayed through TapeBandit)
+    - runComparison (one worker per agent, replaying the same shared tape & writing into one shared result matrix)
+
+Usage:
+    with SharedStationaryBandit(k = 10000, seed = 0) as bandit, SharedRewardTape(RewardTape(bandit, seed = 1), n = 100000) as tape:
+        mean_rewards, percent_optimal, cumulative_regret = runComparison([partial(EpsilonGreedyAgent, epsilon = e) for e in (0, 0.01, 0.1)], tape, n = 100000)
+"""
+
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+from bandits import RewardTape
+from bandits import StationaryBandit
+from bandits import TapeBandit
+from metrics import CurveRecorder
+
+
+class SharedArray:
+    """
+    NumPy array backed by a named block of shared memory. Pickling it sends only the name, shape & dtype, and unpickling
+    attaches to the same block (zero copy)
+
+    ...
+
+    Attributes
+    ----------
+    name : str
+        Name of the shared memory block
+    shape : tuple
+        Shape of the array
+    dtype : np.dtype
+        dtype of the array
+    array : np.array
+        The array itself (None once closed)
+    owner : bool
+        Whether this process created the block (and is responsible for unlinking it)
+
+    Methods
+    -------
+    attach(name, shape, dtype)
+        Class method, returns a Shared Array attached to an existing block
+    close()
+        Releases this process' mapping of the block
+    unlink()
+        Releases the mapping, and destroys the block (owner only)
+    """
+
+    def __init__(self, shape, dtype = "float64", name: str = None) -> None:
+        """
+        Creates a new (zero filled) shared memory block holding an array
+
+        Parameters
+        ----------
+        shape : int or tuple
+            Shape of the array
+        dtype : str or np.dtype
+            dtype of the array (default "float64")
+        name : str
+            Name of the block (default None, for a random unique name)
+        """
+        self.shape = tuple(np.atleast_1d(shape).tolist())
+        self.dtype = np.dtype(dtype)
+        size = max(1, int(np.prod(self.shape)) * self.dtype.itemsize) # Blocks can't be empty
+        self.__memory = shared_memory.SharedMemory(name, create = True, size = size)
+        self.name = self.__memory.name
+        self.owner = True
+        self.array = np.ndarray(self.shape, self.dtype, self.__memory.buf)
+        self.array.fill(0)
+
+    @classmethod
+    def attach(cls, name: str, shape: tuple, dtype) -> "SharedArray":
+        """
+        Returns a Shared Array attached to an existing block, by name
+
+        Parameters
+        ----------
+        name : str
+            Name of the block
+        shape : tuple
+            Shape of the array
+        dtype : str or np.dtype
+            dtype of the array
+        """
+        shared = cls.__new__(cls)
+        shared.shape = tuple(shape)
+        shared.dtype = np.dtype(dtype)
+        if sys.version_info >= (3, 13): # The creating process' resource tracker alone is responsible for the block
+            shared.__memory = shared_memory.SharedMemory(name, track = False)
+        else:
+            shared.__memory = shared_memory.SharedMemory(name)
+        shared.name = name
+        shared.owner = False
+        shared.array = np.ndarray(shared.shape, shared.dtype, shared.__memory.buf)
+        return shared
+
+    def __reduce__(self) -> tuple:
+        return (SharedArray.attach, (self.name, self.shape, self.dtype.str))
+
+    def close(self) -> None:
+        """
+        Releases this process' mapping of the block (views of "array" taken elsewhere must be dropped first)
+        """
+        if self.array is not None:
+            self.array = None
+            self.__memory.close()
+
+    def unlink(self) -> None:
+        """
+        Releases the mapping, and destroys the block (once every other process has closed it too)
+
+        Raises
+        ------
+        ValueError
+            If this process did not create the block
+        """
+        if not self.owner:
+            raise ValueError("Invalid Unlink, only the process which created the block may unlink it")
+        self.close()
+        self.__memory.unlink()
+
+    def __enter__(self) -> "SharedArray":
+        return self
+
+    def __exit__(self, *exception) -> None:
+        self.unlink() if self.owner else self.close()
+
+    def __del__(self) -> None:
+        try:
+            self.close()
+        except (BufferError, AttributeError): # Views still exported, or never fully constructed
+            pass
+
+
+class SharedStationaryBandit(StationaryBandit):
+    """
+    Stationary Bandit whose true action values live in shared memory. Extends the "StationaryBandit" class
+
+    Pickling sends the action values' block name (not the values), plus the bandit's random number generator state &
+    noise buffer, so a worker gets an exact copy of the bandit which reads the same action values
+
+    ...
+
+    Attributes
+    ----------
+    shared_actions : SharedArray
+        Shared memory block holding "actions"
+
+    Methods
+    -------
+    close()
+        Releases this process' mapping of the action values
+    unlink()
+        Destroys the shared action values (creating process only)
+    """
+
+    def __init__(self, k: int = 3, min: int = 0, max: int = 10, variance: int = 1, noise_buffer_size: int = 4096, seed = None, dtype: str = "float64") -> None:
+        """
+        Parameters
+        ----------
+        k : int
+            number of "arms" (valid actions) the bandit has (default 3)
+        min : int
+            minimum value for the reward (default 0)
+        max : int
+            maximum value for the reward (default 10)
+        variance : int
+            normal distribution variance value (default 1)
+        noise_buffer_size : int
+            number of standard normal draws generated at once and consumed by successive pulls (default 4096)
+        seed : None, int, np.random.SeedSequence or np.random.Generator
+            Seed for the bandit's random number generator (default None)
+        dtype : str
+            dtype of the noise draws, "float64" or "float32" (default "float64")
+        """
+        super().__init__(k, min, max, variance, noise_buffer_size, seed, dtype)
+        self.shared_actions = SharedArray(self.actions.shape, self.actions.dtype)
+        self.shared_actions.array[:] = self.actions
+        self.actions = self.shared_actions.array
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["actions"] # Reattached from "shared_actions"
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.actions = self.shared_actions.array
+
+    def setState(self, state: dict) -> None:
+        """
+        Restores a state returned by "getState", copying the action values into the shared block (so every process
+        attached to it sees them)
+
+        Parameters
+        ----------
+        state : dict
+            State of a bandit of the same type & number of actions
+
+        Raises
+        ------
+        ValueError
+            If the state has a different number of actions
+        """
+        super().setState(state)
+        if self.actions is not self.shared_actions.array:
+            self.shared_actions.array[:] = self.actions
+            self.actions = self.shared_actions.array
+
+    def close(self) -> None:
+        """
+        Releases this process' mapping of the action values
+        """
+        self.actions = None
+        self.shared_actions.close()
+
+    def unlink(self) -> None:
+        """
+        Destroys the shared action values (creating process only, once every worker is done)
+        """
+        self.actions = None
+        self.shared_actions.unlink()
+
+    def __enter__(self) -> "SharedStationaryBandit":
+        return self
+
+    def __exit__(self, *exception) -> None:
+        self.unlink() if self.shared_actions.owner else self.close()
+
+
+class SharedRewardTape:
+    """
+    Reward Tape precomputed once into shared memory, so every worker replays the same rewards without regenerating or
+    copying them. Holds exactly the values of the Reward Tape it is built from, and can be replayed anywhere a Reward Tape
+    can (through "replay()", or TapeBandit)
+
+    ...
+
+    Attributes
+    ----------
+    bandit : StationaryBandit
+        Bandit whose true action values the rewards were drawn around (a SharedStationaryBandit avoids copying them to workers)
+    chunk_size : int
+        Number of steps per chunk, as in the Reward Tape it was built from
+    steps : int
+        Number of steps held (the requested steps, rounded up to whole chunks)
+    rewards : SharedArray
+        (steps, k) shared array of the reward every action gives at every step
+
+    Methods
+    -------
+    chunk(index)
+        Returns the rewards of every arm for steps [index * chunk_size, (index + 1) * chunk_size), as a view
+    replay()
+        Returns a new Tape Bandit which replays this tape from step 0
+    close()
+        Releases this process' mapping of the rewards
+    unlink()
+        Destroys the shared rewards (creating process only)
+    """
+
+    def __init__(self, tape: RewardTape, n: int) -> None:
+        """
+        Parameters
+        ----------
+        tape : RewardTape
+            Tape to precompute
+        n : int
+            Number of steps to precompute (rounded up to whole chunks)
+
+        Raises
+        ------
+        ValueError
+            If n is not positive
+        """
+        if n < 1:
+            raise ValueError("Invalid Steps, must be positive")
+        self.bandit = tape.bandit
+        self.chunk_size = tape.chunk_size
+        chunks = -(-n // tape.chunk_size)
+        self.steps = chunks * tape.chunk_size
+        self.rewards = SharedArray((self.steps, tape.bandit.k))
+        for index in range(chunks):
+            self.rewards.array[index * self.chunk_size:(index + 1) * self.chunk_size] = tape.chunk(index)
+
+    def chunk(self, index: int) -> np.ndarray:
+        """
+        Returns the rewards of every arm for steps [index * chunk_size, (index + 1) * chunk_size), as a view of the shared array
+
+        Parameters
+        ----------
+        index : int
+            Which chunk of the tape to return
+
+        Raises
+        ------
+        ValueError
+            If the chunk is beyond the precomputed steps
+        """
+        if not 0 <= index < self.steps // self.chunk_size:
+            raise ValueError("Invalid Chunk, beyond the precomputed steps of the shared tape")
+        return self.rewards.array[index * self.chunk_size:(index + 1) * self.chunk_size]
+
+    def replay(self) -> TapeBandit:
+        """
+        Returns a new Tape Bandit which replays this tape from step 0
+        """
+        return TapeBandit(self)
+
+    def close(self) -> None:
+        """
+        Releases this process' mapping of the rewards
+        """
+        self.rewards.close()
+
+    def unlink(self) -> None:
+        """
+        Destroys the shared rewards (creating process only, once every worker is done)
+        """
+        self.rewards.unlink()
+
+    def __enter__(self) -> "SharedRewardTape":
+        return self
+
+    def __exit__(self, *exception) -> None:
+        self.unlink() if self.rewards.owner else self.close()
+
+
+def _runShared(agent_factory, tape: SharedRewardTape, results: SharedArray, row: int, n: int, bin_size: int) -> None:
+    """
+    Runs one agent on a replay of the shared tape, recording its curves straight into row "row" of the shared results
+    (executed inside a worker process)
+    """
+    recorder = CurveRecorder(bin_size, out = tuple(results.array[:, row]))
+    agent_factory(tape.replay()).run(n, recorder)
+
+
+def runComparison(agent_factories: list, tape: SharedRewardTape, n: int = 1000, bin_size: int = 1, workers: int = None,
+                  results: SharedArray = None) -> tuple:
+    """
+    Runs one agent per factory on the same shared reward tape (common random numbers), one worker process per agent at a
+    time, each writing its learning curves straight into a shared result matrix. Only the factories & the shared blocks'
+    names are sent to the workers, and nothing is sent back
+
+    Parameters
+    ----------
+    agent_factories : list
+        Picklable callables returning a new agent, given its bandit (ex: functools.partial(EpsilonGreedyAgent, epsilon = 0.1))
+    tape : SharedRewardTape
+        Tape every agent replays from step 0 (holding at least n steps)
+    n : int
+        Number of steps per agent (default 1000)
+    bin_size : int
+        Number of consecutive steps averaged into each entry of the curves (default 1, for per-step curves)
+    workers : int
+        Number of worker processes (default None, for one per core). 1 runs everything in this process
+    results : SharedArray
+        (3, len(agent_factories), bins) shared array to record into, left holding the curves (default None, for a
+        temporary one whose curves are copied out)
+
+    Returns
+    -------
+    tuple
+        (mean_rewards, percent_optimal, cumulative_regret), each a (len(agent_factories), bins) array (views of "results", if given)
+
+    Raises
+    ------
+    ValueError
+        If the tape holds fewer than n steps, or results does not have the required shape
+    """
+    if n > tape.steps:
+        raise ValueError("Invalid Steps, the shared tape holds fewer than n steps")
+    bins = -(-n // bin_size)
+    shape = (3, len(agent_factories), bins)
+    temporary = results is None
+    if temporary:
+        results = SharedArray(shape)
+    elif results.shape != shape:
+        raise ValueError(f"Invalid Results, must have shape {shape}")
+    try:
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers > 1:
+            with ProcessPoolExecutor(min(workers, len(agent_factories))) as pool:
+                list(pool.map(_runShared, agent_factories, [tape] * len(agent_factories), [results] * len(agent_factories),
+                              range(len(agent_factories)), [n] * len(agent_factories), [bin_size] * len(agent_factories)))
+        else:
+            for row, agent_factory in enumerate(agent_factories):
+                _runShared(agent_factory, tape, results, row, n, bin_size)
+        curves = results.array.copy() if temporary else results.array
+    finally:
+        if temporary:
+            results.unlink()
+    return curves[0], curves[1], curves[2]
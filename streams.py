@@ -0,0 +1,58 @@
+"""
+Streams Source File
+
+Helpers for creating the independent random number streams used by every bandit & agent.
+
+Every bandit and agent owns its own `np.random.Generator` (rather than sharing numpy's legacy global state), so runs are
+reproducible on their own, safe to use in parallel, and cheaper per draw. Generators are backed by the SFC64 bit generator,
+which is the fastest numpy provides for the block draws (noise buffers, reward tapes) used throughout.
+
+Requires `numpy` to be installed.
+"""
+
+import numpy as np
+
+
+def makeGenerator(seed = None) -> np.random.Generator:
+    """
+    Returns a Generator for the input seed
+
+    Parameters
+    ----------
+    seed : None, int, np.random.SeedSequence or np.random.Generator
+        Seed of the stream (default None, for a random one). A Generator is returned as is, so it can be shared on purpose
+    """
+    if isinstance(seed, np.random.Generator):
+        return seed
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return np.random.Generator(np.random.SFC64(seed))
+
+
+def childSeed(seed_seq: np.random.SeedSequence, index: int) -> np.random.SeedSequence:
+    """
+    Returns the index-th child of a SeedSequence.
+    Unlike `SeedSequence.spawn`, this does not change the parent, so the same index always gives the same child.
+
+    Parameters
+    ----------
+    seed_seq : np.random.SeedSequence
+        Parent seed
+    index : int
+        Which child to return
+    """
+    return np.random.SeedSequence(seed_seq.entropy, spawn_key = seed_seq.spawn_key + (index,))
+
+
+def spawnGenerators(seed, n: int) -> list:
+    """
+    Returns n independent child Generators of the input seed or Generator (ex: one per worker or per agent)
+
+    Parameters
+    ----------
+    seed : None, int, np.random.SeedSequence or np.random.Generator
+        Parent stream
+    n : int
+        Number of child streams to create
+    """
+    return makeGenerator(seed).spawn(n)
@@ -0,0 +1,156 @@
+"""
+Sweeps Source File
+
+Parameter sweep runner which shards batched experiments across every core with a process pool.
+
+Every (configuration, block of seeds) pair is run as an independent task on its own `SeedSequence`-spawned random stream,
+and the per-step results are merged in a fixed order, so a sweep gives bit-identical results no matter how many workers it runs on.
+Seed block b always gets the same child stream, so every configuration is run against the SAME bandits (common random numbers).
+
+Requires `numpy` to be installed, and the batched & streams source files to be imported correctly.
+
+Example:
+    from functools import partial
+    configs, mean_rewards, percent_optimal = runSweep(EpsilonGreedyAgent, {"epsilon": [0, 0.01, 0.1]},
+                                                      partial(StationaryBandit, 10, 0, 10, 1), seeds = 2000, n = 1000)
+"""
+
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from batched import BatchedAgents
+from streams import childSeed
+
+
+def expandGrid(param_grid: dict) -> list:
+    """
+    Expands a parameter grid into the list of every configuration it contains (in row-major order of the grid)
+
+    Parameters
+    ----------
+    param_grid : dict
+        Dictionary mapping hyperparameter name to the list of values to sweep (ex: {"epsilon": [0.01, 0.1]})
+    """
+    names = list(param_grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(param_grid[name] for name in names))]
+
+
+def _runTask(agent_class: type, params: dict, bandit_factory, bandit_seed: np.random.SeedSequence, agent_seed: np.random.SeedSequence, runs: int, n: int,
+             start: int = 0) -> tuple:
+    """
+    Runs one block of seeds for one configuration (executed inside a worker process)
+
+    Parameters
+    ----------
+    agent_class : type
+        Agent class to run
+    params : dict
+        Hyperparameters of the agent
+    bandit_factory : callable
+        Picklable callable returning a new bandit, given its seed through the "seed" keyword
+    bandit_seed : np.random.SeedSequence
+        Parent stream of this block's bandits (bandit i is created from its (start + i)-th child)
+    agent_seed : np.random.SeedSequence
+        Random stream used by this block's agents & rewards
+    runs : int
+        Number of seeds (independent runs) in the block
+    n : int
+        Number of steps to run
+    start : int
+        Index of the block's first run among the children of bandit_seed (default 0)
+
+    Returns
+    -------
+    tuple
+        (reward_sums, optimal_counts), both arrays of length n summed (not averaged) over the block's runs
+    """
+    bandits = [bandit_factory(seed = childSeed(bandit_seed, start + i)) for i in range(runs)]
+    engine = BatchedAgents(agent_class, runs, bandits[0].k, seed = agent_seed, **params)
+    engine.changeBandits(bandits)
+    mean_rewards, percent_optimal = engine.runSequence(n)
+    return mean_rewards * runs, percent_optimal * (runs / 100)
+
+
+def runSweep(agent_class: type, param_grid: dict, bandit_factory, seeds: int = 100, n: int = 1000, runs_per_task: int = 50, workers: int = None, seed = None,
+             progress = None, bandit_seed: np.random.SeedSequence = None) -> tuple:
+    """
+    Runs every configuration of a parameter grid over the given number of seeds, sharded across a process pool
+
+    Parameters
+    ----------
+    agent_class : type
+        Agent class to sweep (ex: EpsilonGreedyAgent)
+    param_grid : dict
+        Dictionary mapping hyperparameter name to the list of values to sweep (ex: {"epsilon": [0.01, 0.1]})
+    bandit_factory : callable
+        Picklable callable returning a new bandit, given its seed through the "seed" keyword (ex: functools.partial(StationaryBandit, k, min, max, variance))
+    seeds : int
+        Number of independent runs per configuration (default 100)
+    n : int
+        Number of steps per run (default 1000)
+    runs_per_task : int
+        Number of seeds batched together into a single task (default 50).
+        (NOTE: Results depend on this value, but NOT on the number of workers)
+    workers : int
+        Number of worker processes (default None, for one per core). 1 runs everything in this process
+    seed : int or np.random.SeedSequence
+        Root seed of the sweep (default None, for a random one)
+    progress : callable
+        Called as progress(done, total) each time a task's results come in, in task order (default None)
+    bandit_seed : np.random.SeedSequence
+        Parent stream of the bandits, where run i is created from its i-th child whatever the block sizes (default None,
+        for streams derived from each block's seed)
+
+    Returns
+    -------
+    tuple
+        (configs, mean_rewards, percent_optimal) where:
+            - configs = list of every configuration's hyperparameters
+            - mean_rewards = (len(configs), n) array of each configuration's mean reward at each step
+            - percent_optimal = (len(configs), n) array of each configuration's % optimal action at each step
+
+    Raises
+    ------
+    ValueError
+        If seeds, n or runs_per_task are not positive
+    """
+    if seeds < 1 or n < 1 or runs_per_task < 1:
+        raise ValueError("Invalid Sweep, seeds, n and runs_per_task must be positive")
+    configs = expandGrid(param_grid)
+    root = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    block_sizes = [min(runs_per_task, seeds - start) for start in range(0, seeds, runs_per_task)]
+    # Children are derived by index (never spawned inside a task), so every task sees the same streams in any process
+    block_seeds = [(childSeed(block_seed, 0), childSeed(block_seed, 1))
+                   for block_seed in (childSeed(root, block) for block in range(len(block_sizes)))]
+
+    if bandit_seed != None: # Every block takes its bandits from the shared parent stream, from its first run on
+        block_seeds = [(bandit_seed, agent_seed) for _, agent_seed in block_seeds]
+        block_starts = [block * runs_per_task for block in range(len(block_sizes))]
+    else:
+        block_starts = [0] * len(block_sizes)
+
+    tasks = [(agent_class, params, bandit_factory, block_bandit_seed, agent_seed, block_size, n, start)
+             for params in configs for (block_bandit_seed, agent_seed), block_size, start in zip(block_seeds, block_sizes, block_starts)]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    results = []
+    if workers == 1:
+        for task in tasks:
+            results.append(_runTask(*task))
+            if progress != None:
+                progress(len(results), len(tasks))
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            for result in pool.map(_runTask, *zip(*tasks)):
+                results.append(result)
+                if progress != None:
+                    progress(len(results), len(tasks))
+
+    # Merge in task order (never completion order), so the floating point sums are identical for any worker count
+    reward_sums = np.array([result[0] for result in results]).reshape(len(configs), len(block_sizes), n)
+    optimal_counts = np.array([result[1] for result in results]).reshape(len(configs), len(block_sizes), n)
+    mean_rewards = reward_sums.sum(axis=1) / seeds
+    percent_optimal = optimal_counts.sum(axis=1) * (100 / seeds)
+    return configs, mean_rewards, percent_optimal
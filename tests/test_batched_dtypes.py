@@ -0,0 +1,26 @@
+"""
+Checks that the batched engine's compact float32 / integer count state learns the same curves as float64
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents import EpsilonGreedyAgent
+from agents import UpperConfidenceBoundAgent
+from benchmark import DTYPE_PAIRS
+from benchmark import compareDtypes
+
+
+@pytest.mark.parametrize("agent_class, agent_params", [
+    (EpsilonGreedyAgent, {"epsilon": 0.1}),
+    (UpperConfidenceBoundAgent, {"c": 2}),
+])
+def test_compact_dtypes_match_float64(agent_class, agent_params):
+    results = compareDtypes(agent_class, runs = 500, k = 10, n = 400, window = 50, seed = 0, **agent_params)
+    assert [(result["dtype"], result["count_dtype"]) for result in results] == DTYPE_PAIRS
+    for result in results:
+        assert result["passed"], f"{result['dtype']} / {result['count_dtype']} diverged from float64 by {result['max_z']:.2f} SE"
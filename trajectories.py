@@ -0,0 +1,378 @@
+"""
+Trajectories Source File
+
+Append-only log of every step an agent takes (step, action, reward), with zero-copy replay.
+
+A trajectory is a directory holding one fixed-width binary file per column ("step.bin", "action.bin", "reward.bin", and
+optionally "propensity.bin": the probability the logging agent had of selecting each logged action), plus a small
+"columns.json" describing their dtypes. Columns are appended to in large chunks, and each is read back as a
+read-only `np.memmap`, so replaying millions of steps never copies them into memory. The number of records is
+derived from the column file sizes (the shortest column wins), so a crash mid-append never leaves a corrupt log behind.
+
+The writer is a MetricsSink, so it can be passed straight to an agent's `runSequence`. High throughput sources (ex:
+BatchedAgents, or any precomputed arrays) can instead append whole arrays at once with `append`.
+
+Requires `numpy` to be installed, and the metrics source file to be imported correctly.
+
+Usage:
+    writer = TrajectoryWriter("run_log")
+    agent.runSequence(10**6, sink = writer)
+    writer.close()
+    log = TrajectoryReader("run_log")
+    log.actions, log.rewards # np.memmap views of every logged step
+"""
+
+import json
+import os
+
+import numpy as np
+from metrics import MetricsSink
+
+# Column name -> fixed-width (little endian) dtype of its file
+COLUMNS = {"step": "<i8", "action": "<i4", "reward": "<f8"}
+# Optional column, holding the logging agent's probability of selecting each logged action (for off-policy evaluation)
+PROPENSITY_COLUMNS = dict(COLUMNS, propensity = "<f8")
+
+
+class TrajectoryWriter(MetricsSink):
+    """
+    Appends every recorded step to a trajectory directory, buffering steps in memory and writing each column in chunks of
+    "chunk_size" records. Extends the "MetricsSink" interface
+
+    Steps are numbered consecutively from the number of records already in the directory, so several runs (or several
+    writers, one after another) append to the same log. With "propensities" enabled, the probability the agent had of
+    selecting each recorded action is logged as well, reported by the agent as it selects the action (exact for every agent
+    but Thompson Sampling, whose propensities are estimated from a stream spawned from its own, so they are reproducible)
+
+    ...
+
+    Attributes
+    ----------
+    directory : str
+        Directory holding the trajectory (created if needed)
+    chunk_size : int
+        Number of buffered steps written at once (default 65536)
+    propensities : bool
+        Whether the logging agent's propensity of each action is logged (default False)
+    count : int
+        Number of records written so far, excluding buffered steps (including any already in the directory)
+
+    Methods
+    -------
+    bind(agent, n)
+        Opens the column files (if not already open), and has the agent keep the probability of each selection when logging propensities
+    record(action, reward)
+        Buffers a single step, writing the buffer once it holds "chunk_size" steps
+    append(actions, rewards, steps = None, propensities = None)
+        Writes whole arrays of steps at once
+    flush()
+        Writes every buffered step
+    finish()
+        Writes every buffered step (the files stay open for later runs)
+    close()
+        Writes every buffered step and closes the column files
+    """
+
+    def __init__(self, directory: str, chunk_size: int = 65536, propensities: bool = False) -> None:
+        """
+        Parameters
+        ----------
+        directory : str
+            Directory to hold the trajectory (created if needed)
+        chunk_size : int
+            Number of buffered steps written at once (default 65536)
+        propensities : bool
+            Whether to log the logging agent's propensity of each action (default False)
+
+        Raises
+        ------
+        ValueError
+            If chunk_size is not positive, or the directory holds a trajectory with different columns
+        """
+        if chunk_size < 1:
+            raise ValueError("Invalid Chunk Size, must be positive")
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.propensities = propensities
+        self.__columns = PROPENSITY_COLUMNS if propensities else COLUMNS
+        os.makedirs(directory, exist_ok = True)
+        columns_path = os.path.join(directory, "columns.json")
+        if os.path.exists(columns_path):
+            if _readColumns(directory) != self.__columns:
+                raise ValueError("Invalid Trajectory, directory holds different columns")
+        else:
+            with open(columns_path, "w") as file:
+                json.dump(self.__columns, file)
+        self.count = _recordCount(directory, self.__columns)
+        self.__files = None
+        self.__agent = None
+        self.__actions = []
+        self.__rewards = []
+        self.__propensities = []
+
+    def __open(self) -> None:
+        """
+        Private method which opens every column file for appending, first trimming any partially written records
+        """
+        if self.__files != None:
+            return
+        self.__files = {}
+        for name, dtype in self.__columns.items():
+            file = open(os.path.join(self.directory, name + ".bin"), "ab")
+            file.truncate(self.count * np.dtype(dtype).itemsize)
+            self.__files[name] = file
+
+    def __write(self, columns: dict) -> None:
+        """
+        Private method which appends equally long arrays to the column files, without copying them if already in the file dtypes
+        """
+        self.__open()
+        for name, values in columns.items():
+            self.__files[name].write(memoryview(np.ascontiguousarray(values, dtype = self.__columns[name])))
+
+    def bind(self, agent, n: int) -> None:
+        """
+        Opens the column files (if not already open), and has the agent keep the probability of each selection when logging propensities
+
+        Parameters
+        ----------
+        agent : Agent
+            Agent about to run
+        n : int
+            Number of steps about to be run
+        """
+        self.__open()
+        if self.propensities:
+            self.__agent = agent
+            agent._log_propensities = True
+
+    def record(self, action: int, reward: float) -> None:
+        """
+        Buffers a single step, writing the buffer once it holds "chunk_size" steps
+
+        Parameters
+        ----------
+        action : int
+            Action the agent selected
+        reward : float
+            Reward the agent received
+        """
+        self.__actions.append(action)
+        self.__rewards.append(reward)
+        if self.propensities:
+            self.__propensities.append(self.__agent._propensity)
+        if len(self.__actions) == self.chunk_size:
+            self.flush()
+
+    def append(self, actions: np.ndarray, rewards: np.ndarray, steps: np.ndarray = None, propensities: np.ndarray = None) -> None:
+        """
+        Writes whole arrays of steps at once (after any buffered steps)
+
+        Parameters
+        ----------
+        actions : np.array
+            Action selected at each step
+        rewards : np.array
+            Reward received at each step
+        steps : np.array
+            Step number of each record (default None, to number them consecutively after the last record).
+            (ex: with BatchedAgents, every run's record of a step shares the same step number)
+        propensities : np.array
+            Logging agent's probability of selecting each action (required exactly when the writer logs propensities)
+
+        Raises
+        ------
+        ValueError
+            If the arrays do not all have the same length, or propensities are given to a writer which does not log them (or vice versa)
+        """
+        if (propensities is None) == self.propensities:
+            raise ValueError("Invalid Propensities, must be given exactly when the writer logs them")
+        columns = {"step": steps, "action": np.ravel(actions), "reward": np.ravel(rewards)}
+        if steps is None:
+            columns["step"] = np.arange(self.count + len(self.__actions), self.count + len(self.__actions) + columns["action"].size)
+        if self.propensities:
+            columns["propensity"] = propensities
+        for name in columns:
+            columns[name] = np.ravel(columns[name])
+            if columns[name].size != columns["action"].size:
+                raise ValueError("Invalid Records, every column must have the same length")
+        self.flush()
+        self.__write(columns)
+        self.count += columns["action"].size
+
+    def flush(self) -> None:
+        """
+        Writes every buffered step, and flushes the column files
+        """
+        m = len(self.__actions)
+        if m:
+            columns = {"step": np.arange(self.count, self.count + m), "action": np.array(self.__actions), "reward": np.array(self.__rewards)}
+            if self.propensities:
+                columns["propensity"] = np.array(self.__propensities)
+            self.__write(columns)
+            self.count += m
+            self.__actions = []
+            self.__rewards = []
+            self.__propensities = []
+        if self.__files != None:
+            for file in self.__files.values():
+                file.flush()
+
+    def finish(self) -> None:
+        """
+        Writes every buffered step (the files stay open, so later runs keep appending), and stops the agent keeping propensities
+        """
+        self.flush()
+        if self.__agent != None:
+            self.__agent._log_propensities = False
+            self.__agent = None
+
+    def close(self) -> None:
+        """
+        Writes every buffered step and closes the column files
+        """
+        self.flush()
+        if self.__files != None:
+            for file in self.__files.values():
+                file.close()
+            self.__files = None
+
+
+class TrajectoryReader:
+    """
+    Read-only view of a trajectory directory, exposing every column as a memory-mapped NumPy array (no copies are made)
+
+    ...
+
+    Attributes
+    ----------
+    directory : str
+        Directory holding the trajectory
+    steps : np.array
+        Step number of every record (memory-mapped)
+    actions : np.array
+        Action selected at every record (memory-mapped)
+    rewards : np.array
+        Reward received at every record (memory-mapped)
+    propensities : np.array
+        Logging agent's probability of selecting every record's action (memory-mapped), or None if they were not logged
+
+    Methods
+    -------
+    chunks(chunk_size = 1048576)
+        Yields (steps, actions, rewards, propensities) views of consecutive chunks of records
+    """
+
+    def __init__(self, directory: str) -> None:
+        """
+        Parameters
+        ----------
+        directory : str
+            Directory holding the trajectory
+
+        Raises
+        ------
+        ValueError
+            If the directory does not hold a trajectory with the expected columns
+        """
+        if not os.path.exists(os.path.join(directory, "columns.json")):
+            raise ValueError("Invalid Trajectory, directory holds no trajectory")
+        columns = _readColumns(directory)
+        if columns != COLUMNS and columns != PROPENSITY_COLUMNS:
+            raise ValueError("Invalid Trajectory, directory holds different columns")
+        self.directory = directory
+        count = _recordCount(directory, columns)
+        self.steps, self.actions, self.rewards = (_mapColumn(directory, name, columns[name], count) for name in COLUMNS)
+        self.propensities = _mapColumn(directory, "propensity", columns["propensity"], count) if "propensity" in columns else None
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    def chunks(self, chunk_size: int = 1048576):
+        """
+        Yields (steps, actions, rewards, propensities) views of consecutive chunks of records, so long logs can be processed
+        in bounded memory (propensities are None if they were not logged)
+
+        Parameters
+        ----------
+        chunk_size : int
+            Number of records per chunk (default 1048576)
+        """
+        for start in range(0, len(self), chunk_size):
+            end = start + chunk_size
+            propensities = self.propensities[start:end] if self.propensities is not None else None
+            yield self.steps[start:end], self.actions[start:end], self.rewards[start:end], propensities
+
+
+def evaluateEstimates(log: TrajectoryReader, estimates: np.ndarray, chunk_size: int = 1048576) -> dict:
+    """
+    Evaluates a set of reward estimates (ex: a different agent's `getRewardEstimates()`) against a logged trajectory, one
+    chunk at a time
+
+    Parameters
+    ----------
+    log : TrajectoryReader
+        Logged trajectory
+    estimates : np.array
+        Estimated reward of each action (index = action ID)
+    chunk_size : int
+        Number of records processed at once (default 1048576)
+
+    Returns
+    -------
+    dict
+        - logged_means : mean logged reward of each action (NaN for actions never logged)
+        - logged_counts : number of times each action was logged
+        - rmse : root mean squared error of the estimates as predictions of the logged rewards
+        - greedy_agreement : fraction of logged steps whose action is the estimates' greedy action
+    """
+    estimates = np.asarray(estimates, dtype = float)
+    k = len(estimates)
+    greedy = estimates.argmax()
+    sums = np.zeros(k)
+    counts = np.zeros(k)
+    squared_error = 0.0
+    agreement = 0
+    for _, actions, rewards, _ in log.chunks(chunk_size):
+        sums += np.bincount(actions, weights = rewards, minlength = k)
+        counts += np.bincount(actions, minlength = k)
+        errors = rewards - estimates[actions]
+        squared_error += float(errors @ errors)
+        agreement += int(np.count_nonzero(actions == greedy))
+    n = len(log)
+    with np.errstate(invalid = "ignore", divide = "ignore"):
+        logged_means = sums / counts
+    return {
+        "logged_means": logged_means,
+        "logged_counts": counts,
+        "rmse": float(np.sqrt(squared_error / n)) if n else float("nan"),
+        "greedy_agreement": agreement / n if n else float("nan"),
+    }
+
+
+def _readColumns(directory: str) -> dict:
+    """
+    Returns the column name -> dtype dict stored in a trajectory directory's "columns.json"
+    """
+    with open(os.path.join(directory, "columns.json")) as file:
+        return json.load(file)
+
+
+def _recordCount(directory: str, columns: dict) -> int:
+    """
+    Returns the number of complete records in a trajectory directory (the shortest column's length)
+    """
+    counts = []
+    for name, dtype in columns.items():
+        path = os.path.join(directory, name + ".bin")
+        counts.append(os.path.getsize(path) // np.dtype(dtype).itemsize if os.path.exists(path) else 0)
+    return min(counts)
+
+
+def _mapColumn(directory: str, name: str, dtype: str, count: int) -> np.ndarray:
+    """
+    Returns the first "count" records of a column as a read-only memory map (an empty array if there are none)
+    """
+    if count == 0:
+        return np.empty(0, dtype = dtype)
+    return np.memmap(os.path.join(directory, name + ".bin"), dtype = dtype, mode = "r", shape = (count,))
@@ -0,0 +1,270 @@
+"""
+Trees Source File
+
+Tree structures which let agents with very large action spaces avoid O(k) scans every step.
+
+Requires `numpy` to be installed.
+
+Currently contains implementations for:
+    - Max Tree (O(log k) updates, O(1) argmax)
+    - Sum Tree (O(log k) updates & weighted sampling, O(1) total)
+"""
+
+import numpy as np
+
+
+class MaxTree:
+    """
+    Tournament tree over an array of values, which answers "argmax" in O(1) and updates a single value in O(log k).
+    Ties are broken towards the lowest index, exactly like `np.argmax` (NaN values are not supported).
+
+    The tree is stored as flat Python lists (node i has children 2i and 2i + 1, leaves start at "size"), since every
+    update walks a single root-to-leaf path where NumPy scalar indexing would only add overhead.
+
+    ...
+
+    Attributes
+    ----------
+    k : int
+        Number of values in the tree
+    size : int
+        Number of leaves (k rounded up to a power of 2). Unused leaves hold -inf
+    __values : list
+        Winning value of every node
+    __indices : list
+        Index of the winning value of every node
+
+    Methods
+    -------
+    argmax()
+        Returns the index of the largest value
+    max()
+        Returns the largest value
+    update(i, value)
+        Changes the value at index i
+    rebuild(values)
+        Rebuilds the whole tree from an array of values
+    """
+
+    def __init__(self, values: np.ndarray) -> None:
+        """
+        Parameters
+        ----------
+        values : np.array
+            Initial values (one per index)
+        """
+        self.rebuild(values)
+
+    def rebuild(self, values: np.ndarray) -> None:
+        """
+        Rebuilds the whole tree from an array of values, one vectorized tournament round per level
+
+        Parameters
+        ----------
+        values : np.array
+            New values (one per index)
+        """
+        self.k = len(values)
+        self.size = 1 << max(self.k - 1, 0).bit_length()
+        level_values = np.full(self.size, -np.inf)
+        level_values[:self.k] = values
+        level_indices = np.arange(self.size)
+        node_values = [level_values]
+        node_indices = [level_indices]
+        while len(level_values) > 1:
+            left_wins = level_values[0::2] >= level_values[1::2]
+            level_values = np.where(left_wins, level_values[0::2], level_values[1::2])
+            level_indices = np.where(left_wins, level_indices[0::2], level_indices[1::2])
+            node_values.append(level_values)
+            node_indices.append(level_indices)
+        # Levels were built leaves-first, the flat layout is root-first (with an unused slot 0)
+        self.__values = [0.0] + np.concatenate(node_values[::-1]).tolist()
+        self.__indices = [0] + np.concatenate(node_indices[::-1]).tolist()
+
+    def argmax(self) -> int:
+        """
+        Returns the index of the largest value (the lowest such index, if tied)
+        """
+        return self.__indices[1]
+
+    def max(self) -> float:
+        """
+        Returns the largest value
+        """
+        return self.__values[1]
+
+    def update(self, i: int, value: float) -> None:
+        """
+        Changes the value at index i, replaying only the matches along its path to the root
+
+        Parameters
+        ----------
+        i : int
+            Index of the value to change (from 0 to k)
+        value : float
+            New value
+        """
+        values = self.__values
+        indices = self.__indices
+        node = i + self.size
+        values[node] = value
+        node >>= 1
+        while node:
+            left = node << 1
+            winner = left if values[left] >= values[left + 1] else left + 1
+            if values[node] == values[winner] and indices[node] == indices[winner]:
+                break # Match result unchanged, so nothing above it changes either
+            values[node] = values[winner]
+            indices[node] = indices[winner]
+            node >>= 1
+
+
+class SumTree:
+    """
+    Binary tree of partial sums over an array of non-negative weights, which answers "total" in O(1), updates a single
+    weight in O(log k) and finds the index a cumulative weight falls into in O(log k), so an index can be sampled with
+    probability proportional to its weight without an O(k) cumulative sum.
+
+    Like MaxTree, the tree is stored as a flat Python list (node i has children 2i and 2i + 1, leaves start at "size").
+    Updates add the change in weight along a single path, so rounding errors slowly accumulate in the partial sums;
+    callers which update for a long time should "rebuild" periodically.
+
+    ...
+
+    Attributes
+    ----------
+    k : int
+        Number of weights in the tree
+    size : int
+        Number of leaves (k rounded up to a power of 2). Unused leaves hold 0
+    __sums : list
+        Sum of the weights under every node
+
+    Methods
+    -------
+    total()
+        Returns the sum of every weight
+    weight(i)
+        Returns the weight at index i
+    update(i, weight)
+        Changes the weight at index i
+    find(u)
+        Returns the index whose cumulative weight range contains u
+    rebuild(weights)
+        Rebuilds the whole tree from an array of weights
+    getState()
+        Returns every partial sum, exactly as they are
+    setState(sums)
+        Restores partial sums returned by "getState"
+    """
+
+    def __init__(self, weights: np.ndarray) -> None:
+        """
+        Parameters
+        ----------
+        weights : np.array
+            Initial non-negative weights (one per index)
+        """
+        self.rebuild(weights)
+
+    def rebuild(self, weights: np.ndarray) -> None:
+        """
+        Rebuilds the whole tree from an array of weights, one vectorized pairwise sum per level
+
+        Parameters
+        ----------
+        weights : np.array
+            New non-negative weights (one per index)
+        """
+        self.k = len(weights)
+        self.size = 1 << max(self.k - 1, 0).bit_length()
+        level = np.zeros(self.size)
+        level[:self.k] = weights
+        levels = [level]
+        while len(level) > 1:
+            level = level[0::2] + level[1::2]
+            levels.append(level)
+        # Levels were built leaves-first, the flat layout is root-first (with an unused slot 0)
+        self.__sums = [0.0] + np.concatenate(levels[::-1]).tolist()
+
+    def total(self) -> float:
+        """
+        Returns the sum of every weight
+        """
+        return self.__sums[1]
+
+    def weight(self, i: int) -> float:
+        """
+        Returns the weight at index i
+
+        Parameters
+        ----------
+        i : int
+            Index of the weight (from 0 to k)
+        """
+        return self.__sums[i + self.size]
+
+    def update(self, i: int, weight: float) -> None:
+        """
+        Changes the weight at index i, adding the difference to every partial sum along its path to the root
+
+        Parameters
+        ----------
+        i : int
+            Index of the weight to change (from 0 to k)
+        weight : float
+            New non-negative weight
+        """
+        sums = self.__sums
+        node = i + self.size
+        change = weight - sums[node]
+        while node:
+            sums[node] += change
+            node >>= 1
+
+    def find(self, u: float) -> int:
+        """
+        Returns the index whose cumulative weight range contains u, ie: the first index i where u < (sum of weights 0..i).
+        With u uniform over [0, total()), index i is returned with probability weight(i) / total()
+
+        Parameters
+        ----------
+        u : float
+            Cumulative weight to search for, within [0, total())
+        """
+        sums = self.__sums
+        size = self.size
+        node = 1
+        while node < size:
+            left = node << 1
+            # Never descend into a subtree with no weight, even if rounding pushed u past the left subtree's sum
+            if u < sums[left] or sums[left + 1] <= 0:
+                node = left
+            else:
+                u -= sums[left]
+                node = left + 1
+        return node - size
+
+    def getState(self) -> np.ndarray:
+        """
+        Returns every partial sum exactly as they are (including accumulated rounding errors, which a rebuild would not reproduce)
+        """
+        return np.array(self.__sums)
+
+    def setState(self, sums: np.ndarray) -> None:
+        """
+        Restores partial sums returned by "getState", from a tree of the same size
+
+        Parameters
+        ----------
+        sums : np.array
+            Partial sums returned by "getState"
+
+        Raises
+        ------
+        ValueError
+            If the sums are from a tree of a different size
+        """
+        if len(sums) != 2 * self.size:
+            raise ValueError("Invalid State, tree size does not match")
+        self.__sums = np.asarray(sums, dtype=float).tolist()
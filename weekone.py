@@ -1,41 +1,55 @@
+import argparse
+
 import numpy as np
 from bandits import StationaryBandit
+from bandits import RewardTape
 from agents import EpsilonGreedyAgent
 from agents import GreedyAgent
 from agents import OptimisticGreedyAgent
 from agents import RandomAgent
 from agents import UpperConfidenceBoundAgent
-
-# TODO: Add futher user input, if desired
+from metrics import PrintSink
+
+# Every constant comes from the command line (see `python weekone.py --help`), so the demo can be scripted.
+# For larger, non-interactive comparisons with results written to a file, use experiment.py instead
+parser = argparse.ArgumentParser(description = "Run every agent on the same bandit, then again after a reset and after changing bandits")
+parser.add_argument("--k", type = int, default = 10, help = "number of arms the bandit has (default: 10)")
+parser.add_argument("--epsilon", type = float, default = 0.1, help = "epsilon value of the epsilon greedy agent (default: 0.1)")
+parser.add_argument("--n", type = int, default = 1000, help = "number of actions every agent chooses per sequence (default: 1000)")
+parser.add_argument("--min", type = int, default = 0, help = "minimum true action value (default: 0)")
+parser.add_argument("--max", type = int, default = 10, help = "maximum true action value (default: 10)")
+parser.add_argument("--variance", type = float, default = 1, help = "reward noise scale (default: 1)")
+parser.add_argument("--optimistic-val", type = float, default = 20, help = "initial estimate of the optimistic greedy agent (default: 20)")
+parser.add_argument("--c", type = float, default = 1, help = "exploration parameter of the UCB agent (default: 1)")
+args = parser.parse_args()
 
 # Define bandit constants
-print("How many arms would you like the bandit to have? ")
-k = int(input())
-min = 0
-max = 10
-variance = 1
+k = args.k
+min = args.min
+max = args.max
+variance = args.variance
 
 # Define agent constants
-print("What would you like your epsilon value for the agent to be? (Decimal Form Only) ")
-epsilon = float(input())
-optimistic_val = 20
+epsilon = args.epsilon
+optimistic_val = args.optimistic_val
 
-c = 1
+c = args.c
 
 # Create bandit & agent objects
+# Each agent replays the same reward tape, so every agent sees identical rewards (common random numbers)
 curr_bandit = StationaryBandit(k, min, max, variance)
+curr_tape = RewardTape(curr_bandit)
 
-greedy_agent = GreedyAgent(curr_bandit)
-opt_greedy_agent = OptimisticGreedyAgent(curr_bandit, optimistic_val)
-eps_greedy_agent = EpsilonGreedyAgent(curr_bandit, epsilon)
-ucb_agent = UpperConfidenceBoundAgent(curr_bandit, c)
+greedy_agent = GreedyAgent(curr_tape.replay())
+opt_greedy_agent = OptimisticGreedyAgent(curr_tape.replay(), optimistic_val)
+eps_greedy_agent = EpsilonGreedyAgent(curr_tape.replay(), epsilon)
+ucb_agent = UpperConfidenceBoundAgent(curr_tape.replay(), c)
 
-random_agent = RandomAgent(curr_bandit)
+random_agent = RandomAgent(curr_tape.replay())
 
 
 # Define runtime & output constants
-print("How many times would you like the agent to be able to choose an action? ")
-n = int(input())
+n = args.n
 print_frequency = 1000
 
 print("-----------------------------------------------------")
@@ -44,7 +58,7 @@ greedy_agent.runSequence(n, print_frequency)
 opt_greedy_agent.runSequence(n,print_frequency)
 eps_greedy_agent.runSequence(n, print_frequency)
 ucb_agent.runSequence(n, print_frequency)
-random_agent.runSequence(n)
+random_agent.runSequence(n, sink=PrintSink())
 
 print(f"\n\nTRUE ACTION VALUES: {curr_bandit.actions}\n\n")
 print("-----------------------------------------------------")
@@ -56,11 +70,11 @@ eps_greedy_agent.reset()
 ucb_agent.reset()
 random_agent.reset()
 
-greedy_agent.runSequence(n)
-opt_greedy_agent.runSequence(n)
-eps_greedy_agent.runSequence(n)
-ucb_agent.runSequence(n)
-random_agent.runSequence(n)
+greedy_agent.runSequence(n, sink=PrintSink())
+opt_greedy_agent.runSequence(n, sink=PrintSink())
+eps_greedy_agent.runSequence(n, sink=PrintSink())
+ucb_agent.runSequence(n, sink=PrintSink())
+random_agent.runSequence(n, sink=PrintSink())
 
 print(f"\n\nTRUE ACTION VALUES: {curr_bandit.actions}\n\n")
 print("-----------------------------------------------------")
@@ -69,18 +83,19 @@ print("-----------------------------------------------------")
 
 # Test functionalty of changing bandit
 new_bandit = StationaryBandit(k+1, min, max, variance)
+new_tape = RewardTape(new_bandit)
 
-greedy_agent.changeBandit(new_bandit)
-opt_greedy_agent.changeBandit(new_bandit)
-eps_greedy_agent.changeBandit(new_bandit)
-ucb_agent.changeBandit(new_bandit)
-random_agent.changeBandit(new_bandit)
+greedy_agent.changeBandit(new_tape.replay())
+opt_greedy_agent.changeBandit(new_tape.replay())
+eps_greedy_agent.changeBandit(new_tape.replay())
+ucb_agent.changeBandit(new_tape.replay())
+random_agent.changeBandit(new_tape.replay())
 
-greedy_agent.runSequence(n)
-opt_greedy_agent.runSequence(n)
-eps_greedy_agent.runSequence(n)
-ucb_agent.runSequence(n)
-random_agent.runSequence(n)
+greedy_agent.runSequence(n, sink=PrintSink())
+opt_greedy_agent.runSequence(n, sink=PrintSink())
+eps_greedy_agent.runSequence(n, sink=PrintSink())
+ucb_agent.runSequence(n, sink=PrintSink())
+random_agent.runSequence(n, sink=PrintSink())
 
 print(f"\n\nTRUE ACTION VALUES: {new_bandit.actions}\n\n")
 print("-----------------------------------------------------")
@@ -92,11 +107,11 @@ eps_greedy_agent.reset()
 ucb_agent.reset()
 random_agent.reset()
 
-greedy_agent.runSequence(n)
-opt_greedy_agent.runSequence(n)
-eps_greedy_agent.runSequence(n)
-ucb_agent.runSequence(n)
-random_agent.runSequence(n)
+greedy_agent.runSequence(n, sink=PrintSink())
+opt_greedy_agent.runSequence(n, sink=PrintSink())
+eps_greedy_agent.runSequence(n, sink=PrintSink())
+ucb_agent.runSequence(n, sink=PrintSink())
+random_agent.runSequence(n, sink=PrintSink())
 
 print(f"\n\nTRUE ACTION VALUES: {new_bandit.actions}\n\n")
 print("-----------------------------------------------------")
\ No newline at end of file